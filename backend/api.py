@@ -1,13 +1,16 @@
+import asyncio
 import logging
 import os
 import aiofiles
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from typing import Optional
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from celery.result import AsyncResult
 from tasks import text_task, app as celery_app
 from config import settings
 from modules.database import db
+from modules.track import Separator, ensure_mp3
 
 # 设置详细日志
 logging.basicConfig(level=logging.INFO)
@@ -26,10 +29,12 @@ app.add_middleware(
 
 
 @app.post("/tasks/text")
-async def create_text_task(file: UploadFile = File(...)):
+async def create_text_task(file: UploadFile = File(...), vocal_backend: Optional[str] = Form(None)):
     """
     上传视频并创建 to_text 任务。
     前端已将文件名设为 <SHA256_HASH><ext>，后端信任该哈希值。
+    vocal_backend 可选：mdx（神经网络人声分离）/ spectral（谱门限降噪，适合只有轻度底噪的内容），
+    默认使用 VOCAL_BACKEND。
     
     流程：
     1. 从文件名提取哈希值
@@ -44,6 +49,8 @@ async def create_text_task(file: UploadFile = File(...)):
     
     if not file_hash:
         raise HTTPException(status_code=400, detail="文件名不能为空")
+    if vocal_backend and vocal_backend not in settings.VOCAL_BACKENDS:
+        raise HTTPException(status_code=400, detail=f"无效的人声提取后端，支持: {', '.join(settings.VOCAL_BACKENDS)}")
     
     logger.info(f"[{file_hash}] 收到上传请求, 扩展名: {ext}")
 
@@ -87,6 +94,15 @@ async def create_text_task(file: UploadFile = File(...)):
                 await buffer.write(chunk)
         logger.info(f"[{file_hash}] 文件保存成功")
         
+        # 探测一次并按哈希缓存（时长、流、编码、码率），worker 直接读取，同时用于预估处理耗时
+        duration = None
+        try:
+            probe = await asyncio.to_thread(Separator.probe_media, save_path)
+            db.save_media_probe(file_hash, probe)
+            duration = db.get_media_duration(file_hash)
+        except Exception as e:
+            logger.warning(f"[{file_hash}] 媒体探测失败，将由 worker 重新探测: {e}")
+        
         # 写入/更新数据库记录
         if existing_status == "failed":
             db.update_file_status(file_hash, "progress")
@@ -94,7 +110,7 @@ async def create_text_task(file: UploadFile = File(...)):
             db.save_file_record(file_hash, status="progress")
         
         # 下发 Celery 任务
-        result = text_task.delay(file_hash)
+        result = text_task.delay(file_hash, vocal_backend)
         task_id = result.id
         
         # 记录 task_id -> file_hash 映射
@@ -106,6 +122,8 @@ async def create_text_task(file: UploadFile = File(...)):
             "status": "processing",
             "file_hash": file_hash,
             "task_id": task_id,
+            "duration": duration,
+            "estimated_seconds": settings.estimate_processing_seconds(duration),
             "message": "任务已创建"
         }
 
@@ -133,16 +151,14 @@ def get_file_status(file_hash: str):
     if existing_status == "success":
         # 已完成，返回各输出文件是否存在
         text_dir = settings.get_text_dir(settings.DATA_DIR, file_hash)
-        track_dir = settings.get_track_dir(settings.DATA_DIR, file_hash)
-        vocal_dir = settings.get_vocal_dir(settings.DATA_DIR, file_hash)
         
         return {
             "status": "success",
             "file_hash": file_hash,
             "files": {
                 "text": os.path.exists(os.path.join(text_dir, f"{file_hash}.txt")),
-                "track": os.path.exists(os.path.join(track_dir, f"{file_hash}.mp3")),
-                "vocal": os.path.exists(os.path.join(vocal_dir, f"{file_hash}.mp3")),
+                "track": settings.find_audio_artifact(settings.get_track_dir, file_hash) is not None,
+                "vocal": settings.find_audio_artifact(settings.get_vocal_dir, file_hash) is not None,
             }
         }
     
@@ -192,11 +208,14 @@ def get_file_status(file_hash: str):
     if hasattr(result, 'info') and isinstance(result.info, dict):
         celery_meta = result.info
     
+    duration = db.get_media_duration(file_hash)
     return {
         "status": "progress",
         "file_hash": file_hash,
         "celery_status": celery_status,
-        "meta": celery_meta
+        "meta": celery_meta,
+        "duration": duration,
+        "estimated_seconds": settings.estimate_processing_seconds(duration),
     }
 
 
@@ -205,6 +224,7 @@ def download_file(file_hash: str, file_type: str):
     """
     下载处理后的文件。
     file_type: text / track / vocal / source
+    音轨与人声在流水线内部以无损中间格式保存，首次下载时才编码为 MP3（之后复用缓存）。
     """
     # 检查文件是否存在于数据库
     if not db.check_file_exists(file_hash):
@@ -213,11 +233,20 @@ def download_file(file_hash: str, file_type: str):
     # 根据 file_type 确定路径
     type_map = {
         "text": (settings.get_text_dir, f"{file_hash}.txt"),
-        "track": (settings.get_track_dir, f"{file_hash}.mp3"),
-        "vocal": (settings.get_vocal_dir, f"{file_hash}.mp3"),
+    }
+    audio_types = {
+        "track": settings.get_track_dir,
+        "vocal": settings.get_vocal_dir,
     }
     
-    if file_type == "source":
+    if file_type in audio_types:
+        artifact = settings.find_audio_artifact(audio_types[file_type], file_hash)
+        if artifact is None:
+            raise HTTPException(status_code=404, detail="文件尚未生成或不存在")
+        file_path = ensure_mp3(artifact)
+        if file_path is None:
+            raise HTTPException(status_code=500, detail="MP3 编码失败")
+    elif file_type == "source":
         import glob
         source_dir = settings.get_source_dir(settings.DATA_DIR, file_hash)
         files = glob.glob(os.path.join(source_dir, f"{file_hash}.*"))
@@ -0,0 +1,7 @@
+"""
+性能基准脚本集合。需在 backend/ 目录下以模块方式运行，例如：
+    python -m benchmark.bench_pcm_feed
+    python -m benchmark.rtf_suite run --output current.json
+    python -m benchmark.bench_separation --workers 2,4
+    python -m benchmark.bench_quantization --speech clean.wav --music-db -12,-6,0
+"""
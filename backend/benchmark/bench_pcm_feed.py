@@ -0,0 +1,169 @@
+"""
+对比 LongAudioProcessor 的两种数据供给路径：
+
+- legacy：pydub 整体加载 -> 每个片段导出临时 WAV -> faster-whisper 再次解码该文件
+- pcm   ：ffmpeg 管道一次解码为 16kHz float32 数组 -> 切片直接交给 Whisper
+
+两条路径之后的模型推理完全相同，因此默认只测量"供给"阶段；
+传入 --model 时会额外对第一个片段执行真实转录作为端到端参考。
+
+用法（在 backend/ 目录下）：
+    python -m benchmark.bench_pcm_feed --duration 7200
+    python -m benchmark.bench_pcm_feed --input lecture.mp3 --model base
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark.synthetic import write_synthetic_audio
+
+
+def _io_counters() -> dict:
+    """当前进程及其已回收子进程的块 I/O 计数（512 字节为单位）与峰值内存"""
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    child_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "blocks_in": self_usage.ru_inblock + child_usage.ru_inblock,
+        "blocks_out": self_usage.ru_oublock + child_usage.ru_oublock,
+        "peak_rss_mb": max(self_usage.ru_maxrss, child_usage.ru_maxrss) / 1024,
+    }
+
+
+def _legacy_feed(audio_path: str, config) -> dict:
+    """复现旧实现：AudioSegment 切片 + 临时 WAV 导出 + faster-whisper 重新解码"""
+    from pydub import AudioSegment
+    from faster_whisper import decode_audio
+
+    audio = AudioSegment.from_file(audio_path)
+    duration_ms = len(audio)
+    temp_bytes = 0
+    chunks = 0
+    start_ms = 0
+    while start_ms < duration_ms:
+        end_ms = min(start_ms + config.SEGMENT_LENGTH_MS, duration_ms)
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
+            temp_path = tmp_file.name
+        try:
+            audio[start_ms:end_ms].export(temp_path, format="wav")
+            temp_bytes += os.path.getsize(temp_path)
+            decode_audio(temp_path, sampling_rate=config.SAMPLE_RATE)
+        finally:
+            os.unlink(temp_path)
+        chunks += 1
+        if end_ms >= duration_ms:
+            break
+        start_ms = end_ms - config.OVERLAP_MS
+    return {"chunks": chunks, "temp_bytes_written": temp_bytes}
+
+
+def _pcm_feed(audio_path: str, config) -> dict:
+    """新实现：与 LongAudioProcessor 固定分割模式相同的 iter_pcm_windows 管道解码（不加载模型）"""
+    from modules.audio.pcm import iter_pcm_windows
+
+    chunks = 0
+    for _ in iter_pcm_windows(audio_path, config.SEGMENT_LENGTH_MS, config.OVERLAP_MS, config.SAMPLE_RATE):
+        chunks += 1
+    return {"chunks": chunks, "temp_bytes_written": 0}
+
+
+def _transcribe_first_chunk(audio_path: str, model_size: str, mode: str, config) -> float:
+    """
+    端到端参考：对第一个片段执行真实转录，返回耗时。
+    两种模式使用完全相同的解码参数，耗时差异只来自供给方式
+    """
+    from modules.audio.faster_audio_processor import LongAudioProcessor
+    from modules.audio.pcm import iter_pcm_windows
+
+    processor = LongAudioProcessor(model_size=model_size, device_override="cpu", config=config)
+    transcribe_kwargs = processor._transcribe_kwargs()
+    start = time.perf_counter()
+    if mode == "legacy":
+        from pydub import AudioSegment
+        segment = AudioSegment.from_file(audio_path)[:config.SEGMENT_LENGTH_MS]
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
+            temp_path = tmp_file.name
+        try:
+            segment.export(temp_path, format="wav")
+            list(processor.model.transcribe(temp_path, **transcribe_kwargs)[0])
+        finally:
+            os.unlink(temp_path)
+    else:
+        audio, _ = next(iter_pcm_windows(audio_path, config.SEGMENT_LENGTH_MS, config.OVERLAP_MS, config.SAMPLE_RATE))
+        list(processor.model.transcribe(audio, **transcribe_kwargs)[0])
+    return time.perf_counter() - start
+
+
+def run_mode(mode: str, audio_path: str, model_size: str = None) -> dict:
+    """在当前进程中执行一种模式并返回指标"""
+    from modules.audio.faster_audio_processor import AudioProcessorConfig
+
+    config = AudioProcessorConfig()
+    # 只比较供给方式：关闭调优、语音分布图与自适应解码，两种模式以相同参数直接解码
+    config.AUTOTUNE = False
+    config.SPEECH_MAP_ENABLED = False
+    config.ADAPTIVE_BEAM = False
+    before = _io_counters()
+    start = time.perf_counter()
+    stats = _legacy_feed(audio_path, config) if mode == "legacy" else _pcm_feed(audio_path, config)
+    wall = time.perf_counter() - start
+    after = _io_counters()
+
+    result = {
+        "mode": mode,
+        "feed_wall_s": round(wall, 3),
+        "chunks": stats["chunks"],
+        "temp_bytes_written": stats["temp_bytes_written"],
+        "disk_read_mb": (after["blocks_in"] - before["blocks_in"]) * 512 / 1024 / 1024,
+        "disk_write_mb": (after["blocks_out"] - before["blocks_out"]) * 512 / 1024 / 1024,
+        "peak_rss_mb": after["peak_rss_mb"],
+    }
+    if model_size:
+        result["first_chunk_transcribe_s"] = round(_transcribe_first_chunk(audio_path, model_size, mode, config), 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PCM 直供 vs 临时 WAV 的供给路径基准")
+    parser.add_argument("--input", help="待测音频；不提供时生成确定性合成音频")
+    parser.add_argument("--duration", type=float, default=7200, help="合成音频时长（秒），默认 2 小时")
+    parser.add_argument("--model", help="可选：额外对首个片段做真实转录的模型大小")
+    parser.add_argument("--run-mode", choices=["legacy", "pcm"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        # 子进程模式：仅执行单个模式，输出 JSON，保证各模式的 rusage 互不干扰
+        print(json.dumps(run_mode(args.run_mode, args.input, args.model)))
+        return
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        audio_path = args.input
+        if not audio_path:
+            audio_path = os.path.join(work_dir, "synthetic.mp3")
+            print(f"生成 {args.duration / 3600:.2f} 小时合成音频: {audio_path}", file=sys.stderr)
+            write_synthetic_audio(audio_path, args.duration)
+
+        results = []
+        for mode in ("legacy", "pcm"):
+            cmd = [sys.executable, "-m", "benchmark.bench_pcm_feed", "--run-mode", mode, "--input", audio_path]
+            if args.model:
+                cmd += ["--model", args.model]
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+
+    legacy, pcm = results
+    report = {
+        "input": args.input or f"synthetic:{args.duration}s",
+        "results": results,
+        "feed_speedup": round(legacy["feed_wall_s"] / pcm["feed_wall_s"], 2) if pcm["feed_wall_s"] else None,
+        "temp_bytes_saved": legacy["temp_bytes_written"] - pcm["temp_bytes_written"],
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
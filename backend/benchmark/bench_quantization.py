@@ -0,0 +1,146 @@
+"""
+人声分离模型精度对比：fp32 vs int8（onnxruntime 动态量化）。
+
+在合成混音（语音 + 合成背景音乐，按 --music-db 指定的音乐相对语音的电平混合）上分别用各精度的模型
+分离人声，再用 Whisper 转录分离结果，输出机器可读的 JSON：
+    sep_wall_s / sep_rtf   分离耗时 / 实时率（不含模型加载、量化与预热）
+    speedup                相对 fp32（--precisions 中的第一个）的分离加速比
+    snr_vs_fp32_db         人声与 fp32 人声之间的 SNR
+    wer / wer_delta        转录错误率及相对 fp32 的变化（正数表示变差）
+每个电平还给出 precision 为 none 的结果（不做分离、直接转录混音）作为对照。
+
+WER 的参考文本为 --reference 提供的文本文件；未提供时以 Whisper 转录纯净语音的结果为参考，
+此时 wer 衡量的是相对于无伴奏时的损失。中文等不以空格分词的文本按字计算（即 CER）。
+未提供 --speech 时使用确定性的类语音合成信号，只适合比较速度与 SNR（其中没有可识别的文字）。
+
+用法（在 backend/ 目录下）：
+    python -m benchmark.bench_quantization --speech lecture_clean.wav --music-db -12,-6,0
+    python -m benchmark.bench_quantization --duration 120 --model-size tiny
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from benchmark.bench_separation import _snr_db
+from benchmark.synthetic import synthetic_audio, synthetic_music, write_audio
+
+
+def _tokens(text: str) -> List[str]:
+    text = text.lower()
+    if re.search(r"[\u3040-\u30ff\u3400-\u9fff]", text):
+        return [c for c in text if c.isalnum()]
+    return re.findall(r"[\w']+", text)
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """词错误率（编辑距离 / 参考词数）；含中日文字符时按字计算"""
+    ref, hyp = _tokens(reference), _tokens(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return round(previous[-1] / len(ref), 4)
+
+
+def _mix(speech: np.ndarray, music: np.ndarray, music_db: float) -> np.ndarray:
+    """按均方根电平把音乐混入语音（music_db 为音乐相对语音的 dB），峰值超过 1 时整体缩放"""
+    speech_rms = np.sqrt(np.mean(speech ** 2)) or 1.0
+    music_rms = np.sqrt(np.mean(music ** 2)) or 1.0
+    mixed = speech + music * (speech_rms / music_rms * 10 ** (music_db / 20))
+    peak = np.abs(mixed).max()
+    return (mixed / peak * 0.99 if peak > 0.99 else mixed).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="人声分离模型精度：速度与转录质量")
+    parser.add_argument("--speech", help="纯净语音文件；不提供时生成确定性合成信号")
+    parser.add_argument("--reference", help="语音的参考文本文件；不提供时以纯净语音的转录结果为参考")
+    parser.add_argument("--duration", type=float, default=120, help="合成语音时长（秒）")
+    parser.add_argument("--music-db", default="-6", help="音乐相对语音的电平（dB），逗号分隔")
+    parser.add_argument("--precisions", default="fp32,int8", help="模型精度，逗号分隔，第一个为对照基线")
+    parser.add_argument("--model-size", default="base", help="转录使用的 Whisper 模型大小")
+    parser.add_argument("--seed", type=int, default=0, help="合成音频随机种子")
+    args = parser.parse_args()
+
+    from modules.audio import LongAudioProcessor, iter_array_windows, load_pcm, resample_pcm
+    from modules.audio.pcm import SAMPLE_RATE
+    from modules.track.service import SeparationService
+
+    speech = load_pcm(args.speech) if args.speech else synthetic_audio(args.duration, SAMPLE_RATE, args.seed)
+    duration = len(speech) / SAMPLE_RATE
+    music = synthetic_music(duration, SAMPLE_RATE, args.seed)
+    levels = [float(db) for db in args.music_db.split(",") if db.strip()]
+    precisions = [p.strip() for p in args.precisions.split(",") if p.strip()]
+
+    processor = LongAudioProcessor(model_size=args.model_size)
+    config = processor.config
+
+    def transcribe(audio: np.ndarray) -> str:
+        chunks = iter_array_windows(audio, config.SEGMENT_LENGTH_MS, config.OVERLAP_MS)
+        return processor.process_audio_stream(chunks, duration_ms=int(duration * 1000))["text"]
+
+    if args.reference:
+        with open(args.reference, "r", encoding="utf-8") as f:
+            reference = f.read()
+    else:
+        reference = transcribe(speech)
+
+    results: List[Dict] = []
+    baseline: Dict[float, Dict] = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        mixes = {}
+        for db in levels:
+            mixed = _mix(speech, music, db)
+            mixes[db] = write_audio(os.path.join(work_dir, f"mix_{db:+.0f}dB.wav"), mixed, SAMPLE_RATE)
+            results.append({"precision": "none", "music_db": db, "wer": word_error_rate(reference, transcribe(mixed))})
+        warmup_path = write_audio(os.path.join(work_dir, "warmup.wav"), _mix(speech, music, 0)[:10 * SAMPLE_RATE])
+
+        for precision in precisions:
+            start = time.perf_counter()
+            service = SeparationService(precision=precision)
+            load_s = time.perf_counter() - start
+            service.separate_array(warmup_path)
+
+            for db in levels:
+                start = time.perf_counter()
+                vocals = service.separate_array(mixes[db])
+                wall = time.perf_counter() - start
+                vocals = resample_pcm(vocals, service.sample_rate)
+                result = {
+                    "precision": precision,
+                    "music_db": db,
+                    "load_s": round(load_s, 3),
+                    "sep_wall_s": round(wall, 3),
+                    "sep_rtf": round(wall / duration, 4),
+                    "wer": word_error_rate(reference, transcribe(vocals)),
+                }
+                # 第一个精度为对照基线
+                base = baseline.setdefault(db, dict(result, vocals=vocals))
+                if base["precision"] != precision:
+                    result["speedup"] = round(base["sep_wall_s"] / wall, 2)
+                    result["snr_vs_fp32_db"] = _snr_db(base["vocals"], vocals)
+                    result["wer_delta"] = round(result["wer"] - base["wer"], 4)
+                results.append(result)
+
+    print(json.dumps({
+        "input_seconds": round(duration, 1),
+        "speech": args.speech or f"synthetic(seed={args.seed})",
+        "reference": args.reference or "whisper(clean speech)",
+        "whisper_model": args.model_size,
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
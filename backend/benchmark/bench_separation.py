@@ -0,0 +1,99 @@
+"""
+对比人声分离的两条路径：
+
+- singleton：常驻单例模型对整条音轨运行一次 Separator.separate（单个 ONNX 会话）
+- parallel ：distractor_parallel 切分重叠窗口，在进程池中并行分离后交叉淡化拼接
+
+模型加载与进程池启动不计入耗时。并行结果与单例结果之间的 SNR 用于确认拼接没有引入明显失真。
+
+用法（在 backend/ 目录下）：
+    python -m benchmark.bench_separation --duration 900 --workers 2,4,8
+    python -m benchmark.bench_separation --input lecture.flac --workers 4 --window 60
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmark.synthetic import write_synthetic_audio
+
+
+def _snr_db(reference: np.ndarray, candidate: np.ndarray) -> float:
+    n = min(len(reference), len(candidate))
+    noise = np.sum((reference[:n] - candidate[:n]) ** 2)
+    signal = np.sum(reference[:n] ** 2)
+    return float("inf") if noise == 0 else round(float(10 * np.log10(signal / noise)), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="人声分离：单例 vs 并行窗口")
+    parser.add_argument("--input", help="输入音轨；不提供时生成确定性合成音频")
+    parser.add_argument("--duration", type=float, default=600, help="合成音频时长（秒）")
+    parser.add_argument("--workers", default="2,4", help="并行工作进程数，逗号分隔")
+    parser.add_argument("--threads", type=int, default=0, help="每进程 ONNX 线程数，0 表示按核数平均划分")
+    parser.add_argument("--window", type=float, default=120.0, help="窗口长度（秒）")
+    parser.add_argument("--overlap", type=float, default=4.0, help="窗口重叠（秒）")
+    args = parser.parse_args()
+
+    from modules.audio.pcm import load_pcm, probe_duration
+    from modules.track.distract import (
+        get_separation_pool, distractor, distractor_parallel, preload_separator, shutdown_separation_pools,
+    )
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_path = args.input
+        if not input_path:
+            input_path = write_synthetic_audio(os.path.join(work_dir, "synthetic.flac"), args.duration)
+        duration = probe_duration(input_path)
+
+        preload_separator()
+        start = time.perf_counter()
+        reference_path = distractor(input_path, os.path.join(work_dir, "singleton"), "flac")
+        wall = time.perf_counter() - start
+        if not reference_path:
+            raise RuntimeError("单例分离失败")
+        results.append({"mode": "singleton", "workers": 1, "wall_s": round(wall, 3), "rtf": round(wall / duration, 4)})
+        reference = load_pcm(reference_path)
+
+        for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+            threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+            # 预热：等待所有工作进程加载完模型
+            pool = get_separation_pool(workers, threads)
+            for future in [pool.submit(os.getpid) for _ in range(workers)]:
+                future.result()
+
+            start = time.perf_counter()
+            output_path = distractor_parallel(
+                input_path, os.path.join(work_dir, f"parallel_{workers}"), "flac",
+                workers=workers, threads_per_worker=threads, window_s=args.window, overlap_s=args.overlap,
+            )
+            wall = time.perf_counter() - start
+            shutdown_separation_pools()
+            if not output_path:
+                results.append({"mode": "parallel", "workers": workers, "error": "分离失败"})
+                continue
+            results.append({
+                "mode": "parallel",
+                "workers": workers,
+                "threads_per_worker": threads,
+                "wall_s": round(wall, 3),
+                "rtf": round(wall / duration, 4),
+                "speedup": round(results[0]["wall_s"] / wall, 2),
+                "snr_vs_singleton_db": _snr_db(reference, load_pcm(output_path)),
+            })
+
+    print(json.dumps({
+        "input_seconds": round(duration, 1),
+        "cpu_count": os.cpu_count(),
+        "window_s": args.window,
+        "overlap_s": args.overlap,
+        "results": results,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+转录引擎实时率（RTF）基准套件。
+
+在确定性合成音频上遍历 模型大小 × compute_type × 片段长度 × 批量/非批量 的组合，
+每个组合在独立子进程中运行（峰值内存互不干扰），输出机器可读的 JSON：
+    rtf         转录耗时 / 音频时长（不含模型加载）
+    wall_s      转录耗时
+    load_s      模型加载耗时
+    peak_rss_mb 子进程峰值常驻内存
+
+用法（在 backend/ 目录下）：
+    python -m benchmark.rtf_suite run --duration 600 --models tiny,base --output current.json
+    python -m benchmark.rtf_suite run --models medium --compute-types int8,float32 --batched both
+    python -m benchmark.rtf_suite compare baseline.json current.json --threshold 0.1
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+CASE_FIELDS = ("model", "compute_type", "chunk_s", "batched")
+
+
+def _case_key(case: Dict) -> str:
+    return "|".join(str(case.get(field)) for field in CASE_FIELDS)
+
+
+def run_case(case: Dict, audio_path: str, duration_s: float) -> Dict:
+    """在当前进程中运行单个组合并返回指标"""
+    from modules.audio.faster_audio_processor import AudioProcessorConfig, LongAudioProcessor
+
+    config = AudioProcessorConfig()
+    config.AUTOTUNE = False
+    config.SPEECH_MAP_ENABLED = case["speech_map"]
+    config.COMPUTE_TYPE = case["compute_type"]
+    config.BATCHED_INFERENCE = case["batched"]
+    if case["chunk_s"]:
+        config.SEGMENT_LENGTH_MS = int(case["chunk_s"] * 1000)
+
+    start = time.perf_counter()
+    processor = LongAudioProcessor(model_size=case["model"], device_override=case["device"], config=config)
+    processor.warm_up()
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = processor.process_long_audio(audio_path)
+    wall_s = time.perf_counter() - start
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return dict(
+        case,
+        # 实际生效的配置（compute_type 可能回退、批量推理可能不可用）
+        effective_compute_type=processor.compute_type,
+        effective_batched=processor.batched_mode,
+        device=processor.device,
+        rtf=round(wall_s / duration_s, 4),
+        wall_s=round(wall_s, 3),
+        load_s=round(load_s, 3),
+        peak_rss_mb=round(max(usage.ru_maxrss, children.ru_maxrss) / 1024, 1),
+        chunks=processor.run_stats.get("chunks"),
+        segments=len(result["segments"]),
+    )
+
+
+def _cases(args) -> List[Dict]:
+    batched = {"on": [True], "off": [False], "both": [False, True]}[args.batched]
+    chunks = [float(c) for c in args.chunk_seconds.split(",")] if args.chunk_seconds else [0]
+    return [
+        {
+            "model": model,
+            "compute_type": compute_type or None,
+            "chunk_s": chunk_s,
+            "batched": use_batched,
+            "device": args.device,
+            "speech_map": args.speech_map,
+        }
+        for model, compute_type, chunk_s, use_batched in itertools.product(
+            args.models.split(","), args.compute_types.split(","), chunks, batched
+        )
+    ]
+
+
+def cmd_run(args) -> None:
+    # compare 子命令只需标准库，生成音频所需的 numpy 延迟导入
+    from benchmark.synthetic import write_synthetic_audio
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        audio_path = os.path.join(work_dir, "synthetic.wav")
+        print(f"生成 {args.duration:.0f}s 合成音频 (seed={args.seed})", file=sys.stderr)
+        write_synthetic_audio(audio_path, args.duration, seed=args.seed)
+
+        results = []
+        for case in _cases(args):
+            print(f"运行 {_case_key(case)} ...", file=sys.stderr)
+            cmd = [
+                sys.executable, "-m", "benchmark.rtf_suite", "_case",
+                "--case", json.dumps(case), "--input", audio_path, "--duration", str(args.duration),
+            ]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                results.append(dict(case, error=proc.stderr.strip().splitlines()[-1:] or ["unknown"]))
+                continue
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    report = {
+        "host": {
+            "hostname": socket.gethostname(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "audio": {"duration_s": args.duration, "seed": args.seed},
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> Dict:
+    """
+    按组合对比两次运行，RTF 或峰值内存超过基线 (1 + threshold) 倍即视为回退
+    Returns:
+        {"regressions": [...], "improvements": [...], "missing": [...]}
+    """
+    base_by_key = {_case_key(r): r for r in baseline["results"] if "error" not in r}
+    report = {"threshold": threshold, "regressions": [], "improvements": [], "missing": []}
+    for result in current["results"]:
+        key = _case_key(result)
+        base = base_by_key.get(key)
+        if base is None or "error" in result:
+            report["missing"].append(key)
+            continue
+        for metric in ("rtf", "peak_rss_mb"):
+            ratio = result[metric] / base[metric] if base[metric] else 1.0
+            entry = {"case": key, "metric": metric, "baseline": base[metric], "current": result[metric],
+                     "change": round(ratio - 1, 4)}
+            if ratio > 1 + threshold:
+                report["regressions"].append(entry)
+            elif ratio < 1 - threshold:
+                report["improvements"].append(entry)
+    if baseline.get("audio") != current.get("audio"):
+        report["warning"] = "两次运行的合成音频参数不同，结果不可直接比较"
+    return report
+
+
+def cmd_compare(args) -> None:
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, "r", encoding="utf-8") as f:
+        current = json.load(f)
+    report = compare(baseline, current, args.threshold)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if report["regressions"]:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LongAudioProcessor 实时率基准套件")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="运行参数组合并输出 JSON")
+    run.add_argument("--duration", type=float, default=600, help="合成音频时长（秒）")
+    run.add_argument("--seed", type=int, default=0, help="合成音频随机种子")
+    run.add_argument("--models", default="tiny,base", help="模型大小，逗号分隔")
+    run.add_argument("--compute-types", default="", help="compute_type，逗号分隔；留空表示按设备默认")
+    run.add_argument("--chunk-seconds", default="", help="片段长度（秒），逗号分隔；留空表示默认配置")
+    run.add_argument("--batched", choices=["on", "off", "both"], default="both", help="批量推理模式")
+    run.add_argument("--device", help="推理设备，默认自动检测")
+    run.add_argument("--speech-map", action="store_true", help="启用语音分布图（默认关闭，仅测量解码吞吐）")
+    run.add_argument("--output", help="结果 JSON 输出路径")
+    run.set_defaults(func=cmd_run)
+
+    cmp = sub.add_parser("compare", help="对比两次运行并标记回退（存在回退时退出码为 1）")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.1, help="允许的相对波动，默认 10%%")
+    cmp.set_defaults(func=cmd_compare)
+
+    # 子进程模式：运行单个组合
+    case = sub.add_parser("_case")
+    case.add_argument("--case", required=True)
+    case.add_argument("--input", required=True)
+    case.add_argument("--duration", type=float, required=True)
+    case.set_defaults(func=lambda a: print(json.dumps(run_case(json.loads(a.case), a.input, a.duration))))
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 import os
+import glob
+from typing import Optional
 
 class Config:
     # --- Redis / Celery 配置 ---
@@ -11,6 +13,76 @@ class Config:
     # 数据根目录：Docker 中为 /data，本地为 backend/data
     DATA_DIR = os.getenv("DATA_DIR", os.path.join(BASE_DIR, "data"))
 
+    # --- 模型配置 ---
+    # 语音转文字使用的 Whisper 模型大小
+    WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "medium")
+    # 两级转录的草稿模型（如 tiny / base）：设置后先用小模型快速产出草稿，
+    # 再用 WHISPER_MODEL_SIZE 只精修低置信度段落；留空则禁用
+    WHISPER_DRAFT_MODEL_SIZE = os.getenv("WHISPER_DRAFT_MODEL_SIZE", "") or None
+    # 应用 `python -m modules.audio.autotune` 写入的本机调优结果（compute_type / 线程划分 / 片段长度）。
+    # 默认关闭：磁盘上的调优缓存不会在未显式开启时改变转录行为
+    WHISPER_AUTOTUNE = os.getenv("WHISPER_AUTOTUNE", "false").lower() in ("1", "true", "yes")
+    # 解码前构建语音分布图，只把语音区域交给 Whisper（见 modules/audio/README.md 的 SPEECH_MAP_ENABLED）。
+    # 默认关闭：开启后段落切分与转录文本会发生变化
+    WHISPER_SPEECH_MAP = os.getenv("WHISPER_SPEECH_MAP", "false").lower() in ("1", "true", "yes")
+    # Celery worker 进程启动时是否预加载 Whisper 与人声分离模型
+    PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "true").lower() in ("1", "true", "yes")
+    # worker 子进程启动（含模型预热）的超时时间（秒），Celery 默认仅 4 秒
+    WORKER_PROC_ALIVE_TIMEOUT = float(os.getenv("WORKER_PROC_ALIVE_TIMEOUT", "600"))
+    # 跨文件批处理：不超过该时长（秒）的短音频进入进程内共享的批处理队列，
+    # 与同时排队的其他文件合并为一次批量推理（需以 threads/gevent 池并发运行 worker）
+    CROSS_FILE_BATCHING = os.getenv("CROSS_FILE_BATCHING", "false").lower() in ("1", "true", "yes")
+    CROSS_FILE_BATCH_MAX_SECONDS = float(os.getenv("CROSS_FILE_BATCH_MAX_SECONDS", "600"))
+
+    # --- 人声分离 ---
+    # 人声提取后端（上传时可通过 vocal_backend 表单字段按任务覆盖）：
+    #   mdx       UVR-MDX-NET 神经网络人声分离，可去除背景音乐
+    #   spectral  谱门限降噪（NumPy/SciPy），数百倍实时，只适合轻度背景噪声；不做背景音乐检测，总是运行
+    VOCAL_BACKENDS = ("mdx", "spectral")
+    VOCAL_BACKEND = os.getenv("VOCAL_BACKEND", "mdx")
+    # 人声分离前先用频谱/能量特征检测背景音乐，纯讲话内容直接转录原音轨，跳过 UVR-MDX-NET
+    MUSIC_DETECTION = os.getenv("MUSIC_DETECTION", "true").lower() in ("1", "true", "yes")
+    # 含音乐窗口占有声窗口的比例达到该值时才运行人声分离
+    MUSIC_DETECTION_MIN_RATIO = float(os.getenv("MUSIC_DETECTION_MIN_RATIO", "0.05"))
+    # 只对语音区域（含余量）运行人声分离，其余部分在人声中为静音；分离耗时随语音时长而非媒体时长增长
+    SEPARATION_SPEECH_ONLY = os.getenv("SEPARATION_SPEECH_ONLY", "true").lower() in ("1", "true", "yes")
+    # 并行窗口分离的工作进程数：大于 1 时长音轨切分为重叠窗口，在多个进程中并行运行 MDX 模型
+    # （每进程 ONNX 线程数 = CPU 核数 / 进程数）；0 或 1 使用常驻单例模型
+    SEPARATION_WORKERS = int(os.getenv("SEPARATION_WORKERS", "0"))
+    # 人声分离模型精度：fp32（默认）/ int8（onnxruntime 动态量化，首次使用时生成并缓存在模型文件旁）。
+    # 分离服务加载模型时读取此项，并行分离时由主进程解析后传给工作进程；
+    # 切换前请用 benchmark.bench_quantization 确认速度收益与转录质量损失
+    SEPARATOR_MODEL_PRECISION = os.getenv("SEPARATOR_MODEL_PRECISION", "fp32")
+    # 流水线模式：人声分离按窗口产出，经有界队列交给 Whisper 边分离边转录，两个阶段重叠执行
+    # （不支持两级转录与转录检查点；中断重试时整体重新执行）
+    PIPELINED_SEPARATION = os.getenv("PIPELINED_SEPARATION", "false").lower() in ("1", "true", "yes")
+    # 分离窗口长度与重叠：流水线模式与内存交接（见 PERSIST_VOCAL）共用，每个窗口即一个转录片段
+    PIPELINE_WINDOW_S = float(os.getenv("PIPELINE_WINDOW_S", "60"))
+    PIPELINE_OVERLAP_S = 4.0
+    # 队列中等待转录的人声窗口上限，限制分离领先转录时的内存占用
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))
+    # 是否把分离出的人声写入 data/<HASH>/vocal/ 供下载。默认关闭：人声按 PIPELINE_WINDOW_S 窗口逐个分离，
+    # 以 16kHz 数组在内存中直接交给 Whisper，省去人声文件的编码与再次解码，峰值内存与媒体时长无关。
+    # 转录检查点按音轨与窗口记录，重试时已转录的窗口既不重新分离也不重新转录；
+    # 内存交接不支持两级转录与跨文件批处理，这些场景仍写人声文件
+    PERSIST_VOCAL = os.getenv("PERSIST_VOCAL", "false").lower() in ("1", "true", "yes")
+
+    # --- 中间产物格式 ---
+    # 音轨与人声在流水线内部的保存格式：flac（无损，默认）/ wav / mp3。
+    # 转码的音轨按人声分离模型所需的 44.1kHz 保存（重封装的音轨保留源采样率），人声由 Whisper 在解码管道中直接重采样到 16kHz 单声道，
+    # 全程不再经过有损编解码；面向用户的 MP3 仅在下载时按需编码
+    INTERMEDIATE_AUDIO_FORMAT = os.getenv("INTERMEDIATE_AUDIO_FORMAT", "flac")
+    SEPARATION_SAMPLE_RATE = 44100
+    # 源音轨编码可被下游直接读取（AAC / Opus / MP3 / FLAC 等）时以 -c:a copy 重封装，不再转码；
+    # 音轨保留源采样率（如 48kHz），人声分离与 Whisper 加载 PCM 时各自重采样。
+    # 此时音轨扩展名随源编码而定（如 .m4a），需通过 find_audio_artifact 查找
+    AUDIO_STREAM_COPY = os.getenv("AUDIO_STREAM_COPY", "true").lower() in ("1", "true", "yes")
+
+    # --- 成本预估 ---
+    # 各阶段耗时 / 音频时长的经验值，用于上传后根据缓存的媒体时长预估处理耗时（按部署硬件调整）
+    ESTIMATED_SEPARATION_RTF = float(os.getenv("ESTIMATED_SEPARATION_RTF", "0.25"))
+    ESTIMATED_TRANSCRIBE_RTF = float(os.getenv("ESTIMATED_TRANSCRIBE_RTF", "0.35"))
+
     # --- 其他配置 ---
     ALLOWED_EXTENSIONS = {'.mp4', '.mkv', '.avi', '.mov'}
 
@@ -41,6 +113,31 @@ class Config:
         """文本目录: data/<HASH>/text/"""
         return os.path.join(data_dir, file_hash, "text")
     
+    def get_audio_artifact(self, dir_fn, file_hash: str) -> str:
+        """音轨 / 人声中间产物路径: <dir>/<HASH>.<INTERMEDIATE_AUDIO_FORMAT>"""
+        return os.path.join(dir_fn(self.DATA_DIR, file_hash), f"{file_hash}.{self.INTERMEDIATE_AUDIO_FORMAT}")
+    
+    def find_audio_artifact(self, dir_fn, file_hash: str) -> Optional[str]:
+        """
+        查找已存在的音轨 / 人声产物 <HASH>.*（扩展名可能因重封装或旧数据而不同）。
+        优先当前中间格式，其次任意非 MP3 格式，按需编码出的 MP3 缓存排在最后。
+        """
+        preferred = self.get_audio_artifact(dir_fn, file_hash)
+        if os.path.exists(preferred):
+            return preferred
+        candidates = [
+            f for f in glob.glob(os.path.join(dir_fn(self.DATA_DIR, file_hash), f"{file_hash}.*"))
+            if ".part." not in f
+        ]
+        candidates.sort(key=lambda f: f.lower().endswith(".mp3"))
+        return candidates[0] if candidates else None
+    
+    def estimate_processing_seconds(self, duration: Optional[float]) -> Optional[float]:
+        """根据媒体时长预估完整流水线（人声分离 + 转录）的耗时，时长未知时返回 None"""
+        if not duration:
+            return None
+        return round(duration * (self.ESTIMATED_SEPARATION_RTF + self.ESTIMATED_TRANSCRIBE_RTF), 1)
+
     def ensure_hash_dirs(self, file_hash: str):
         """为某个 hash 创建完整的目录结构"""
         for dir_fn in [self.get_source_dir, self.get_track_dir, self.get_vocal_dir, self.get_text_dir]:
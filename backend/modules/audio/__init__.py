@@ -1 +1,4 @@
-from .faster_audio_processor import LongAudioProcessor
\ No newline at end of file
+from .faster_audio_processor import AudioProcessorConfig, LongAudioProcessor, TranscriptionStreamWriter
+from .model_registry import get_whisper_model, preload_whisper_model
+from .batch_engine import CrossFileBatcher, get_cross_file_batcher
+from .pcm import iter_array_windows, load_pcm, probe_duration, resample_pcm
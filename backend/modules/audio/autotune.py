@@ -0,0 +1,295 @@
+"""
+本机调优：在一段较短的参考音频上依次测试候选 compute_type、线程/进程划分与片段长度，
+把最快的组合按 (硬件, 设备, 模型) 写入缓存文件；LongAudioProcessor 初始化时自动读取。
+硬件以 CPU 型号、核数与 GPU 型号标识，容器重建后主机名改变也能命中；缓存默认保存在 DATA_DIR 下，
+Docker 中随数据卷持久化。
+
+用法（在 backend/ 目录下）：
+    python -m modules.audio.autotune --model medium
+    python -m modules.audio.autotune --model base --input reference.mp3 --device cpu
+
+搜索采用逐坐标方式：先固定其余参数选出最快的 compute_type，再在其基础上选线程划分，
+最后选片段长度，试验次数与候选数成线性关系。片段长度只在参考音频不短于候选长度
+MIN_REFERENCE_RATIO 倍时参与调优（否则测不到长任务中重叠带来的开销），默认不调优。
+"""
+import argparse
+import copy
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 与 config.DATA_DIR 的取值规则一致：Docker 中为 /data，本地为 backend/data
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CACHE_PATH = os.getenv(
+    "WHISPER_AUTOTUNE_CACHE",
+    os.path.join(os.getenv("DATA_DIR", os.path.join(_BACKEND_DIR, "data")), "whisper_autotune.json"),
+)
+
+# 调优结果字段 -> AudioProcessorConfig 属性
+PROFILE_FIELDS = {
+    "compute_type": "COMPUTE_TYPE",
+    "cpu_threads": "CPU_THREADS_PER_WORKER",
+    "parallel_workers": "PARALLEL_WORKERS",
+    "segment_length_ms": "SEGMENT_LENGTH_MS",
+}
+
+# 片段长度候选要求参考音频至少为其若干倍，保证测量中包含多个片段及其重叠
+MIN_REFERENCE_RATIO = 3
+
+COMPUTE_TYPE_CANDIDATES = {
+    "cpu": ["int8", "int8_float32", "int16", "float32"],
+    "cuda": ["float16", "int8_float16", "int8", "float32"],
+}
+
+
+def _cpu_model() -> str:
+    """CPU 型号：优先读取 /proc/cpuinfo，其他平台退回 platform.processor()"""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine() or "unknown"
+
+
+def _gpu_model() -> str:
+    try:
+        import torch
+        return torch.cuda.get_device_name(0)
+    except Exception:
+        return "unknown"
+
+
+def _hardware_id(device: str) -> str:
+    """硬件标识：CPU 型号与核数，GPU 推理时附加 GPU 型号"""
+    hardware = f"{_cpu_model()} x{os.cpu_count() or 1}"
+    if device == "cuda":
+        hardware += f" / {_gpu_model()}"
+    return hardware
+
+
+def _profile_key(model_size: str, device: str) -> str:
+    return f"{_hardware_id(device)}|{device}|{model_size}"
+
+
+def _read_cache(cache_path: str) -> Dict:
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"读取调优缓存失败 {cache_path}: {e}")
+        return {}
+
+
+def load_tuned_profile(model_size: str, device: str, cache_path: Optional[str] = None) -> Optional[Dict]:
+    """
+    读取当前硬件对应 (设备, 模型) 的调优结果
+    Returns:
+        调优结果字典，未调优时返回 None
+    """
+    return _read_cache(cache_path or DEFAULT_CACHE_PATH).get(_profile_key(model_size, device))
+
+
+def save_tuned_profile(model_size: str, device: str, profile: Dict, cache_path: Optional[str] = None) -> str:
+    """写入调优结果（原子替换，同一文件可保存多种硬件/多个模型的结果）"""
+    cache_path = cache_path or DEFAULT_CACHE_PATH
+    cache = _read_cache(cache_path)
+    cache[_profile_key(model_size, device)] = profile
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    temp_path = f"{cache_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, cache_path)
+    return cache_path
+
+
+def apply_tuned_profile(config, model_size: str, device: str):
+    """
+    将调优结果应用到配置上（返回副本，不修改传入的配置对象）。
+    显式设置的 COMPUTE_TYPE 优先于调优结果；片段长度不超过两倍重叠，或参考音频短于其 MIN_REFERENCE_RATIO 倍时
+    忽略该项（前者使固定分割模式无法前进，后者未测量重叠开销）。
+    """
+    profile = load_tuned_profile(model_size, device, config.AUTOTUNE_CACHE)
+    if not profile:
+        return config
+    tuned = copy.copy(config)
+    for field, attr in PROFILE_FIELDS.items():
+        if field not in profile:
+            continue
+        if attr == "COMPUTE_TYPE" and tuned.COMPUTE_TYPE:
+            continue
+        if attr == "SEGMENT_LENGTH_MS" and (
+            profile[field] <= 2 * tuned.OVERLAP_MS
+            or profile.get("reference_seconds", 0) * 1000 < MIN_REFERENCE_RATIO * profile[field]
+        ):
+            continue
+        setattr(tuned, attr, profile[field])
+    applied = ", ".join(f"{k}={profile[k]}" for k in PROFILE_FIELDS if k in profile)
+    logger.info(f"已应用本机调优结果: {applied}")
+    return tuned
+
+
+def _supported_compute_types(device: str) -> List[str]:
+    """过滤出当前设备实际支持的 compute_type，避免加载时静默回退导致测得的并非候选精度"""
+    candidates = COMPUTE_TYPE_CANDIDATES.get(device, ["float32"])
+    try:
+        import ctranslate2
+        supported = ctranslate2.get_supported_compute_types(device)
+    except Exception as e:
+        logger.warning(f"无法查询支持的 compute_type: {e}; 使用全部候选")
+        return candidates
+    return [c for c in candidates if c in supported]
+
+
+def _thread_layouts(cores: int) -> List[Tuple[int, int]]:
+    """候选 (工作进程数, 每进程线程数)：单进程满线程/半线程，以及 2、4 进程均分"""
+    layouts = [(1, cores), (1, max(1, cores // 2)), (2, max(1, cores // 2)), (4, max(1, cores // 4))]
+    return [layout for i, layout in enumerate(layouts) if layout not in layouts[:i] and layout[0] <= cores]
+
+
+def _measure(audio_path: str, duration_s: float, model_size: str, device: str, params: Dict) -> float:
+    """
+    以给定参数完整转录参考音频一次，返回实时率（耗时 / 音频时长）。
+    模型加载与进程池启动不计入耗时；试验结束后从模型注册表中移除本次加载的模型，避免候选模型累积占用内存。
+    """
+    from .faster_audio_processor import AudioProcessorConfig, LongAudioProcessor, shutdown_process_pools
+    from .model_registry import evict_whisper_model
+
+    config = AudioProcessorConfig()
+    config.AUTOTUNE = False
+    # 只测量解码吞吐：语音分布图对所有候选的开销相同，且可能把合成音频整体判为非语音
+    config.SPEECH_MAP_ENABLED = False
+    for field, attr in PROFILE_FIELDS.items():
+        if field in params:
+            setattr(config, attr, params[field])
+
+    processor = LongAudioProcessor(model_size=model_size, device_override=device, config=config)
+    try:
+        processor.warm_up()
+        start = time.perf_counter()
+        processor.process_long_audio(audio_path)
+        rtf = (time.perf_counter() - start) / duration_s
+    finally:
+        shutdown_process_pools()
+        evict_whisper_model(model_size, processor.device, processor.compute_type, processor.cpu_threads)
+    logger.info(f"试验 {params}: RTF={rtf:.3f}")
+    return rtf
+
+
+def _best(audio_path: str, duration_s: float, model_size: str, device: str,
+          base: Dict, base_rtf: float, field_options: List[Dict], trials: List[Dict]) -> Tuple[Dict, float]:
+    """
+    在 base 基础上依次尝试 field_options 中的每组取值，返回最快的参数组合及其 RTF。
+    与 base 相同的组合直接沿用 base_rtf，不再重复测量。
+    """
+    best_params, best_rtf = base, base_rtf
+    for option in field_options:
+        params = dict(base, **option)
+        if params == base and base_rtf != float("inf"):
+            continue
+        try:
+            rtf = _measure(audio_path, duration_s, model_size, device, params)
+        except Exception as e:
+            logger.warning(f"试验 {params} 失败: {e}")
+            continue
+        trials.append(dict(params, rtf=round(rtf, 4)))
+        if rtf < best_rtf:
+            best_params, best_rtf = params, rtf
+    return best_params, best_rtf
+
+
+def calibrate(audio_path: str, model_size: str, device: str,
+              chunk_seconds: List[int], duration_s: Optional[float] = None) -> Dict:
+    """
+    逐坐标搜索最快配置
+    Args:
+        audio_path: 参考音频
+        model_size: Whisper 模型大小
+        device: 推理设备
+        chunk_seconds: 候选片段长度（秒），参考音频短于其 MIN_REFERENCE_RATIO 倍的候选会被跳过
+        duration_s: 参考音频时长，默认通过 ffprobe 获取
+    Returns:
+        调优结果字典（含全部试验记录）
+    """
+    from .faster_audio_processor import AudioProcessorConfig
+    from .pcm import probe_duration
+
+    duration_s = duration_s or probe_duration(audio_path)
+    cores = os.cpu_count() or 1
+    trials: List[Dict] = []
+
+    # 1. compute_type（单进程、满线程）
+    base = {"parallel_workers": 1, "cpu_threads": cores if device == "cpu" else 0}
+    options = [{"compute_type": c} for c in _supported_compute_types(device)]
+    best, rtf = _best(audio_path, duration_s, model_size, device, base, float("inf"), options, trials)
+
+    # 2. 线程 / 进程划分（进程池仅 CPU 生效）
+    if device == "cpu":
+        options = [{"parallel_workers": w, "cpu_threads": t} for w, t in _thread_layouts(cores)]
+        best, rtf = _best(audio_path, duration_s, model_size, device, best, rtf, options, trials)
+
+    # 3. 片段长度：必须大于两倍重叠，且参考音频足够长，使每个候选都被切分为多个带重叠的片段
+    min_ms = 2 * AudioProcessorConfig.OVERLAP_MS
+    options = [
+        {"segment_length_ms": s * 1000} for s in chunk_seconds
+        if min_ms < s * 1000 and MIN_REFERENCE_RATIO * s <= duration_s
+    ]
+    if chunk_seconds and not options:
+        logger.warning(f"参考音频 {duration_s:.0f}s 不足候选片段长度的 {MIN_REFERENCE_RATIO} 倍，跳过片段长度调优")
+    if options:
+        best, rtf = _best(audio_path, duration_s, model_size, device, best, rtf, options, trials)
+
+    if rtf == float("inf"):
+        raise RuntimeError("所有调优试验均失败")
+    return dict(
+        best,
+        rtf=round(rtf, 4),
+        reference_seconds=round(duration_s, 1),
+        tuned_at=time.strftime("%Y-%m-%d %H:%M:%S"),
+        trials=trials,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在本机上为 Whisper 转录选择最快的 compute_type / 线程 / 片段长度")
+    parser.add_argument("--model", default="medium", help="Whisper 模型大小")
+    parser.add_argument("--device", help="推理设备，默认自动检测")
+    parser.add_argument("--input", help="参考音频；不提供时生成确定性合成音频")
+    parser.add_argument("--duration", type=float, default=180, help="合成参考音频时长（秒）")
+    parser.add_argument("--chunk-seconds", default="",
+                        help=f"候选片段长度（秒，逗号分隔），默认不调优；需大于两倍重叠，"
+                             f"且参考音频至少为其 {MIN_REFERENCE_RATIO} 倍"),
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="调优缓存文件路径")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    from .model_registry import resolve_device
+
+    device = resolve_device(args.device)
+    chunk_seconds = [int(s) for s in args.chunk_seconds.split(",") if s.strip()]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        audio_path = args.input
+        if not audio_path:
+            from benchmark.synthetic import write_synthetic_audio
+            audio_path = write_synthetic_audio(os.path.join(work_dir, "reference.wav"), args.duration)
+        profile = calibrate(audio_path, args.model, device, chunk_seconds)
+
+    path = save_tuned_profile(args.model, device, profile, args.cache)
+    summary = {k: profile[k] for k in list(PROFILE_FIELDS) + ["rtf"] if k in profile}
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    print(f"调优结果已写入 {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+跨文件批处理引擎：收集多个排队文件的语音窗口，拼接后通过一次 BatchedInferencePipeline
+调用完成批量编码/解码，再把每段结果路由回各自的文件。
+
+适用于大量短音频：单个文件往往凑不满一个 batch，逐个调用时每次都要支付固定开销；
+合并后多个文件的窗口共享同一批次，提升繁忙 worker 的整体吞吐。
+（需要 worker 以线程/协程池并发执行多个任务，排队的文件才会被合并到同一批次。）
+"""
+import bisect
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+try:
+    from faster_whisper import BatchedInferencePipeline
+except ImportError:
+    BatchedInferencePipeline = None
+
+from .faster_audio_processor import TRANSCRIBE_KWARGS
+from .model_registry import default_compute_type, get_whisper_model, resolve_device
+from .pcm import SAMPLE_RATE, load_pcm
+
+logger = logging.getLogger(__name__)
+
+
+def _pack_windows(speech: List[Dict], max_samples: int) -> List[Dict]:
+    """
+    把相邻的语音段依次打包为连续窗口：窗口从首段起点到末段终点，总跨度不超过 max_samples，
+    段间的短静音随窗口保留（BatchedInferencePipeline 把每个 clip_timestamps 条目作为一段连续音频转录）
+    Args:
+        speech: get_speech_timestamps 的输出 [{"start", "end"}, ...]（样本下标，升序）
+        max_samples: 单个窗口的最大样本数
+    Returns:
+        [{"start", "end"}, ...]
+    """
+    windows: List[Dict] = []
+    for segment in speech:
+        if windows and segment["end"] - windows[-1]["start"] <= max_samples:
+            windows[-1]["end"] = segment["end"]
+        else:
+            windows.append({"start": segment["start"], "end": segment["end"]})
+    return windows
+
+
+def _route_segments(segments: Iterable, offsets: List[int], count: int,
+                    sample_rate: int = SAMPLE_RATE) -> List[List[Dict]]:
+    """
+    把拼接音频上的转录段落路由回各自的文件：按段落起点所在的文件偏移归属，
+    并把时间戳还原为该文件自身的时间轴
+    Args:
+        segments: 带 start / end / text 属性的段落（秒，拼接音频时间轴）
+        offsets: 各文件在拼接音频中的起始样本，升序
+        count: 文件数
+        sample_rate: 拼接音频的采样率
+    Returns:
+        与文件一一对应的段落字典列表
+    """
+    per_file: List[List[Dict]] = [[] for _ in range(count)]
+    for seg in segments:
+        index = bisect.bisect_right(offsets, int(seg.start * sample_rate)) - 1
+        offset_s = offsets[index] / sample_rate
+        per_file[index].append({
+            "start": seg.start - offset_s,
+            "end": seg.end - offset_s,
+            "text": seg.text,
+        })
+    return per_file
+
+
+class CrossFileBatcher:
+    """
+    跨文件批处理引擎。
+
+    用法：
+        batcher = CrossFileBatcher("medium")
+        future = batcher.submit("a.mp3")     # 线程安全，可在多个任务线程中调用
+        result = future.result()             # 与 process_long_audio 相同格式的结果字典
+    """
+
+    def __init__(self, model_size: str = "base", device_override: Optional[str] = None,
+                 batch_size: int = 16, max_files: int = 8, max_wait_s: float = 2.0,
+                 window_s: int = 30, gap_s: float = 1.0):
+        """
+        Args:
+            model_size: Whisper 模型大小
+            device_override: 强制指定设备（默认自动检测，CPU 同样支持批处理）
+            batch_size: 每次编码/解码的窗口数
+            max_files: 单批最多合并的文件数
+            max_wait_s: 收到首个文件后最多等待多久以凑批
+            window_s: 单个语音窗口的最大长度（Whisper 输入上限 30 秒）
+            gap_s: 拼接时文件之间插入的静音，保证窗口不会跨越文件边界
+        """
+        if BatchedInferencePipeline is None:
+            raise RuntimeError("当前 faster-whisper 版本不支持 BatchedInferencePipeline，无法启用跨文件批处理")
+
+        device = resolve_device(device_override)
+        model = get_whisper_model(model_size, device, default_compute_type(device))
+        self.pipeline = BatchedInferencePipeline(model=model)
+        self.batch_size = batch_size
+        self.max_files = max_files
+        self.max_wait_s = max_wait_s
+        self.window_s = window_s
+        self.gap_s = gap_s
+
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="cross-file-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, audio_path: str) -> Future:
+        """提交一个文件，返回其转录结果的 Future"""
+        future = Future()
+        self._queue.put((audio_path, future))
+        return future
+
+    def _run(self) -> None:
+        """后台线程：阻塞等待首个文件，再在 max_wait_s 内尽量凑满一批"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait_s
+            while len(batch) < self.max_files:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            paths = [path for path, _ in batch]
+            try:
+                results = self.transcribe_files(paths)
+            except Exception as e:
+                logger.error(f"跨文件批处理失败: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _speech_windows(self, audio: np.ndarray) -> List[Dict]:
+        """对单个文件运行 VAD，并把语音段打包为不超过 window_s 的窗口（样本下标）"""
+        vad_options = VadOptions(max_speech_duration_s=self.window_s, min_silence_duration_ms=160)
+        return _pack_windows(get_speech_timestamps(audio, vad_options=vad_options), self.window_s * SAMPLE_RATE)
+
+    def transcribe_files(self, paths: List[str]) -> List[Dict]:
+        """
+        同步转录一批文件：拼接所有文件的语音窗口，一次批量推理后按时间偏移路由回各文件
+        Args:
+            paths: 音频文件路径列表
+        Returns:
+            与 paths 一一对应的结果字典 {"text", "segments", "language"}
+        """
+        start = time.perf_counter()
+        gap = np.zeros(int(self.gap_s * SAMPLE_RATE), dtype=np.float32)
+
+        pieces = []
+        offsets = []
+        clip_timestamps = []
+        position = 0
+        for path in paths:
+            audio = load_pcm(path)
+            offsets.append(position)
+            # BatchedInferencePipeline 的 clip_timestamps 以秒为单位
+            for window in self._speech_windows(audio):
+                clip_timestamps.append({
+                    "start": (position + window["start"]) / SAMPLE_RATE,
+                    "end": (position + window["end"]) / SAMPLE_RATE,
+                })
+            pieces.extend([audio, gap])
+            position += len(audio) + len(gap)
+
+        per_file: List[List[Dict]] = [[] for _ in paths]
+        language = TRANSCRIBE_KWARGS.get("language")
+        if clip_timestamps:
+            transcribe_kwargs = {k: v for k, v in TRANSCRIBE_KWARGS.items() if k not in ("vad_filter", "vad_parameters")}
+            segments_iter, info = self.pipeline.transcribe(
+                np.concatenate(pieces),
+                clip_timestamps=clip_timestamps,
+                vad_filter=False,
+                batch_size=self.batch_size,
+                **transcribe_kwargs,
+            )
+            language = getattr(info, "language", None) or language
+            per_file = _route_segments(segments_iter, offsets, len(paths))
+
+        logger.info(
+            f"跨文件批处理完成: {len(paths)} 个文件, {len(clip_timestamps)} 个语音窗口, "
+            f"耗时 {time.perf_counter() - start:.2f}s"
+        )
+        return [
+            {
+                "text": " ".join(s["text"] for s in segments),
+                "segments": segments,
+                "language": language,
+            }
+            for segments in per_file
+        ]
+
+
+_BATCHERS: Dict[str, CrossFileBatcher] = {}
+_LOCK = threading.Lock()
+
+
+def get_cross_file_batcher(model_size: str, **kwargs) -> CrossFileBatcher:
+    """获取进程内共享的批处理引擎（按模型大小缓存），所有任务线程向同一队列提交"""
+    with _LOCK:
+        batcher = _BATCHERS.get(model_size)
+        if batcher is None:
+            batcher = CrossFileBatcher(model_size, **kwargs)
+            _BATCHERS[model_size] = batcher
+        return batcher
@@ -0,0 +1,100 @@
+"""
+分片转录检查点：每个片段转录完成后立即落盘，任务崩溃重试时只需转录缺失的片段。
+
+目录结构：
+    <checkpoint_dir>/manifest.json     指纹 + 已完成片段序号
+    <checkpoint_dir>/chunk_0000.json   第 0 个片段的转录结果
+"""
+import json
+import logging
+import os
+import shutil
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionCheckpoint:
+    """
+    转录检查点管理器。指纹（源文件 + 分割参数 + 模型）不一致时自动丢弃旧检查点，
+    保证重用的片段与本次运行的分割边界完全一致。
+    """
+
+    MANIFEST = "manifest.json"
+
+    def __init__(self, directory: str, fingerprint: Dict):
+        """
+        Args:
+            directory: 检查点目录
+            fingerprint: 本次运行的指纹，与已有 manifest 不一致时清空检查点
+        """
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self.completed = set()
+
+        manifest = self._read_json(os.path.join(directory, self.MANIFEST))
+        if manifest and manifest.get("fingerprint") == fingerprint:
+            self.completed = set(manifest.get("completed", []))
+            logger.info(f"发现转录检查点，已完成 {len(self.completed)} 个片段: {directory}")
+        else:
+            if manifest:
+                logger.info("检查点指纹不匹配（源文件或参数已变化），丢弃旧检查点")
+            self.clear()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def fingerprint_for(audio_path: str, **params) -> Dict:
+        """根据源文件大小/修改时间及分割、模型参数生成指纹"""
+        stat = os.stat(audio_path)
+        return {
+            "source": os.path.basename(audio_path),
+            "size": stat.st_size,
+            "mtime": int(stat.st_mtime),
+            **params,
+        }
+
+    def has(self, index: int) -> bool:
+        return index in self.completed
+
+    def load(self, index: int) -> Optional[Dict]:
+        """读取已完成片段的转录结果，文件损坏时返回 None 并视为未完成"""
+        result = self._read_json(self._chunk_path(index))
+        if result is None:
+            self.completed.discard(index)
+        return result
+
+    def save(self, index: int, result: Dict) -> None:
+        """写入片段结果，再更新 manifest（均为原子替换，崩溃时不会留下半截文件）"""
+        self._write_json(self._chunk_path(index), result)
+        self.completed.add(index)
+        self._write_json(os.path.join(self.directory, self.MANIFEST), {
+            "fingerprint": self.fingerprint,
+            "completed": sorted(self.completed),
+        })
+
+    def clear(self) -> None:
+        """删除全部检查点（转录成功完成后调用）"""
+        self.completed = set()
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _chunk_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"chunk_{index:04d}.json")
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[Dict]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取检查点文件失败 {path}: {e}")
+            return None
+
+    @staticmethod
+    def _write_json(path: str, data: Dict) -> None:
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
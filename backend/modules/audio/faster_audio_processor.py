@@ -1,19 +1,24 @@
 import os
-import tempfile
+import copy
 import logging
-from typing import List, Tuple, Dict, Optional
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, List, Tuple, Dict, Optional, Union, Iterator
+import numpy as np
 from pydub import AudioSegment
 try:
-    from faster_whisper import WhisperModel, BatchedInferencePipeline
+    from faster_whisper import BatchedInferencePipeline
 except ImportError:
-    from faster_whisper import WhisperModel
     BatchedInferencePipeline = None
 
-# 尝试导入 torch 以检测 GPU 可用性；若不可用则设为 None
-try:
-    import torch
-except Exception:
-    torch = None
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+from .checkpoint import TranscriptionCheckpoint
+from .autotune import apply_tuned_profile
+from .model_registry import default_compute_type, get_whisper_model, load_whisper_model, resolve_device
+from .speech_map import build_speech_map
+from .pcm import SAMPLE_RATE, PcmStream, iter_pcm_windows, load_pcm, probe_duration
 
 # 导入进度条库
 try:
@@ -54,11 +59,386 @@ class AudioProcessorConfig:
     SEGMENT_LENGTH_MS = 15 * 60 * 1000  # 15分钟
     OVERLAP_MS = 30 * 1000  # 30秒
     
+    # 分割模式：
+    #   "fixed" - 按 SEGMENT_LENGTH_MS 固定切分，相邻片段重叠 OVERLAP_MS，合并时去除重复
+    #   "vad"   - 在每个片段末尾 VAD_SEARCH_MS 范围内用 VAD 寻找静音并在静音中点切分，
+    #             片段之间无重叠，合并时直接拼接
+    SEGMENTATION_MODE = "fixed"
+    VAD_SEARCH_MS = 60 * 1000  # 60秒
+    VAD_MIN_SILENCE_MS = 300  # 可作为切点的最短静音
+    
+    # 解码配置：音频经 ffmpeg 管道一次性解码为该采样率的单声道 float32 数组
+    SAMPLE_RATE = SAMPLE_RATE
+    
+    # 两级转录：设置 DRAFT_MODEL_SIZE（如 "tiny" / "base"）后，先用小模型转录全文并立即发布草稿，
+    # 再用主模型只重新转录低置信度段落（两侧各附加 REFINE_PADDING_MS 上下文）
+    DRAFT_MODEL_SIZE = None
+    REFINE_PADDING_MS = 500
+    
+    # 低置信度判定：avg_logprob 低于阈值或 compression_ratio 高于阈值
+    CONFIDENCE_LOGPROB_THRESHOLD = -1.0
+    CONFIDENCE_COMPRESSION_RATIO_THRESHOLD = 2.4
+    
+    # 自适应解码：先以贪心解码（beam_size=1）转录，只对未通过上述置信度阈值的窗口
+    # 用 BEAM_SIZE 重新解码（两侧各附加 BEAM_PADDING_MS 上下文）；关闭时所有片段均使用 BEAM_SIZE。
+    # 默认关闭：通过阈值的段落保留贪心结果，质量可能略低于全程 beam 解码，启用前请在实际素材上对比
+    ADAPTIVE_BEAM = False
+    BEAM_SIZE = 5
+    BEAM_PADDING_MS = 500
+    
+    # 语音分布图：解码前先检测语音区域，只把语音部分（拼接为紧凑数组）交给 Whisper，
+    # 时间戳再映射回原始时间轴。SPEECH_MAP_METHOD 为 "silero"（可剔除背景音乐）或 "energy"（能量门限，开销最低）。
+    # 默认关闭：开启后分段与转录结果会随之变化，启用前请在实际素材上对比
+    SPEECH_MAP_ENABLED = False
+    SPEECH_MAP_METHOD = "silero"
+    SPEECH_MAP_PAD_MS = 200  # 每个语音区域两侧保留的余量
+    SPEECH_MAP_MIN_GAP_MS = 1000  # 间隔小于该值的语音区域合并
+    
+    # 批量推理：None 表示仅在 GPU 上启用 BatchedInferencePipeline，True / False 强制开关
+    BATCHED_INFERENCE = None
+    BATCH_SIZE = 24
+    
+    # 计算精度：None 表示按设备选择（GPU float16，CPU int8）
+    COMPUTE_TYPE = None
+    
+    # 本机调优（需显式开启）：启用时初始化处理器会读取 `python -m modules.audio.autotune` 写入的缓存，
+    # 用其中的 compute_type / 线程划分 / 片段长度覆盖本配置；AUTOTUNE_CACHE 为 None 时使用默认路径
+    AUTOTUNE = False
+    AUTOTUNE_CACHE = None
+    
+    # 并行配置（仅 CPU 生效）：PARALLEL_WORKERS > 1 时将片段分发到进程池，
+    # 每个工作进程持有独立的 WhisperModel
+    PARALLEL_WORKERS = 1
+    CPU_THREADS_PER_WORKER = 0  # 0 表示按 os.cpu_count() // PARALLEL_WORKERS 自动划分
+    
     # 输出配置
-    TEMP_AUDIO_FORMAT = "wav"
     OUTPUT_ENCODING = "utf-8"
 
 
+# 转录参数：串行与进程池路径共用
+TRANSCRIBE_KWARGS = {
+    "language": "zh",
+    # 引导模型使用标点。这里使用陈述句而非指令，既能提示标点又能避免命令式幻觉
+    "initial_prompt": "简体中文，句子之间有标点符号，断句清晰。",
+    "beam_size": 5,
+    "vad_filter": True,
+    # 放宽静音阈值到 1000ms。过短的阈值(如500ms)会切断句子中间的停顿，导致上下文丢失，模型无法判断标点
+    "vad_parameters": dict(min_silence_duration_ms=2000),
+    "condition_on_previous_text": False
+}
+
+
+def _iter_transcribe_array(model, audio: np.ndarray, segment_start_ms: int,
+                           transcribe_kwargs: Dict) -> Tuple[Iterator[Dict], Optional[str]]:
+    """
+    使用给定模型转录 PCM 数组。faster-whisper 的 segments 是惰性生成的，
+    这里同样返回惰性迭代器：每解码出一段就立即产出（时间戳已平移到原始音频时间轴）。
+    Returns:
+        (片段字典迭代器, 检测到的语言)
+    """
+    segments_iter, info = model.transcribe(audio, **transcribe_kwargs)
+    segment_start_s = segment_start_ms / 1000.0
+
+    def shifted() -> Iterator[Dict]:
+        for seg in segments_iter:
+            yield {
+                "start": seg.start + segment_start_s,
+                "end": seg.end + segment_start_s,
+                "text": seg.text,
+                # 置信度指标，供两级转录 / 自适应解码判断是否需要重新解码
+                "avg_logprob": seg.avg_logprob,
+                "compression_ratio": seg.compression_ratio,
+            }
+
+    language = getattr(info, "language", None) if info is not None else None
+    return shifted(), language
+
+
+def _transcribe_array(model, audio: np.ndarray, segment_start_ms: int, transcribe_kwargs: Dict) -> Dict:
+    """
+    使用给定模型转录 PCM 数组，并将时间戳平移到原始音频时间轴
+    """
+    segments_iter, language = _iter_transcribe_array(model, audio, segment_start_ms, transcribe_kwargs)
+
+    # 构建与原来兼容的 result 字典
+    result_segments = list(segments_iter)
+    return {
+        "text": " ".join([s["text"] for s in result_segments]),
+        "segments": result_segments,
+        "language": language
+    }
+
+
+def _is_low_confidence(segment: Dict, thresholds: Dict) -> bool:
+    """根据 avg_logprob / compression_ratio 判断段落是否为低置信度"""
+    return (segment.get("avg_logprob", 0.0) < thresholds["logprob"]
+            or segment.get("compression_ratio", 0.0) > thresholds["compression_ratio"])
+
+
+def _low_confidence_windows(segments: List[Dict], thresholds: Dict) -> List[Tuple[int, int]]:
+    """
+    找出需要重新解码的窗口：相邻的低置信度段落合并为一个窗口
+    Returns:
+        [(首段下标, 末段下标 + 1), ...]
+    """
+    windows = []
+    for i, seg in enumerate(segments):
+        if not _is_low_confidence(seg, thresholds):
+            continue
+        if windows and windows[-1][1] == i:
+            windows[-1] = (windows[-1][0], i + 1)
+        else:
+            windows.append((i, i + 1))
+    return windows
+
+
+def _replace_window(old_segments: List[Dict], new_segments: List[Dict]) -> List[Dict]:
+    """
+    用重新解码的结果替换窗口内的原段落。重新解码的音频两侧带有上下文填充，
+    只保留中点落在原窗口时间范围内的段落，避免与相邻段落重复。
+    """
+    window_start = old_segments[0]["start"]
+    window_end = old_segments[-1]["end"]
+    kept = [seg for seg in new_segments if window_start <= (seg["start"] + seg["end"]) / 2 <= window_end]
+    return kept or old_segments
+
+
+def _new_decode_stats() -> Dict:
+    """
+    片段解码计数器：自适应解码的贪心段落数、重新解码的窗口/段落数及音频时长，
+    以及语音分布图保留/跳过的音频时长
+    """
+    return {
+        "segments": 0, "beam_windows": 0, "beam_segments": 0, "beam_seconds": 0.0,
+        "speech_seconds": 0.0, "skipped_seconds": 0.0,
+    }
+
+
+def _iter_adaptive_transcribe(model, audio: np.ndarray, segment_start_ms: int, transcribe_kwargs: Dict,
+                              policy: Dict, stats: Dict) -> Tuple[Iterator[Dict], Optional[str]]:
+    """
+    自适应解码：先贪心解码整个片段，连续的低置信度段落暂存为一个窗口，
+    遇到下一个高置信度段落（或片段结束）时从片段数组中切出该窗口，用 beam search 重新解码后替换。
+    高置信度段落仍然即时产出，流式输出不受影响。
+    Args:
+        policy: {"beam_size", "padding_ms", "sample_rate", "thresholds"}
+        stats: 计数器字典（见 _new_decode_stats），原地累加
+    Returns:
+        (片段字典迭代器, 检测到的语言)
+    """
+    greedy_kwargs = dict(transcribe_kwargs, beam_size=1)
+    beam_kwargs = dict(transcribe_kwargs, beam_size=policy["beam_size"])
+    segments_iter, language = _iter_transcribe_array(model, audio, segment_start_ms, greedy_kwargs)
+    segment_start_s = segment_start_ms / 1000.0
+    padding_s = policy["padding_ms"] / 1000.0
+    
+    def redecode(pending: List[Dict]) -> List[Dict]:
+        start_s = max(0.0, pending[0]["start"] - segment_start_s - padding_s)
+        end_s = pending[-1]["end"] - segment_start_s + padding_s
+        sample_rate = policy["sample_rate"]
+        window = audio[int(start_s * sample_rate):int(end_s * sample_rate)]
+        result = _transcribe_array(model, window, segment_start_ms + int(start_s * 1000), beam_kwargs)
+        stats["beam_windows"] += 1
+        stats["beam_segments"] += len(pending)
+        stats["beam_seconds"] += pending[-1]["end"] - pending[0]["start"]
+        return _replace_window(pending, result["segments"])
+    
+    def adaptive() -> Iterator[Dict]:
+        pending = []
+        for seg in segments_iter:
+            stats["segments"] += 1
+            if _is_low_confidence(seg, policy["thresholds"]):
+                pending.append(seg)
+                continue
+            if pending:
+                yield from redecode(pending)
+                pending = []
+            yield seg
+        if pending:
+            yield from redecode(pending)
+    
+    return adaptive(), language
+
+
+def _iter_chunk(model, audio: np.ndarray, segment_start_ms: int, transcribe_kwargs: Dict,
+                policy: Optional[Dict], speech_options: Optional[Dict],
+                stats: Dict) -> Tuple[Iterator[Dict], Optional[str]]:
+    """
+    转录单个片段的统一入口（串行与进程池共用）：
+      1. 提供 speech_options 时先构建语音分布图，只把语音区域拼成的紧凑数组交给 Whisper，
+         产出的段落再映射回原始时间轴。Silero 语音分布图已剔除非语音，此时关闭 Whisper 内置的
+         vad_filter，避免同一段音频运行两次 Silero；能量检测无法区分音乐，批量推理依赖内置 VAD
+         把音频切为 30 秒以内的批次，这两种情况保留 vad_filter
+      2. 提供 policy 时使用自适应解码，否则按 transcribe_kwargs 直接解码
+    Returns:
+        (片段字典迭代器, 检测到的语言)
+    """
+    speech_map = None
+    origin_ms = segment_start_ms
+    if speech_options is not None:
+        speech_map = build_speech_map(audio, **speech_options)
+        sample_rate = speech_options["sample_rate"]
+        stats["speech_seconds"] += speech_map.speech_samples / sample_rate
+        stats["skipped_seconds"] += (len(audio) - speech_map.speech_samples) / sample_rate
+        if not speech_map.regions:
+            logger.info("片段中未检测到语音，跳过转录")
+            return iter(()), None
+        audio = speech_map.compact(audio)
+        origin_ms = 0
+        if speech_options["method"] == "silero" and "batch_size" not in transcribe_kwargs:
+            transcribe_kwargs = dict(transcribe_kwargs, vad_filter=False)
+    
+    if policy is not None:
+        segments_iter, language = _iter_adaptive_transcribe(model, audio, origin_ms, transcribe_kwargs, policy, stats)
+    else:
+        segments_iter, language = _iter_transcribe_array(model, audio, origin_ms, transcribe_kwargs)
+    
+    if speech_map is not None:
+        origin_s = segment_start_ms / 1000.0
+        segments_iter = (speech_map.remap(seg, origin_s) for seg in segments_iter)
+    return segments_iter, language
+
+
+def _transcribe_chunk(model, audio: np.ndarray, segment_start_ms: int, transcribe_kwargs: Dict,
+                      policy: Optional[Dict] = None, speech_options: Optional[Dict] = None) -> Dict:
+    """
+    转录一个完整片段，计数器记录在结果的 decode_stats 中
+    """
+    stats = _new_decode_stats()
+    segments_iter, language = _iter_chunk(model, audio, segment_start_ms, transcribe_kwargs, policy, speech_options, stats)
+    result_segments = list(segments_iter)
+    return {
+        "text": " ".join([s["text"] for s in result_segments]),
+        "segments": result_segments,
+        "language": language,
+        "decode_stats": stats,
+    }
+
+
+class _SegmentMerger:
+    """
+    增量合并转录片段：按产出顺序逐个判断，丢弃开始时间早于已保留片段结束时间的重叠片段。
+    concatenate 为 True 时（片段之间无重叠）全部保留。
+    """
+
+    def __init__(self, concatenate: bool = False):
+        self.concatenate = concatenate
+        self.last_end = 0
+        self.accepted = 0
+        self.overlap_count = 0
+
+    def accept(self, segment: Dict) -> bool:
+        """返回该片段是否应保留"""
+        start = segment["start"]
+        end = segment["end"]
+        
+        # 如果这个片段在前一个片段结束后才开始
+        if self.concatenate or start >= self.last_end or not self.accepted:
+            self.accepted += 1
+            self.last_end = end
+            return True
+        
+        # 计算重叠
+        overlap = self.last_end - start
+        if overlap > 0:
+            self.overlap_count += 1
+            logger.debug(f"检测到重叠: {overlap:.2f}秒，跳过此片段")
+        return False
+
+    def log_summary(self) -> None:
+        if self.overlap_count > 0:
+            logger.info(f"检测到 {self.overlap_count} 个重叠片段，已处理")
+
+
+class TranscriptionStreamWriter:
+    """
+    渐进式写入转录文本：每产出一个片段就追加一行并立即 flush，
+    转录过程中即可读取已完成的部分。
+    """
+
+    def __init__(self, output_path: str, encoding: str = "utf-8"):
+        self.output_path = output_path
+        self.encoding = encoding
+        self.count = 0
+        self._file = None
+
+    def __enter__(self) -> "TranscriptionStreamWriter":
+        self._file = open(self.output_path, "w", encoding=self.encoding)
+        self._file.write("# 音频转录结果\n")
+        self._file.write("状态: 转录中\n\n")
+        self._file.write("## 时间戳文本\n")
+        self._file.flush()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._file.close()
+
+    def write_segment(self, segment: Dict) -> None:
+        time_str = LongAudioProcessor._format_timestamp_range(segment["start"], segment["end"])
+        self._file.write(f"\n[{time_str}] {segment['text']}")
+        self._file.flush()
+        self.count += 1
+
+
+# --- 进程池工作进程 ---
+# 每个工作进程在初始化时加载一次模型，之后处理的所有片段复用该实例
+_WORKER_MODEL = None
+
+# 进程池按 (model_size, compute_type, workers, cpu_threads) 缓存，在进程生命周期内复用
+_WORKER_POOLS: Dict[Tuple[str, str, int, int], ProcessPoolExecutor] = {}
+
+
+def _init_pool_worker(model_size: str, compute_type: str, cpu_threads: int) -> None:
+    """进程池初始化函数：在工作进程内加载独立的 WhisperModel"""
+    global _WORKER_MODEL
+    logger.info(f"工作进程 {os.getpid()} 正在加载模型: {model_size} (cpu_threads={cpu_threads})")
+    _WORKER_MODEL = load_whisper_model(model_size, "cpu", compute_type, cpu_threads)
+
+
+def _transcribe_in_worker(audio: np.ndarray, segment_start_ms: int, transcribe_kwargs: Dict,
+                          policy: Optional[Dict] = None, speech_options: Optional[Dict] = None) -> Dict:
+    """在工作进程中转录单个片段"""
+    return _transcribe_chunk(_WORKER_MODEL, audio, segment_start_ms, transcribe_kwargs, policy, speech_options)
+
+
+def shutdown_process_pools() -> None:
+    """关闭并释放所有转录进程池（调优等需要切换进程池配置的场景使用）"""
+    for pool in _WORKER_POOLS.values():
+        pool.shutdown(wait=True)
+    _WORKER_POOLS.clear()
+
+
+def resolve_processor_config(config: AudioProcessorConfig, model_size: str,
+                             device: str) -> Tuple[AudioProcessorConfig, str, int]:
+    """
+    确定处理器实际使用的配置与模型参数（LongAudioProcessor 与 worker 预热共用，保证加载同一个常驻模型）：
+      1. AUTOTUNE 开启时应用本机调优结果，显式设置的 COMPUTE_TYPE 优先
+      2. 守护进程（如 Celery prefork 子进程）无法创建进程池，PARALLEL_WORKERS > 1 时收敛为单进程，
+         线程预算合并给本进程的模型，而不是在转录时静默退回串行
+    Returns:
+        (配置副本或原配置, compute_type, 本进程模型的 cpu_threads)
+    """
+    if config.AUTOTUNE:
+        config = apply_tuned_profile(config, model_size, device)
+
+    if device == "cpu" and config.PARALLEL_WORKERS > 1 and multiprocessing.current_process().daemon:
+        workers = config.PARALLEL_WORKERS
+        config = copy.copy(config)
+        config.CPU_THREADS_PER_WORKER = min(config.CPU_THREADS_PER_WORKER * workers, os.cpu_count() or 1)
+        config.PARALLEL_WORKERS = 1
+        logger.warning(
+            f"当前进程为守护进程，无法创建转录进程池：PARALLEL_WORKERS={workers} 收敛为 1，"
+            f"cpu_threads={config.CPU_THREADS_PER_WORKER or '自动'}"
+        )
+
+    # 选择 compute_type：优先使用配置/调优结果，否则 GPU 使用 float16，CPU 尝试 int8（若不可用回退到 float32）
+    compute_type = config.COMPUTE_TYPE or default_compute_type(device)
+
+    # 串行模式下 CPU_THREADS_PER_WORKER 同样作用于本进程的模型；进程池模式下由工作进程各自加载
+    cpu_threads = config.CPU_THREADS_PER_WORKER if config.PARALLEL_WORKERS <= 1 else 0
+    return config, compute_type, cpu_threads
+
+
 class LongAudioProcessor:
     """
     长音频处理器：将长音频分割为重叠的片段进行Whisper识别，
@@ -74,43 +454,19 @@ class LongAudioProcessor:
         """
         try:
             # 支持手动覆盖设备（device_override），例如用于在无法联网时强制使用 CPU 进行测试
-            device = "cpu"
-            if device_override is not None:
-                device = device_override
-                logger.info(f"强制使用设备: {device}（由 device_override 指定）")
-            else:
-                # 自动检测是否有可用 GPU（CUDA）
-                if torch is not None:
-                    try:
-                        if torch.cuda.is_available():
-                            device = "cuda"
-                            logger.info(f"检测到可用 GPU，使用设备: {device}")
-                        else:
-                            logger.info("未检测到可用 GPU，使用 CPU 进行推理")
-                    except Exception as e:
-                        logger.warning(f"检查 CUDA 可用性时出现问题: {e}; 将使用 CPU")
-                        device = "cpu"
-                else:
-                    logger.info("未安装 torch，默认使用 CPU（若 Whisper 依赖 torch，这里会抛出错误）")
+            device = resolve_device(device_override)
 
-            logger.info(f"正在加载 faster-whisper 模型: {model_size} (device={device})")
+            self.config, compute_type, cpu_threads = resolve_processor_config(
+                config or AudioProcessorConfig(), model_size, device
+            )
 
-            # 选择 compute_type：GPU 使用 float16，CPU 尝试 int8（若不可用回退到 float32）
-            compute_type = None
-            if device == "cuda":
-                compute_type = "float16"
-            else:
-                compute_type = "int8"
+            # 模型由注册表常驻缓存，同一进程内的处理器共享，只有首次会真正加载
+            self.model = get_whisper_model(model_size, device, compute_type, cpu_threads)
 
-            try:
-                self.model = WhisperModel(model_size, device=device, compute_type=compute_type)
-            except Exception as e:
-                logger.warning(f"使用 compute_type={compute_type} 加载模型失败: {e}; 尝试回退到 float32")
-                self.model = WhisperModel(model_size, device=device, compute_type="float32")
-
-            # 尝试启用 BatchedInferencePipeline 以支持 batch_size (仅 cuda 有效)
+            # 尝试启用 BatchedInferencePipeline 以支持 batch_size（默认仅 cuda，可由 BATCHED_INFERENCE 强制开关）
             self.batched_mode = False
-            if device == "cuda" and BatchedInferencePipeline is not None:
+            use_batched = self.config.BATCHED_INFERENCE if self.config.BATCHED_INFERENCE is not None else device == "cuda"
+            if use_batched and BatchedInferencePipeline is not None:
                 try:
                     self.model = BatchedInferencePipeline(model=self.model)
                     self.batched_mode = True
@@ -118,144 +474,186 @@ class LongAudioProcessor:
                 except Exception as e:
                     logger.warning(f"启用批处理优化失败: {e}")
 
-            # 保存设备信息以备后续使用/日志
+            # 保存设备与模型信息以备后续使用/日志（进程池工作进程按相同参数加载模型）
             self.device = device
-            self.config = config or AudioProcessorConfig()
+            self.model_size = model_size
+            self.compute_type = compute_type
+            self.cpu_threads = cpu_threads
+            # 最近一次运行的统计信息（语言、片段数等），由 iter_long_audio 填充
+            self.run_stats: Dict = {}
             logger.info("处理器初始化完成")
         except Exception as e:
             logger.error(f"初始化处理器失败: {e}")
             raise
         
-    def split_audio_with_overlap(self, audio_path: str) -> List[Tuple[AudioSegment, int]]:
+    def split_audio_with_overlap(self, audio_path: str) -> Iterator[Tuple[np.ndarray, int]]:
         """
-        将音频分割为重叠的片段
+        将音频分割为重叠的片段（惰性产出）
+        
+        片段通过 ffmpeg 管道流式解码，同一时刻只持有当前窗口及其重叠部分，
+        峰值内存与音频总时长无关。
         Args:
             audio_path: 音频文件路径
         Returns:
-            List of (audio_segment, start_time_ms) 元组
+            (audio_array, start_time_ms) 元组的迭代器，audio_array 为 16kHz 单声道 float32 数组
         Raises:
             FileNotFoundError: 当文件不存在时
-            Exception: 当音频加载失败时
+            Exception: 当音频探测失败时
+        """
+        segments, _ = self._open_segments(audio_path)
+        return segments
+    
+    def _open_segments(self, audio_path: str) -> Tuple[Iterator[Tuple[np.ndarray, int]], int]:
+        """
+        校验并探测音频，返回 (片段迭代器, 总时长毫秒)
         """
-        # 验证文件存在
+        # 验证文件存在（在返回生成器之前完成，保证错误尽早抛出）
         if not os.path.exists(audio_path):
             logger.error(f"音频文件不存在: {audio_path}")
             raise FileNotFoundError(f"无法找到音频文件: {audio_path}")
         
         try:
-            # 加载音频
-            logger.info(f"正在加载音频文件: {audio_path}")
-            audio = AudioSegment.from_file(audio_path)
-            duration_ms = len(audio)
+            duration_ms = int(probe_duration(audio_path) * 1000)
             duration_min = duration_ms / 1000 / 60
-            
-            logger.info(f"音频总时长: {duration_min:.2f}分钟")
-            
-            # 如果音频长度小于等于片段长度，直接返回
-            if duration_ms <= self.config.SEGMENT_LENGTH_MS:
-                logger.info("音频长度较短，不需要分割")
-                return [(audio, 0)]
-            
-            segments = self._perform_audio_segmentation(audio, duration_ms)
-            logger.info(f"音频分割完成，共 {len(segments)} 个片段")
-            return segments
-            
+            logger.info(f"音频总时长: {duration_min:.2f}分钟，预计 {self.estimate_segment_count(duration_ms)} 个片段")
+        except Exception as e:
+            logger.error(f"音频探测失败: {e}")
+            raise
+        
+        if self.config.SEGMENTATION_MODE == "vad":
+            return self._perform_vad_segmentation(audio_path), duration_ms
+        return self._perform_audio_segmentation(audio_path), duration_ms
+    
+    def estimate_segment_count(self, duration_ms: int) -> int:
+        """根据总时长估算分割后的片段数量（用于进度显示）"""
+        if duration_ms <= self.config.SEGMENT_LENGTH_MS:
+            return 1
+        if self.config.SEGMENTATION_MODE == "vad":
+            # 切点落在每段末尾的搜索范围内，按平均片段长度估算
+            step_ms = self.config.SEGMENT_LENGTH_MS - self.config.VAD_SEARCH_MS // 2
+            return -(-duration_ms // step_ms)
+        step_ms = self.config.SEGMENT_LENGTH_MS - self.config.OVERLAP_MS
+        return 1 + -(-(duration_ms - self.config.SEGMENT_LENGTH_MS) // step_ms)
+    
+    def _perform_audio_segmentation(self, audio_path: str) -> Iterator[Tuple[np.ndarray, int]]:
+        """
+        执行音频分割逻辑：逐个解码固定长度窗口，相邻窗口重叠 OVERLAP_MS
+        """
+        count = 0
+        try:
+            for segment, start_ms in iter_pcm_windows(
+                audio_path,
+                window_ms=self.config.SEGMENT_LENGTH_MS,
+                overlap_ms=self.config.OVERLAP_MS,
+                sample_rate=self.config.SAMPLE_RATE,
+            ):
+                count += 1
+                # 日志输出片段信息
+                segment_start_min = start_ms / 1000 / 60
+                segment_end_min = (start_ms + len(segment) * 1000 // self.config.SAMPLE_RATE) / 1000 / 60
+                logger.debug(f"片段 {count}: {segment_start_min:.1f}min - {segment_end_min:.1f}min")
+                yield segment, start_ms
         except Exception as e:
             logger.error(f"音频分割失败: {e}")
             raise
+        
+        logger.info(f"音频分割完成，共 {count} 个片段")
     
-    def _perform_audio_segmentation(self, audio: AudioSegment, duration_ms: int) -> List[Tuple[AudioSegment, int]]:
+    def _perform_vad_segmentation(self, audio_path: str) -> Iterator[Tuple[np.ndarray, int]]:
         """
-        执行音频分割逻辑
+        基于 VAD 的分割逻辑：读满一个 SEGMENT_LENGTH_MS 的缓冲区后，只对其末尾
+        VAD_SEARCH_MS 范围运行一次 VAD，在最长的静音中点切分；切点之后的样本
+        作为下一片段的开头。片段之间无重叠，每个样本只参与一次 VAD 与转录。
         """
-        segments = []
-        start_ms = 0
+        sample_rate = self.config.SAMPLE_RATE
+        target = self.config.SEGMENT_LENGTH_MS * sample_rate // 1000
+        search = min(self.config.VAD_SEARCH_MS * sample_rate // 1000, target // 2)
         
-        while start_ms < duration_ms:
-            # 计算结束时间（不超过音频总长）
-            end_ms = min(start_ms + self.config.SEGMENT_LENGTH_MS, duration_ms)
-            
-            # 提取片段
-            segment = audio[start_ms:end_ms]
-            segments.append((segment, start_ms))
-            
-            # 日志输出片段信息
-            segment_start_min = start_ms / 1000 / 60
-            segment_end_min = (start_ms + len(segment)) / 1000 / 60
-            logger.debug(f"片段 {len(segments)}: {segment_start_min:.1f}min - {segment_end_min:.1f}min")
-            
-            # 计算下一个片段的起始时间（减去重叠部分）
-            start_ms = end_ms - self.config.OVERLAP_MS
-            
-            # 如果剩余部分小于等于重叠部分，则结束
-            if duration_ms - start_ms <= self.config.OVERLAP_MS:
-                # 如果有剩余，添加最后一段
-                if start_ms < duration_ms:
-                    last_segment = audio[start_ms:duration_ms]
-                    segments.append((last_segment, start_ms))
-                break
+        count = 0
+        start = 0
+        carry = np.empty(0, dtype=np.float32)
+        try:
+            with PcmStream(audio_path, sample_rate) as stream:
+                while True:
+                    buffer = np.empty(target, dtype=np.float32)
+                    buffer[:len(carry)] = carry
+                    filled = len(carry) + len(stream.read(target - len(carry), out=buffer[len(carry):]))
+                    if filled < target:
+                        # 文件末尾：剩余部分作为最后一段
+                        if filled > 0:
+                            count += 1
+                            yield buffer[:filled], start * 1000 // sample_rate
+                        break
+                    
+                    cut = target - search + self._find_silence_cut(buffer[target - search:])
+                    count += 1
+                    logger.debug(f"片段 {count}: {start / sample_rate / 60:.1f}min - {(start + cut) / sample_rate / 60:.1f}min")
+                    # 切点之后的样本复制出来，避免产出的片段与下一缓冲区共享内存
+                    carry = buffer[cut:].copy()
+                    yield buffer[:cut], start * 1000 // sample_rate
+                    start += cut
+        except Exception as e:
+            logger.error(f"音频分割失败: {e}")
+            raise
         
-        return segments
+        logger.info(f"VAD 分割完成，共 {count} 个片段")
+    
+    def _find_silence_cut(self, region: np.ndarray) -> int:
+        """
+        在搜索区域内寻找切点（相对区域起点的样本下标）：
+        优先取 VAD 判定的最长静音的中点；找不到足够长的静音时退回到能量最低的 100ms 帧
+        """
+        sample_rate = self.config.SAMPLE_RATE
+        min_silence = self.config.VAD_MIN_SILENCE_MS * sample_rate // 1000
+        speech = get_speech_timestamps(
+            region,
+            vad_options=VadOptions(min_silence_duration_ms=self.config.VAD_MIN_SILENCE_MS),
+        )
+        
+        # 相邻语音段之间（含区域首尾）的间隙即为静音
+        bounds = [0] + [t for ts in speech for t in (ts["start"], ts["end"])] + [len(region)]
+        gaps = [(bounds[i], bounds[i + 1]) for i in range(0, len(bounds), 2)]
+        gap_start, gap_end = max(gaps, key=lambda g: (g[1] - g[0], g[0]))
+        if gap_end - gap_start >= min_silence:
+            return (gap_start + gap_end) // 2
+        
+        frame = sample_rate // 10
+        n_frames = len(region) // frame
+        energy = np.square(region[:n_frames * frame].reshape(n_frames, frame)).mean(axis=1)
+        logger.debug("搜索范围内未找到足够长的静音，按最低能量帧切分")
+        return int(np.argmin(energy)) * frame + frame // 2
     
-    def transcribe_segment(self, audio_segment: AudioSegment, 
+    def _to_pcm_array(self, audio: Union[np.ndarray, AudioSegment]) -> np.ndarray:
+        """
+        将输入统一为 Whisper 需要的 16kHz 单声道 float32 数组。
+        兼容旧调用方传入的 pydub AudioSegment（在内存中完成重采样，不落盘）。
+        """
+        if isinstance(audio, np.ndarray):
+            return audio.astype(np.float32, copy=False)
+        
+        segment = audio.set_frame_rate(self.config.SAMPLE_RATE).set_channels(1)
+        samples = np.array(segment.get_array_of_samples(), dtype=np.float32)
+        return samples / float(1 << (8 * segment.sample_width - 1))
+    
+    def transcribe_segment(self, audio_segment: Union[np.ndarray, AudioSegment], 
                           segment_start_ms: int) -> Dict:
         """
         转录单个音频片段，并调整时间戳
         Args:
-            audio_segment: 音频片段
+            audio_segment: 音频片段（16kHz 单声道 float32 数组，或 pydub AudioSegment）
             segment_start_ms: 片段的起始时间（毫秒）
         Returns:
             包含转录结果的字典
         """
-        temp_path = None
         try:
-            # 创建临时文件
-            with tempfile.NamedTemporaryFile(
-                suffix=f".{self.config.TEMP_AUDIO_FORMAT}", 
-                delete=False
-            ) as tmp_file:
-                temp_path = tmp_file.name
-            
-            # 将音频片段导出为指定格式
-            audio_segment.export(temp_path, format=self.config.TEMP_AUDIO_FORMAT)
+            audio = self._to_pcm_array(audio_segment)
             
-            # 准备转录参数
-            transcribe_kwargs = {
-                "language": "zh",
-                # 引导模型使用标点。这里使用陈述句而非指令，既能提示标点又能避免命令式幻觉
-                "initial_prompt": "简体中文，句子之间有标点符号，断句清晰。",
-                "beam_size": 5,
-                "vad_filter": True,
-                # 放宽静音阈值到 1000ms。过短的阈值(如500ms)会切断句子中间的停顿，导致上下文丢失，模型无法判断标点
-                "vad_parameters": dict(min_silence_duration_ms=2000),
-                "condition_on_previous_text": False
-            }
-
-            # 如果启用了 BatchedInferencePipeline，则添加 batch_size
-            if getattr(self, "batched_mode", False):
-                transcribe_kwargs["batch_size"] = 24
-
-            # 使用 faster_whisper 转录（返回 segments iterable 和 info）
-            logger.debug(f"正在转录临时文件: {temp_path}")
-            segments_iter, info = self.model.transcribe(temp_path, **transcribe_kwargs)
-
-            segments_list = list(segments_iter)
-            segment_start_s = segment_start_ms / 1000.0
-     
-            # 构建与原来兼容的 result 字典
-            result_segments = []
-            for seg in segments_list:
-                result_segments.append({
-                    "start": seg.start + segment_start_s,
-                    "end": seg.end + segment_start_s,
-                    "text": seg.text
-                })
-
-            result = {
-                "text": " ".join([s["text"] for s in result_segments]),
-                "segments": result_segments,
-                "language": getattr(info, "language", None) if info is not None else None
-            }
+            # 直接将 PCM 数组交给 faster_whisper
+            logger.debug(f"正在转录片段: {len(audio) / self.config.SAMPLE_RATE:.1f}s")
+            result = _transcribe_chunk(
+                self.model, audio, segment_start_ms, self._transcribe_kwargs(),
+                self._decode_policy(), self._speech_map_options()
+            )
 
             logger.debug(f"片段转录完成，包含 {len(result.get('segments', []))} 条")
             return result
@@ -263,13 +661,291 @@ class LongAudioProcessor:
         except Exception as e:
             logger.error(f"转录片段失败: {e}")
             raise
-        finally:
-            # 清理临时文件
-            if temp_path and os.path.exists(temp_path):
-                try:
-                    os.unlink(temp_path)
-                except Exception as e:
-                    logger.warning(f"删除临时文件失败: {e}")
+    
+    def _transcribe_kwargs(self) -> Dict:
+        """构造本处理器的转录参数"""
+        transcribe_kwargs = dict(TRANSCRIBE_KWARGS, beam_size=self.config.BEAM_SIZE)
+        # 如果启用了 BatchedInferencePipeline，则添加 batch_size
+        if getattr(self, "batched_mode", False):
+            transcribe_kwargs["batch_size"] = self.config.BATCH_SIZE
+        return transcribe_kwargs
+    
+    def _decode_policy(self) -> Optional[Dict]:
+        """自适应解码策略；未启用时返回 None（全部使用 BEAM_SIZE 解码）"""
+        if not self.config.ADAPTIVE_BEAM or self.config.BEAM_SIZE <= 1:
+            return None
+        return {
+            "beam_size": self.config.BEAM_SIZE,
+            "padding_ms": self.config.BEAM_PADDING_MS,
+            "sample_rate": self.config.SAMPLE_RATE,
+            "thresholds": self._confidence_thresholds(),
+        }
+    
+    def _speech_map_options(self) -> Optional[Dict]:
+        """语音分布图参数；未启用时返回 None（整个片段交给 Whisper）"""
+        if not self.config.SPEECH_MAP_ENABLED:
+            return None
+        return {
+            "sample_rate": self.config.SAMPLE_RATE,
+            "method": self.config.SPEECH_MAP_METHOD,
+            "pad_ms": self.config.SPEECH_MAP_PAD_MS,
+            "min_gap_ms": self.config.SPEECH_MAP_MIN_GAP_MS,
+        }
+    
+    def _record_decode_stats(self, stats: Optional[Dict]) -> None:
+        """把单个片段的解码计数累加到本次运行的统计中"""
+        if not stats or "decode" not in self.run_stats:
+            return
+        for key, value in stats.items():
+            self.run_stats["decode"][key] += value
+    
+    def _use_process_pool(self) -> bool:
+        """是否启用进程池并行转录（仅 CPU 且工作进程数大于 1）"""
+        if self.device != "cpu" or self.config.PARALLEL_WORKERS <= 1:
+            return False
+        if multiprocessing.current_process().daemon:
+            # 守护进程不允许创建子进程，退回串行转录
+            logger.warning("当前进程为守护进程，无法创建转录进程池，改为串行转录")
+            return False
+        return True
+    
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """
+        获取（或创建）进程池。cpu_threads 预算在工作进程间平均划分，避免线程超订。
+        """
+        workers = self.config.PARALLEL_WORKERS
+        cpu_threads = self.config.CPU_THREADS_PER_WORKER or max(1, (os.cpu_count() or 1) // workers)
+        key = (self.model_size, self.compute_type, workers, cpu_threads)
+        
+        pool = _WORKER_POOLS.get(key)
+        if pool is None:
+            logger.info(f"创建转录进程池: {workers} 个工作进程，每进程 cpu_threads={cpu_threads}")
+            # 使用 spawn 启动，避免 fork 继承父进程中 CTranslate2 的线程状态
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_pool_worker,
+                initargs=(self.model_size, self.compute_type, cpu_threads),
+            )
+            _WORKER_POOLS[key] = pool
+        return pool
+    
+    def warm_up(self) -> None:
+        """启动进程池并等待所有工作进程加载完模型（串行模式下模型已在初始化时加载）"""
+        if not self._use_process_pool():
+            return
+        pool = self._get_process_pool()
+        futures = [pool.submit(os.getpid) for _ in range(self.config.PARALLEL_WORKERS)]
+        for future in futures:
+            future.result()
+    
+    def _transcribe_parallel(self, segments: Iterator[Tuple[np.ndarray, int]], expected: int,
+                             checkpoint: Optional[TranscriptionCheckpoint] = None) -> Iterator[Dict]:
+        """
+        将片段分发到进程池转录，按提交顺序（即时间顺序）逐个产出结果。
+        在途任务数限制为工作进程数的 2 倍，配合惰性分割保证内存占用不随音频时长增长。
+        已有检查点的片段不再提交，直接以已完成的 Future 占位以保持顺序。
+        """
+        pool = self._get_process_pool()
+        max_in_flight = self.config.PARALLEL_WORKERS * 2
+        transcribe_kwargs = self._transcribe_kwargs()
+        policy = self._decode_policy()
+        speech_options = self._speech_map_options()
+        
+        def finish(index: int, future: Future, cached: bool) -> Dict:
+            result = future.result()
+            if checkpoint is not None and not cached:
+                checkpoint.save(index, result)
+            return result
+        
+        in_flight = deque()
+        for index, (segment, start_time) in enumerate(segments):
+            cached = self._load_checkpoint(checkpoint, index, expected)
+            if cached is not None:
+                future = Future()
+                future.set_result(cached)
+                in_flight.append((index, future, True))
+            else:
+                self._require_audio(segment, index)
+                logger.info(f"提交片段 {index + 1}/{expected} (原始时间: {start_time/1000:.1f}s) 到进程池...")
+                future = pool.submit(_transcribe_in_worker, segment, start_time, transcribe_kwargs, policy, speech_options)
+                in_flight.append((index, future, False))
+            if len(in_flight) >= max_in_flight:
+                yield finish(*in_flight.popleft())
+        
+        while in_flight:
+            yield finish(*in_flight.popleft())
+    
+    @staticmethod
+    def _load_checkpoint(checkpoint: Optional[TranscriptionCheckpoint], index: int, expected: int) -> Optional[Dict]:
+        """读取片段检查点，不存在或已损坏时返回 None"""
+        if checkpoint is None or not checkpoint.has(index):
+            return None
+        cached = checkpoint.load(index)
+        if cached is not None:
+            logger.info(f"片段 {index + 1}/{expected} 已有检查点，跳过转录")
+        return cached
+    
+    @staticmethod
+    def _require_audio(segment: Optional[np.ndarray], index: int) -> None:
+        """片段流可以用 None 代替已有检查点的片段（上游因此不必重新产出音频），检查点失效时无法继续"""
+        if segment is None:
+            raise RuntimeError(f"片段 {index + 1} 未提供音频且没有可用的检查点")
+    
+    def _iter_chunk_segments(self, segments: Iterator[Tuple[np.ndarray, int]], expected: int,
+                             checkpoint: Optional[TranscriptionCheckpoint] = None) -> Iterator[Dict]:
+        """
+        逐个转录片段并按时间顺序产出其中的转录段落（尚未去重）。
+        串行模式下每解码出一段即产出；进程池模式下以片段为单位产出。
+        提供 checkpoint 时，已完成的片段直接读取检查点，新完成的片段立即落盘；
+        已完成片段的音频可以为 None。
+        """
+        if self._use_process_pool():
+            for result in self._transcribe_parallel(segments, expected, checkpoint):
+                self.run_stats["chunks"] += 1
+                self.run_stats["language"] = self.run_stats["language"] or result.get("language")
+                self._record_decode_stats(result.get("decode_stats"))
+                yield from result["segments"]
+            return
+        
+        transcribe_kwargs = self._transcribe_kwargs()
+        policy = self._decode_policy()
+        speech_options = self._speech_map_options()
+        for index, (segment, start_time) in enumerate(segments):
+            self.run_stats["chunks"] += 1
+            cached = self._load_checkpoint(checkpoint, index, expected)
+            if cached is not None:
+                self.run_stats["language"] = self.run_stats["language"] or cached.get("language")
+                self._record_decode_stats(cached.get("decode_stats"))
+                yield from cached["segments"]
+                continue
+            
+            self._require_audio(segment, index)
+            logger.info(f"转录片段 {index + 1}/{expected} (原始时间: {start_time/1000:.1f}s)...")
+            stats = _new_decode_stats()
+            segments_iter, language = _iter_chunk(
+                self.model, segment, start_time, transcribe_kwargs, policy, speech_options, stats
+            )
+            self.run_stats["language"] = self.run_stats["language"] or language
+            produced = []
+            for seg in segments_iter:
+                produced.append(seg)
+                yield seg
+            self._record_decode_stats(stats)
+            if checkpoint is not None:
+                checkpoint.save(index, {"segments": produced, "language": language, "decode_stats": stats})
+    
+    def _log_decode_stats(self) -> None:
+        """输出本文件的解码统计：语音分布图跳过的音频，以及多少窗口需要 beam search 重新解码"""
+        stats = self.run_stats.get("decode")
+        if not stats:
+            return
+        if self.config.SPEECH_MAP_ENABLED:
+            total = stats["speech_seconds"] + stats["skipped_seconds"]
+            logger.info(
+                f"语音分布图：解码 {stats['speech_seconds']:.1f}s 语音，跳过 {stats['skipped_seconds']:.1f}s "
+                f"静音/非语音（占 {stats['skipped_seconds'] / total if total else 0.0:.1%}）"
+            )
+        if self._decode_policy() is None:
+            return
+        ratio = stats["beam_segments"] / stats["segments"] if stats["segments"] else 0.0
+        stats["beam_segment_ratio"] = ratio
+        logger.info(
+            f"自适应解码：贪心解码 {stats['segments']} 段，其中 {stats['beam_segments']} 段 ({ratio:.1%}) "
+            f"未通过置信度阈值，以 beam_size={self.config.BEAM_SIZE} 重新解码 "
+            f"{stats['beam_windows']} 个窗口，共 {stats['beam_seconds']:.1f}s 音频"
+        )
+    
+    def open_checkpoint(self, audio_path: str, checkpoint_dir: str, **params) -> TranscriptionCheckpoint:
+        """
+        打开（或创建）与本处理器配置对应的转录检查点。
+        指纹包含源文件与所有影响分割边界/转录结果的参数，任一变化都会使旧检查点失效。
+        片段由外部产出（process_audio_stream）时，调用方通过 params 补充决定片段边界的参数。
+        """
+        fingerprint = TranscriptionCheckpoint.fingerprint_for(
+            audio_path,
+            model_size=self.model_size,
+            compute_type=self.compute_type,
+            segmentation_mode=self.config.SEGMENTATION_MODE,
+            segment_length_ms=self.config.SEGMENT_LENGTH_MS,
+            overlap_ms=self.config.OVERLAP_MS,
+            vad_search_ms=self.config.VAD_SEARCH_MS,
+            vad_min_silence_ms=self.config.VAD_MIN_SILENCE_MS,
+            sample_rate=self.config.SAMPLE_RATE,
+            beam_size=self.config.BEAM_SIZE,
+            decode_policy=self._decode_policy(),
+            speech_map=self._speech_map_options(),
+            **params,
+        )
+        return TranscriptionCheckpoint(checkpoint_dir, fingerprint)
+    
+    def iter_long_audio(self, audio_path: str,
+                        checkpoint: Optional[TranscriptionCheckpoint] = None) -> Iterator[Dict]:
+        """
+        流式处理长音频：按时间顺序逐段产出已去重的转录段落（时间戳为原始音频时间轴）。
+        本次运行的语言、片段数等统计信息记录在 self.run_stats 中。
+        Args:
+            audio_path: 音频文件路径
+            checkpoint: 可选的转录检查点，已完成的片段不再重复转录
+        Yields:
+            {"start", "end", "text"} 段落字典
+        """
+        segments, duration_ms = self._open_segments(audio_path)
+        expected = self.estimate_segment_count(duration_ms)
+        self.run_stats = {"language": None, "chunks": 0, "duration_s": duration_ms / 1000}
+        self.run_stats["decode"] = _new_decode_stats()
+        
+        merger = _SegmentMerger(concatenate=self.config.SEGMENTATION_MODE == "vad")
+        for seg in self._iter_chunk_segments(segments, expected, checkpoint):
+            if merger.accept(seg):
+                yield seg
+        merger.log_summary()
+        self._log_decode_stats()
+    
+    def iter_audio_stream(self, chunks: Iterator[Tuple[Optional[np.ndarray], int]], expected: int = 0,
+                          duration_ms: int = 0,
+                          checkpoint: Optional[TranscriptionCheckpoint] = None) -> Iterator[Dict]:
+        """
+        流式转录外部产出的片段（如边分离边产出的人声窗口），与 iter_long_audio 共用转录与去重逻辑。
+        Args:
+            chunks: (16kHz 单声道 float32 数组, 原始起始毫秒) 迭代器，按时间顺序，相邻片段可以重叠；
+                    checkpoint 中已完成的片段可用 None 代替数组
+            expected: 预计片段数（仅用于日志）
+            duration_ms: 音频总时长（仅用于统计）
+            checkpoint: 可选的转录检查点，片段序号即 chunks 中的位置
+        Yields:
+            {"start", "end", "text"} 段落字典
+        """
+        self.run_stats = {"language": None, "chunks": 0, "duration_s": duration_ms / 1000}
+        self.run_stats["decode"] = _new_decode_stats()
+        
+        merger = _SegmentMerger()
+        for seg in self._iter_chunk_segments(chunks, expected, checkpoint):
+            if merger.accept(seg):
+                yield seg
+        merger.log_summary()
+        self._log_decode_stats()
+    
+    def process_audio_stream(self, chunks: Iterator[Tuple[Optional[np.ndarray], int]], expected: int = 0,
+                             duration_ms: int = 0,
+                             on_segment: Optional[Callable[[Dict], None]] = None,
+                             checkpoint: Optional[TranscriptionCheckpoint] = None) -> Dict:
+        """
+        转录外部产出的片段流并返回与 process_long_audio 相同格式的结果（不支持两级转录）。
+        提供 checkpoint（见 open_checkpoint）时每个片段完成后落盘，全部完成后删除
+        """
+        segments = []
+        for seg in self.iter_audio_stream(chunks, expected, duration_ms, checkpoint):
+            segments.append(seg)
+            if on_segment is not None:
+                on_segment(seg)
+        if checkpoint is not None:
+            checkpoint.clear()
+        return {
+            "text": " ".join([seg["text"] for seg in segments]),
+            "segments": segments,
+            "language": self.run_stats.get("language") or "unknown"
+        }
     
     def merge_transcriptions(self, all_results: List[Dict]) -> Dict:
         """
@@ -297,8 +973,11 @@ class LongAudioProcessor:
             # 按开始时间排序
             all_segments.sort(key=lambda x: x["start"])
             
-            # 处理重叠部分
-            merged_segments = self._merge_overlapping_segments(all_segments)
+            # 处理重叠部分（VAD 分割的片段之间没有重叠，直接拼接）
+            if self.config.SEGMENTATION_MODE == "vad":
+                merged_segments = all_segments
+            else:
+                merged_segments = self._merge_overlapping_segments(all_segments)
             
             # 合并文本
             full_text = " ".join([seg["text"] for seg in merged_segments])
@@ -314,60 +993,113 @@ class LongAudioProcessor:
             logger.error(f"合并转录结果失败: {e}")
             raise
     
-    def _merge_overlapping_segments(self, segments: List[Dict]) -> List[Dict]:
+    def _confidence_thresholds(self) -> Dict:
+        return {
+            "logprob": self.config.CONFIDENCE_LOGPROB_THRESHOLD,
+            "compression_ratio": self.config.CONFIDENCE_COMPRESSION_RATIO_THRESHOLD,
+        }
+    
+    def _is_low_confidence(self, segment: Dict) -> bool:
+        """根据 avg_logprob / compression_ratio 判断段落是否为低置信度"""
+        return _is_low_confidence(segment, self._confidence_thresholds())
+    
+    def _low_confidence_windows(self, segments: List[Dict]) -> List[Tuple[int, int]]:
+        """找出需要重新解码的窗口（见 _low_confidence_windows）"""
+        return _low_confidence_windows(segments, self._confidence_thresholds())
+    
+    def _draft_processor(self) -> "LongAudioProcessor":
+        """构造草稿阶段使用的小模型处理器（共享本处理器的分割配置）"""
+        draft_config = copy.copy(self.config)
+        draft_config.DRAFT_MODEL_SIZE = None
+        return LongAudioProcessor(model_size=self.config.DRAFT_MODEL_SIZE, device_override=self.device, config=draft_config)
+    
+    def _refine_segments(self, audio_path: str, segments: List[Dict]) -> List[Dict]:
         """
-        处理重叠的转录片段
+        用主模型重新转录草稿中的低置信度窗口。每个窗口通过 ffmpeg seek 单独解码，
+        内存占用与音频总时长无关。
         """
-        merged_segments = []
-        last_end = 0
-        overlap_count = 0
+        padding_s = self.config.REFINE_PADDING_MS / 1000
+        transcribe_kwargs = self._transcribe_kwargs()
+        windows = self._low_confidence_windows(segments)
         
-        for segment in segments:
-            start = segment["start"]
-            end = segment["end"]
+        refined = []
+        refined_seconds = 0.0
+        cursor = 0
+        for i, (first, last) in enumerate(windows, 1):
+            old_segments = segments[first:last]
+            start_s = max(0.0, old_segments[0]["start"] - padding_s)
+            end_s = old_segments[-1]["end"] + padding_s
+            logger.info(f"精修窗口 {i}/{len(windows)}: {start_s:.1f}s - {end_s:.1f}s ({last - first} 段)")
             
-            # 如果这个片段在前一个片段结束后才开始
-            if start >= last_end or not merged_segments:
-                merged_segments.append(segment)
-                last_end = end
-            else:
-                # 计算重叠
-                overlap = last_end - start
-                if overlap > 0:
-                    overlap_count += 1
-                    logger.debug(f"检测到重叠: {overlap:.2f}秒，跳过此片段")
-        
-        if overlap_count > 0:
-            logger.info(f"检测到 {overlap_count} 个重叠片段，已处理")
+            audio = load_pcm(audio_path, sample_rate=self.config.SAMPLE_RATE, start_s=start_s, duration_s=end_s - start_s)
+            result = _transcribe_array(self.model, audio, int(start_s * 1000), transcribe_kwargs)
+            
+            refined.extend(segments[cursor:first])
+            refined.extend(_replace_window(old_segments, result["segments"]))
+            cursor = last
+            refined_seconds += old_segments[-1]["end"] - old_segments[0]["start"]
+        refined.extend(segments[cursor:])
         
+        duration_s = self.run_stats.get("duration_s") or 0.0
+        self.run_stats.update({
+            "refined_windows": len(windows),
+            "refined_segments": sum(last - first for first, last in windows),
+            "refined_seconds": refined_seconds,
+            "refined_ratio": refined_seconds / duration_s if duration_s else 0.0,
+        })
+        logger.info(
+            f"两级转录：{len(segments)} 段中有 {self.run_stats['refined_segments']} 段低置信度，"
+            f"精修音频 {refined_seconds:.1f}s，占总时长 {self.run_stats['refined_ratio']:.1%}"
+        )
+        return refined
+    
+    def _merge_overlapping_segments(self, segments: List[Dict]) -> List[Dict]:
+        """
+        处理重叠的转录片段
+        """
+        merger = _SegmentMerger()
+        merged_segments = [segment for segment in segments if merger.accept(segment)]
+        merger.log_summary()
         return merged_segments
     
-    def process_long_audio(self, audio_path: str) -> Dict:
+    def process_long_audio(self, audio_path: str,
+                           on_segment: Optional[Callable[[Dict], None]] = None,
+                           checkpoint_dir: Optional[str] = None,
+                           on_draft: Optional[Callable[[Dict], None]] = None) -> Dict:
         """
         主处理函数：处理长音频
         Args:
             audio_path: 音频文件路径
+            on_segment: 可选回调，每产出一个（已去重的）段落即调用一次，用于渐进式输出
+            checkpoint_dir: 可选的检查点目录。每个片段完成后落盘，任务中断后重试只转录缺失片段；
+                            全部完成后检查点会被删除
+            on_draft: 可选回调，两级转录模式下草稿完成时以草稿结果调用一次
         Returns:
             转录结果字典
         """
+        if self.config.DRAFT_MODEL_SIZE:
+            return self._process_draft_then_refine(audio_path, on_segment, checkpoint_dir, on_draft)
+        
         logger.info("=" * 60)
         logger.info("开始处理长音频...")
         logger.info("=" * 60)
         
         try:
-            # 1. 分割音频
-            segments = self.split_audio_with_overlap(audio_path)
-            
-            # 2. 转录每个片段
-            all_results = []
-            for i, (segment, start_time) in enumerate(segments, 1):
-                logger.info(f"转录片段 {i}/{len(segments)} (原始时间: {start_time/1000:.1f}s)...")
-                result = self.transcribe_segment(segment, start_time)
-                all_results.append(result)
+            # 分割（惰性）-> 转录 -> 增量合并，段落按时间顺序陆续产出
+            checkpoint = self.open_checkpoint(audio_path, checkpoint_dir) if checkpoint_dir else None
+            merged_segments = []
+            for seg in self.iter_long_audio(audio_path, checkpoint):
+                merged_segments.append(seg)
+                if on_segment is not None:
+                    on_segment(seg)
             
-            # 3. 合并结果
-            logger.info("合并所有转录结果...")
-            final_result = self.merge_transcriptions(all_results)
+            final_result = {
+                "text": " ".join([seg["text"] for seg in merged_segments]),
+                "segments": merged_segments,
+                "language": self.run_stats.get("language") or "unknown"
+            }
+            if checkpoint is not None:
+                checkpoint.clear()
             
             logger.info("=" * 60)
             logger.info("✅ 处理完成！")
@@ -381,6 +1113,27 @@ class LongAudioProcessor:
             logger.error(f"处理音频失败: {e}")
             raise
     
+    def _process_draft_then_refine(self, audio_path: str,
+                                   on_segment: Optional[Callable[[Dict], None]],
+                                   checkpoint_dir: Optional[str],
+                                   on_draft: Optional[Callable[[Dict], None]]) -> Dict:
+        """
+        两级转录：小模型草稿（流式产出并通过 on_draft 发布）-> 主模型精修低置信度段落
+        """
+        logger.info(f"两级转录模式：草稿模型 {self.config.DRAFT_MODEL_SIZE}，精修模型 {self.model_size}")
+        draft_processor = self._draft_processor()
+        draft = draft_processor.process_long_audio(audio_path, on_segment=on_segment, checkpoint_dir=checkpoint_dir)
+        self.run_stats = dict(draft_processor.run_stats)
+        if on_draft is not None:
+            on_draft(draft)
+        
+        segments = self._refine_segments(audio_path, draft["segments"])
+        return {
+            "text": " ".join([seg["text"] for seg in segments]),
+            "segments": segments,
+            "language": draft.get("language", "unknown")
+        }
+    
     def save_transcription_with_timestamps(self, result: Dict, output_path: str) -> None:
         """
         保存带时间戳的转录结果
@@ -389,7 +1142,9 @@ class LongAudioProcessor:
             output_path: 输出文件路径
         """
         try:
-            with open(output_path, "w", encoding=self.config.OUTPUT_ENCODING) as f:
+            # 先写临时文件再原子替换，避免覆盖渐进式输出时读到半截内容
+            temp_path = f"{output_path}.tmp"
+            with open(temp_path, "w", encoding=self.config.OUTPUT_ENCODING) as f:
                 # 写入摘要信息
                 f.write(f"# 音频转录结果\n")
                 f.write(f"语言: {result.get('language', '未知')}\n")
@@ -400,6 +1155,7 @@ class LongAudioProcessor:
                 for seg in result["segments"]:
                     time_str = self._format_timestamp_range(seg["start"], seg["end"])
                     f.write(f"\n[{time_str}] {seg['text']}")
+            os.replace(temp_path, output_path)
             
             logger.info(f"结果已保存到: {output_path}")
             
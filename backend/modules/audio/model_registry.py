@@ -0,0 +1,114 @@
+"""
+Whisper 模型注册表：按 (model_size, device, compute_type, cpu_threads) 缓存已加载的 WhisperModel，
+同一进程内的所有 LongAudioProcessor 共享常驻模型，避免每个任务重复加载。
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from faster_whisper import WhisperModel
+
+# 尝试导入 torch 以检测 GPU 可用性；若不可用则设为 None
+try:
+    import torch
+except Exception:
+    torch = None
+
+logger = logging.getLogger(__name__)
+
+_WHISPER_MODELS: Dict[Tuple[str, str, str, int], WhisperModel] = {}
+_LOCK = threading.Lock()
+
+
+def resolve_device(device_override: Optional[str] = None) -> str:
+    """
+    确定推理设备
+    Args:
+        device_override: 手动指定的设备，例如用于在无法联网时强制使用 CPU 进行测试
+    Returns:
+        "cuda" 或 "cpu"
+    """
+    if device_override is not None:
+        logger.info(f"强制使用设备: {device_override}（由 device_override 指定）")
+        return device_override
+
+    # 自动检测是否有可用 GPU（CUDA）
+    if torch is None:
+        logger.info("未安装 torch，默认使用 CPU（若 Whisper 依赖 torch，这里会抛出错误）")
+        return "cpu"
+    try:
+        if torch.cuda.is_available():
+            logger.info("检测到可用 GPU，使用设备: cuda")
+            return "cuda"
+        logger.info("未检测到可用 GPU，使用 CPU 进行推理")
+    except Exception as e:
+        logger.warning(f"检查 CUDA 可用性时出现问题: {e}; 将使用 CPU")
+    return "cpu"
+
+
+def default_compute_type(device: str) -> str:
+    """选择 compute_type：GPU 使用 float16，CPU 使用 int8"""
+    return "float16" if device == "cuda" else "int8"
+
+
+def load_whisper_model(model_size: str, device: str, compute_type: str, cpu_threads: int = 0) -> WhisperModel:
+    """加载 WhisperModel（不经过缓存），指定的 compute_type 不可用时回退到 float32"""
+    try:
+        return WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+    except Exception as e:
+        logger.warning(f"使用 compute_type={compute_type} 加载模型失败: {e}; 尝试回退到 float32")
+        return WhisperModel(model_size, device=device, compute_type="float32", cpu_threads=cpu_threads)
+
+
+def get_whisper_model(model_size: str, device: str, compute_type: str, cpu_threads: int = 0) -> WhisperModel:
+    """
+    获取常驻模型：首次调用时加载，之后直接返回缓存实例
+    Args:
+        model_size: Whisper 模型大小
+        device: 推理设备
+        compute_type: 计算精度
+        cpu_threads: CTranslate2 计算线程数，0 表示使用默认值
+    Returns:
+        WhisperModel 实例
+    """
+    key = (model_size, device, compute_type, cpu_threads)
+    model = _WHISPER_MODELS.get(key)
+    if model is not None:
+        return model
+
+    with _LOCK:
+        # 双重检查，避免多个线程同时加载同一模型
+        model = _WHISPER_MODELS.get(key)
+        if model is None:
+            start = time.perf_counter()
+            logger.info(
+                f"正在加载 faster-whisper 模型: {model_size} "
+                f"(device={device}, compute_type={compute_type}, cpu_threads={cpu_threads})"
+            )
+            model = load_whisper_model(model_size, device, compute_type, cpu_threads)
+            _WHISPER_MODELS[key] = model
+            logger.info(f"模型加载完成，耗时 {time.perf_counter() - start:.2f}s")
+    return model
+
+
+def evict_whisper_model(model_size: str, device: str, compute_type: str, cpu_threads: int = 0) -> bool:
+    """
+    从注册表中移除常驻模型（调优试验等临时加载的场景使用），模型在最后一个引用释放后卸载
+    Returns:
+        是否移除了缓存的模型
+    """
+    with _LOCK:
+        return _WHISPER_MODELS.pop((model_size, device, compute_type, cpu_threads), None) is not None
+
+
+def preload_whisper_model(model_size: str, device_override: Optional[str] = None,
+                          autotune: bool = False) -> WhisperModel:
+    """预热：按与 LongAudioProcessor 相同的设备/精度规则（autotune 为 True 时含本机调优结果）加载模型并常驻"""
+    from .faster_audio_processor import AudioProcessorConfig, resolve_processor_config
+
+    device = resolve_device(device_override)
+    config = AudioProcessorConfig()
+    config.AUTOTUNE = autotune
+    _, compute_type, cpu_threads = resolve_processor_config(config, model_size, device)
+    return get_whisper_model(model_size, device, compute_type, cpu_threads)
@@ -0,0 +1,236 @@
+"""
+PCM 解码工具：通过 ffmpeg 管道把任意音频/视频直接解码为 float32 NumPy 数组。
+
+faster-whisper 的 ``WhisperModel.transcribe`` 可以直接接收 16kHz 单声道 float32 数组，
+因此整个转录链路不需要再经过临时 WAV 文件的编码/解码往返。
+上游阶段（如人声分离）已持有内存中的样本时，用 resample_pcm / iter_array_windows 直接交接，
+不经过任何文件。
+"""
+import logging
+from typing import Iterator, Optional, Tuple
+
+import ffmpeg
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Whisper 期望的输入采样率
+SAMPLE_RATE = 16000
+
+
+def probe_duration(path: str) -> float:
+    """
+    获取媒体时长（秒）
+    Args:
+        path: 媒体文件路径
+    Returns:
+        时长（秒），容器与流均未记录时长时返回 0.0
+    Raises:
+        RuntimeError: 探测失败时
+    """
+    try:
+        probe = ffmpeg.probe(path)
+    except ffmpeg.Error as e:
+        error_msg = e.stderr.decode() if e.stderr else str(e)
+        raise RuntimeError(f"探测媒体时长失败 {path}: {error_msg}") from e
+
+    duration = probe.get("format", {}).get("duration")
+    if duration is None:
+        # 部分容器只在流信息中记录时长
+        durations = [float(s["duration"]) for s in probe.get("streams", []) if s.get("duration")]
+        return max(durations) if durations else 0.0
+    return float(duration)
+
+
+def load_pcm(path: str,
+             sample_rate: int = SAMPLE_RATE,
+             start_s: float = 0.0,
+             duration_s: Optional[float] = None) -> np.ndarray:
+    """
+    通过 ffmpeg 管道解码音频为单声道 float32 数组（取值范围 [-1, 1]）
+    Args:
+        path: 媒体文件路径
+        sample_rate: 输出采样率
+        start_s: 起始位置（秒），大于 0 时使用 ffmpeg 输入端 seek
+        duration_s: 解码时长（秒），为 None 时解码到文件末尾
+    Returns:
+        一维 float32 数组
+    """
+    input_kwargs = {}
+    if start_s > 0:
+        input_kwargs["ss"] = start_s
+    if duration_s is not None:
+        input_kwargs["t"] = duration_s
+
+    try:
+        out, _ = (
+            ffmpeg
+            .input(path, **input_kwargs)
+            .output("pipe:", format="f32le", acodec="pcm_f32le", ac=1, ar=sample_rate)
+            .global_args("-nostdin", "-loglevel", "error")
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+    except ffmpeg.Error as e:
+        error_msg = e.stderr.decode() if e.stderr else str(e)
+        logger.error(f"FFmpeg 解码失败: {error_msg}")
+        raise RuntimeError(f"解码音频失败 {path}: {error_msg}") from e
+
+    return np.frombuffer(out, dtype=np.float32)
+
+
+def resample_pcm(audio: np.ndarray, sample_rate: int, target_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    通过 ffmpeg 管道把内存中的样本下混为单声道并重采样（不经过文件，也不做任何编码）
+    Args:
+        audio: float32 数组，形状为 (帧数,) 或 (帧数, 声道数)
+        sample_rate: audio 的采样率
+        target_rate: 输出采样率
+    Returns:
+        一维 float32 数组
+    """
+    channels = audio.shape[1] if audio.ndim > 1 else 1
+    if channels == 1 and sample_rate == target_rate:
+        return np.ascontiguousarray(audio.reshape(-1), dtype=np.float32)
+    if len(audio) == 0:
+        return np.zeros(0, dtype=np.float32)
+    try:
+        out, _ = (
+            ffmpeg
+            .input("pipe:", format="f32le", ac=channels, ar=sample_rate)
+            .output("pipe:", format="f32le", acodec="pcm_f32le", ac=1, ar=target_rate)
+            .global_args("-nostdin", "-loglevel", "error")
+            .run(input=np.ascontiguousarray(audio, dtype=np.float32).tobytes(),
+                 capture_stdout=True, capture_stderr=True)
+        )
+    except ffmpeg.Error as e:
+        error_msg = e.stderr.decode() if e.stderr else str(e)
+        raise RuntimeError(f"重采样失败: {error_msg}") from e
+    return np.frombuffer(out, dtype=np.float32)
+
+
+def iter_array_windows(audio: np.ndarray, window_ms: int, overlap_ms: int, start_ms: int = 0,
+                       sample_rate: int = SAMPLE_RATE) -> Iterator[Tuple[np.ndarray, int]]:
+    """
+    把内存中的一维数组切分为带重叠的固定长度窗口（产出视图，不复制），与 iter_pcm_windows 的切分方式一致
+    Args:
+        audio: 一维 float32 数组
+        window_ms: 窗口长度（毫秒）
+        overlap_ms: 相邻窗口重叠长度（毫秒），需小于 window_ms
+        start_ms: audio 首样本在原始时间轴上的位置（毫秒）
+        sample_rate: audio 的采样率
+    Yields:
+        (audio_array, start_time_ms)
+    """
+    window = window_ms * sample_rate // 1000
+    step = window - overlap_ms * sample_rate // 1000
+    if step <= 0:
+        raise ValueError(f"重叠长度必须小于窗口长度: overlap={overlap_ms}ms, window={window_ms}ms")
+
+    position = 0
+    while position < len(audio):
+        yield audio[position:position + window], start_ms + position * 1000 // sample_rate
+        if position + window >= len(audio):
+            break
+        position += step
+
+
+class PcmStream:
+    """
+    ffmpeg 管道读取器：按需读取固定数量的样本，内存占用只与单次读取量有关。
+
+    用法：
+        with PcmStream(path) as stream:
+            block = stream.read(stream.sample_rate * 60)
+    """
+
+    def __init__(self, path: str, sample_rate: int = SAMPLE_RATE, start_s: float = 0.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.start_s = start_s
+        self.process = None
+
+    def __enter__(self) -> "PcmStream":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(check=exc_type is None)
+
+    def open(self) -> None:
+        """启动 ffmpeg 解码进程"""
+        input_kwargs = {"ss": self.start_s} if self.start_s > 0 else {}
+        self.process = (
+            ffmpeg
+            .input(self.path, **input_kwargs)
+            .output("pipe:", format="f32le", acodec="pcm_f32le", ac=1, ar=self.sample_rate)
+            .global_args("-nostdin", "-loglevel", "error")
+            .run_async(pipe_stdout=True)
+        )
+
+    def read(self, n_samples: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        读取至多 n_samples 个样本；返回长度小于 n_samples 表示已到达文件末尾
+        Args:
+            n_samples: 期望读取的样本数
+            out: 可选的预分配缓冲区（长度需不小于 n_samples），避免重复分配
+        """
+        buffer = out if out is not None else np.empty(n_samples, dtype=np.float32)
+        view = memoryview(buffer[:n_samples]).cast("B")
+        got = 0
+        while got < len(view):
+            n = self.process.stdout.readinto(view[got:])
+            if not n:
+                break
+            got += n
+        return buffer[:got // 4]
+
+    def close(self, check: bool = True) -> None:
+        """关闭解码进程；check 为 True 时 ffmpeg 异常退出会抛出 RuntimeError"""
+        if self.process is None:
+            return
+        process, self.process = self.process, None
+        if process.poll() is None and not check:
+            process.kill()
+        process.stdout.close()
+        returncode = process.wait()
+        if check and returncode != 0:
+            raise RuntimeError(f"FFmpeg 解码失败 {self.path}（退出码 {returncode}）")
+
+
+def iter_pcm_windows(path: str, window_ms: int, overlap_ms: int,
+                     sample_rate: int = SAMPLE_RATE) -> Iterator[Tuple[np.ndarray, int]]:
+    """
+    流式产出带重叠的固定长度窗口。同一时刻只持有当前窗口，峰值内存与媒体时长无关。
+    Args:
+        path: 媒体文件路径
+        window_ms: 窗口长度（毫秒）
+        overlap_ms: 相邻窗口重叠长度（毫秒），需小于 window_ms
+        sample_rate: 解码采样率
+    Yields:
+        (audio_array, start_time_ms)
+    """
+    window = window_ms * sample_rate // 1000
+    overlap = overlap_ms * sample_rate // 1000
+    if not 0 <= overlap < window:
+        raise ValueError(f"重叠长度必须小于窗口长度: overlap={overlap_ms}ms, window={window_ms}ms")
+
+    with PcmStream(path, sample_rate) as stream:
+        buffer = np.empty(window, dtype=np.float32)
+        carried = 0      # 缓冲区头部沿用自上一窗口的重叠样本数
+        start = 0        # 缓冲区首样本在整条音频中的位置
+        while True:
+            filled = carried + len(stream.read(window - carried, out=buffer[carried:]))
+            if filled < window:
+                # 文件末尾：只有包含新样本时才产出最后一段
+                if filled > carried:
+                    yield buffer[:filled], start * 1000 // sample_rate
+                break
+
+            # 下一窗口使用新缓冲区，已产出的数组可被调用方安全持有
+            next_buffer = np.empty(window, dtype=np.float32)
+            next_buffer[:overlap] = buffer[window - overlap:]
+            yield buffer, start * 1000 // sample_rate
+
+            buffer = next_buffer
+            carried = overlap
+            start += window - overlap
@@ -0,0 +1,141 @@
+"""
+语音分布图（speech map）：在送入 Whisper 之前用廉价的能量检测或 Silero VAD 找出语音区域，
+把片段压缩为只包含语音的紧凑数组，转录后再把时间戳映射回原始时间轴。
+
+片头、背景音乐和长时间静音因此不再参与解码，3 小时会议录音中的空白几乎不产生开销。
+"""
+import bisect
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .pcm import SAMPLE_RATE
+
+
+class SpeechMap:
+    """
+    语音区域及其在紧凑时间轴上的位置。
+
+    紧凑数组由各语音区域依次拼接，区域之间插入 spacer_ms 的静音，
+    避免 Whisper 把相邻区域的尾字与首字连成一个词。
+    """
+
+    def __init__(self, regions: List[Tuple[int, int]], total_samples: int,
+                 sample_rate: int = SAMPLE_RATE, spacer_ms: int = 300):
+        """
+        Args:
+            regions: 语音区域 [(起始样本, 结束样本), ...]，已排序且互不重叠
+            total_samples: 原始数组长度
+            sample_rate: 采样率
+            spacer_ms: 紧凑数组中区域之间插入的静音时长
+        """
+        self.regions = regions
+        self.total_samples = total_samples
+        self.sample_rate = sample_rate
+        self.spacer = int(sample_rate * spacer_ms / 1000)
+
+        # 每个区域在紧凑时间轴上的起点（样本）
+        self._compact_starts = []
+        position = 0
+        for start, end in regions:
+            self._compact_starts.append(position)
+            position += end - start + self.spacer
+
+    @property
+    def speech_samples(self) -> int:
+        return sum(end - start for start, end in self.regions)
+
+    @property
+    def speech_ratio(self) -> float:
+        return self.speech_samples / self.total_samples if self.total_samples else 0.0
+
+    def compact(self, audio: np.ndarray) -> np.ndarray:
+        """按区域拼接语音，区域之间插入静音"""
+        if not self.regions:
+            return audio[:0]
+        spacer = np.zeros(self.spacer, dtype=audio.dtype)
+        pieces = []
+        for start, end in self.regions:
+            pieces.extend([audio[start:end], spacer])
+        return np.concatenate(pieces[:-1])
+
+    def to_original(self, t: float) -> float:
+        """
+        紧凑时间轴上的时间（秒）-> 原始时间轴上的时间（秒）。
+        落在区域间静音内的时间映射到前一个区域的结束处。
+        """
+        sample = int(round(t * self.sample_rate))
+        index = max(0, bisect.bisect_right(self._compact_starts, sample) - 1)
+        start, end = self.regions[index]
+        offset = min(sample - self._compact_starts[index], end - start)
+        return (start + max(0, offset)) / self.sample_rate
+
+    def remap(self, segment: Dict, origin_s: float = 0.0) -> Dict:
+        """把紧凑时间轴上的转录段落映射回原始时间轴（并平移 origin_s）"""
+        return dict(
+            segment,
+            start=origin_s + self.to_original(segment["start"]),
+            end=origin_s + self.to_original(segment["end"]),
+        )
+
+
+def _energy_regions(audio: np.ndarray, sample_rate: int, frame_ms: int = 30,
+                    dynamic_range_db: float = 35.0, floor_db: float = -55.0) -> List[Tuple[int, int]]:
+    """
+    能量检测：帧能量高于 (峰值附近能量 - dynamic_range_db) 且高于 floor_db 的帧视为语音。
+    只需一次向量化计算，开销可忽略，但无法区分语音与音乐。
+    """
+    frame = int(sample_rate * frame_ms / 1000)
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return []
+    energy = np.square(audio[:n_frames * frame].reshape(n_frames, frame)).mean(axis=1)
+    db = 10 * np.log10(energy + 1e-10)
+    threshold = max(float(np.percentile(db, 95)) - dynamic_range_db, floor_db)
+    active = db > threshold
+
+    # 找出连续的活动帧
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], active.astype(np.int8), [0]))))
+    return [(int(s) * frame, int(e) * frame) for s, e in zip(edges[::2], edges[1::2])]
+
+
+def _silero_regions(audio: np.ndarray, sample_rate: int) -> List[Tuple[int, int]]:
+    """Silero VAD（faster-whisper 自带）：能剔除背景音乐，开销约为解码的百分之一"""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    speech = get_speech_timestamps(audio, vad_options=VadOptions(min_silence_duration_ms=500),
+                                   sampling_rate=sample_rate)
+    return [(s["start"], s["end"]) for s in speech]
+
+
+def build_speech_map(audio: np.ndarray, sample_rate: int = SAMPLE_RATE, method: str = "silero",
+                     pad_ms: int = 200, min_gap_ms: int = 1000, spacer_ms: int = 300) -> SpeechMap:
+    """
+    构建语音分布图
+    Args:
+        audio: 单声道 float32 数组
+        sample_rate: 采样率
+        method: "energy"（能量门限）或 "silero"（Silero VAD）
+        pad_ms: 每个语音区域两侧保留的余量，避免截掉首尾辅音
+        min_gap_ms: 间隔小于该值的区域合并为一个
+        spacer_ms: 紧凑数组中区域之间插入的静音
+    Returns:
+        SpeechMap 实例
+    """
+    if method == "energy":
+        raw = _energy_regions(audio, sample_rate)
+    elif method == "silero":
+        raw = _silero_regions(audio, sample_rate)
+    else:
+        raise ValueError(f"未知的语音检测方法: {method}")
+
+    pad = int(sample_rate * pad_ms / 1000)
+    min_gap = int(sample_rate * min_gap_ms / 1000)
+    regions: List[Tuple[int, int]] = []
+    for start, end in raw:
+        start, end = max(0, start - pad), min(len(audio), end + pad)
+        if regions and start - regions[-1][1] < min_gap:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+        else:
+            regions.append((start, end))
+    return SpeechMap(regions, len(audio), sample_rate, spacer_ms)
@@ -5,6 +5,7 @@
 功能：文件去重 + 任务去重 + 状态管理
 """
 import sqlite3
+import json
 import logging
 from typing import Optional, List, Dict, Any
 from datetime import datetime
@@ -62,7 +63,19 @@ class FileDB:
                 )
             ''')
             
-            # 3. 创建索引提高查询速度
+            # 3. 创建media_probes表 - 缓存每个文件的 ffprobe 结果（时长、流、编码、码率）
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS media_probes (
+                    file_hash TEXT PRIMARY KEY,
+                    duration REAL,
+                    format_name TEXT,
+                    bit_rate INTEGER,
+                    probe_json TEXT NOT NULL,
+                    probed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # 4. 创建索引提高查询速度
             conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_file ON tasks(file_hash)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_type ON tasks(task_type)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)')
@@ -121,7 +134,6 @@ class FileDB:
             
             file_info = dict(row)
             # 解析processed_operations字段
-            import json
             try:
                 file_info['processed_operations'] = json.loads(file_info['processed_operations'])
             except json.JSONDecodeError:
@@ -222,6 +234,49 @@ class FileDB:
             logger.info(f"移除文件处理操作: {file_hash} -> {operation}")
             return True
     
+    # ==================== 媒体探测缓存 ====================
+    
+    def save_media_probe(self, file_hash: str, probe: Dict[str, Any]):
+        """
+        保存 ffprobe 结果（同一文件重复保存时覆盖）
+        :param file_hash: 文件哈希
+        :param probe: ffmpeg.probe 返回的完整字典
+        """
+        fmt = probe.get("format", {})
+        duration = float(fmt["duration"]) if fmt.get("duration") else None
+        bit_rate = int(fmt["bit_rate"]) if fmt.get("bit_rate") else None
+        with self._get_conn() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO media_probes (file_hash, duration, format_name, bit_rate, probe_json)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (file_hash, duration, fmt.get("format_name"), bit_rate, json.dumps(probe, ensure_ascii=False))
+            )
+            conn.commit()
+            logger.info(f"媒体探测结果已缓存: {file_hash} (时长 {duration}s)")
+    
+    def get_media_probe(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        获取缓存的 ffprobe 结果
+        :return: 与 ffmpeg.probe 返回格式相同的字典，未缓存时返回 None
+        """
+        with self._get_conn() as conn:
+            cursor = conn.execute("SELECT probe_json FROM media_probes WHERE file_hash = ?", (file_hash,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            try:
+                return json.loads(row["probe_json"])
+            except json.JSONDecodeError:
+                logger.warning(f"媒体探测缓存已损坏，忽略: {file_hash}")
+                return None
+    
+    def get_media_duration(self, file_hash: str) -> Optional[float]:
+        """获取缓存的媒体时长（秒），未缓存时返回 None"""
+        with self._get_conn() as conn:
+            cursor = conn.execute("SELECT duration FROM media_probes WHERE file_hash = ?", (file_hash,))
+            row = cursor.fetchone()
+            return row["duration"] if row else None
+    
     # ==================== 任务操作 ====================
     
     def create_task(self, task_id: str, file_hash: str, task_type: str = "transcribe") -> bool:
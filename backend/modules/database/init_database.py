@@ -5,7 +5,7 @@
 
 功能：
 - 创建SQLite数据库文件
-- 创建必要的表结构（files和tasks表）
+- 创建必要的表结构（files、tasks和media_probes表）
 - 创建索引以提高性能
 - 提供重置数据库的选项
 - 显示初始化过程的日志信息
@@ -118,6 +118,19 @@ class DatabaseInitializer:
                     )
                 ''')
                 
+                # 创建media_probes表
+                logger.info("创建media_probes表")
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS media_probes (
+                        file_hash TEXT PRIMARY KEY,
+                        duration REAL,
+                        format_name TEXT,
+                        bit_rate INTEGER,
+                        probe_json TEXT NOT NULL,
+                        probed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                
                 # 创建索引
                 logger.info("创建索引")
                 conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_file ON tasks(file_hash)')
@@ -178,6 +191,21 @@ class DatabaseInitializer:
                 ''')
                 logger.info("processed_operations列添加成功")
             
+            # 检查并创建media_probes表
+            cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='media_probes'")
+            if cursor.fetchone() is None:
+                logger.info("创建media_probes表")
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS media_probes (
+                        file_hash TEXT PRIMARY KEY,
+                        duration REAL,
+                        format_name TEXT,
+                        bit_rate INTEGER,
+                        probe_json TEXT NOT NULL,
+                        probed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+            
             conn.commit()
             
         except Exception as e:
@@ -222,6 +250,19 @@ class DatabaseInitializer:
                     logger.warning(f"tasks表缺少列: {col}")
                     return False
             
+            # 检查media_probes表
+            cursor = conn.execute("PRAGMA table_info(media_probes)")
+            probe_columns = [row[1] for row in cursor.fetchall()]
+            
+            required_probe_columns = [
+                'file_hash', 'duration', 'format_name', 'bit_rate', 'probe_json', 'probed_at'
+            ]
+            
+            for col in required_probe_columns:
+                if col not in probe_columns:
+                    logger.warning(f"media_probes表缺少列: {col}")
+                    return False
+            
             # 检查索引
             cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='index'")
             indexes = [row[0] for row in cursor.fetchall()]
@@ -258,6 +299,10 @@ class DatabaseInitializer:
                 cursor = conn.execute("SELECT COUNT(*) FROM tasks")
                 tasks_count = cursor.fetchone()[0]
                 
+                # 获取已缓存的媒体探测结果数量
+                cursor = conn.execute("SELECT COUNT(*) FROM media_probes")
+                probes_count = cursor.fetchone()[0]
+                
                 # 获取任务状态统计
                 cursor = conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status")
                 task_status_stats = {}
@@ -268,6 +313,7 @@ class DatabaseInitializer:
                     "database_path": self.db_path,
                     "files_count": files_count,
                     "tasks_count": tasks_count,
+                    "media_probes_count": probes_count,
                     "task_status_stats": task_status_stats,
                     "file_size": os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
                 }
@@ -1,6 +1,13 @@
 from .separator import Separator 
-from .distract import distractor
-from .compress import compresser
+from .distract import (
+    distractor, distract_speech_regions, distractor_parallel, iter_vocal_windows, preload_separator,
+    separate_vocals, shutdown_separation_pools,
+)
+from .service import SeparationService, get_separation_service
+from .quantize import quantize_model
+from .compress import compresser, ensure_mp3
+from .music_detector import detect_music
+from .denoise import denoise, iter_denoised_windows, spectral_gate
 '''
 需要有pytorch cuda 同时安装onnxruntime-gpu才可以调用gpu加速
 这个模块中的所有函数/对象最好全部显式指定路径
@@ -12,4 +19,7 @@ compresser(输入路径, 输出路径)  这个是压缩
 separator = Separator()     这个是分离音轨对象的初始化
 separator.extract_audio(输入路径, 输出路径) 这个是分离出人声音轨
 distractor(输入路径, 输出路径)  这个是去伴奏
+iter_vocal_windows(输入路径, 窗口列表, 临时目录)  这个是按窗口去伴奏但不写文件，逐个产出人声数组供转录
+detect_music(输入路径)  这个是检测背景音乐，无音乐时可跳过去伴奏
+denoise(输入路径, 输出路径)  这个是谱门限降噪，只有轻度底噪时可代替去伴奏
 '''
\ No newline at end of file
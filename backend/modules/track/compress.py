@@ -50,5 +50,26 @@ def compresser(input_path: str, output_path: Optional[str] = None) -> Optional[s
         logger.error(f"FFmpeg 压缩失败: {error_msg}")
         return None
 
+def ensure_mp3(input_path: str) -> Optional[str]:
+    """
+    按需生成面向用户的 MP3：流水线内部以无损格式保存音频，仅在下载时编码一次。
+    结果缓存在同目录的同名 .mp3 中（源文件更新后重新编码），先写临时文件再重命名，并发下载不会读到半截文件。
+
+    Returns:
+        Optional[str]: MP3 路径，若编码失败则返回 None。
+    """
+    base, ext = os.path.splitext(input_path)
+    if ext.lower() == ".mp3":
+        return input_path
+    output_path = f"{base}.mp3"
+    if os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(input_path):
+        return output_path
+
+    temp_path = f"{base}.{os.getpid()}.part.mp3"
+    if compresser(input_path, temp_path) is None:
+        return None
+    os.replace(temp_path, output_path)
+    return output_path
+
 # 使用示例
 # normalize_audio("test.wav")
\ No newline at end of file
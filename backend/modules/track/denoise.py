@@ -0,0 +1,171 @@
+"""
+轻量级人声增强：谱门限（spectral gating）降噪，作为 UVR-MDX-NET 人声分离的廉价替代后端。
+
+适用于只有轻度背景噪声（风扇、空调、底噪）的内容，不适合去除背景音乐：
+    1. 以 16kHz 单声道流式解码（Whisper 的输入格式，无需再重采样），按块做 STFT
+    2. 每块取能量最低的一部分帧估计各频点的噪声均值与标准差，门限 = 均值 + n_std × 标准差
+    3. 低于门限的时频点衰减，掩码在时间与频率方向平滑以避免"音乐噪声"，再 ISTFT 还原
+所有帧、频点一次性向量化计算，单核即可达到数百倍实时；块之间带有上下文重叠，峰值内存与媒体时长无关。
+"""
+import contextlib
+import logging
+import os
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy import signal
+
+logger = logging.getLogger(__name__)
+
+# 处理采样率，与 Whisper 的输入一致（modules.audio.pcm.SAMPLE_RATE）
+SAMPLE_RATE = 16000
+# STFT 参数（16kHz 下 32ms 窗、8ms 帧移）
+N_FFT = 512
+HOP = 128
+# 每块中能量最低的该百分比帧视为噪声帧
+NOISE_PERCENTILE = 15
+# 掩码平滑范围：频率方向 ±FREQ_SMOOTH 个频点，时间方向 ±TIME_SMOOTH 帧
+FREQ_SMOOTH = 2
+TIME_SMOOTH = 4
+# 块之间的上下文重叠（样本数），保证块边界处的 STFT 帧完整
+CONTEXT = N_FFT * 4
+
+
+def _smoothing_kernel() -> np.ndarray:
+    kernel = np.outer(np.hanning(2 * FREQ_SMOOTH + 3)[1:-1], np.hanning(2 * TIME_SMOOTH + 3)[1:-1])
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def spectral_gate(audio: np.ndarray, sample_rate: int = SAMPLE_RATE, n_std: float = 1.5,
+                  prop_decrease: float = 1.0) -> np.ndarray:
+    """
+    对一段单声道音频做谱门限降噪
+    Args:
+        audio: 一维 float32 数组
+        sample_rate: 采样率
+        n_std: 门限高出噪声均值的标准差倍数，越大降噪越强、越容易损伤弱辅音
+        prop_decrease: 门限以下部分的衰减比例（1.0 为完全去除）
+    Returns:
+        与输入等长的一维 float32 数组
+    """
+    if len(audio) < N_FFT:
+        return np.asarray(audio, dtype=np.float32)
+    _, _, spectrum = signal.stft(audio, fs=sample_rate, nperseg=N_FFT, noverlap=N_FFT - HOP)
+    magnitude_db = 20 * np.log10(np.abs(spectrum) + 1e-10)
+
+    # 噪声统计只取最安静的帧（语音停顿处），逐频点计算
+    frame_energy = magnitude_db.mean(axis=0)
+    noise_frames = magnitude_db[:, frame_energy <= np.percentile(frame_energy, NOISE_PERCENTILE)]
+    threshold = noise_frames.mean(axis=1, keepdims=True) + n_std * noise_frames.std(axis=1, keepdims=True)
+
+    mask = signal.fftconvolve((magnitude_db > threshold).astype(np.float32), _smoothing_kernel(), mode="same")
+    mask = 1.0 - prop_decrease * (1.0 - np.clip(mask, 0.0, 1.0))
+    _, output = signal.istft(spectrum * mask, fs=sample_rate, nperseg=N_FFT, noverlap=N_FFT - HOP)
+    return output[:len(audio)].astype(np.float32)
+
+
+def iter_denoised(input_path: str, block_s: float = 60.0, **kwargs) -> Iterator[np.ndarray]:
+    """
+    流式降噪：以 16kHz 单声道按块解码、降噪并依次产出（拼接后与源音频等长）。
+    每块两侧附带 CONTEXT 个样本的上下文，处理后裁掉，块边界处无接缝。
+    Args:
+        input_path: 音频/视频文件路径
+        block_s: 单块时长（秒），噪声统计按块独立估计，可跟随噪声的缓慢变化
+        **kwargs: 传给 spectral_gate 的参数（n_std / prop_decrease）
+    Yields:
+        一维 float32 数组
+    """
+    # 延迟导入：API 进程导入 modules.track 时不加载 faster-whisper
+    from ..audio.pcm import PcmStream
+
+    block = int(block_s * SAMPLE_RATE)
+    with PcmStream(input_path, SAMPLE_RATE) as stream:
+        previous = np.zeros(0, dtype=np.float32)
+        current = stream.read(block)
+        while len(current):
+            following = stream.read(block) if len(current) == block else np.zeros(0, dtype=np.float32)
+            head = previous[len(previous) - CONTEXT:] if len(previous) > CONTEXT else previous
+            padded = np.concatenate([head, current, following[:CONTEXT]])
+            yield spectral_gate(padded, SAMPLE_RATE, **kwargs)[len(head):len(head) + len(current)]
+            previous, current = current, following
+
+
+def iter_denoised_windows(input_path: str, windows: List[Tuple[float, float]], skip: Iterable[int] = (),
+                          **kwargs) -> Iterator[Optional[np.ndarray]]:
+    """
+    流式降噪并按窗口产出（供内存交接直接转录）。iter_denoised 的连续块在滚动缓冲区中拼接，
+    只保留尚未产出的窗口所需的样本，峰值内存约为一个窗口加一个块，与媒体时长无关。
+    Args:
+        input_path: 音频/视频文件路径
+        windows: 按起点升序的 [(起始秒, 结束秒), ...]，相邻窗口可以重叠
+        skip: 不需要音频的窗口序号，以 None 占位；其后不再有需要的窗口时不再解码
+        **kwargs: 传给 iter_denoised 的参数
+    Yields:
+        每个窗口一个一维 float32 数组（或 None）
+    """
+    skip = set(skip)
+    last = max((index for index in range(len(windows)) if index not in skip), default=-1)
+    start_time = time.perf_counter()
+    buffer = np.zeros(0, dtype=np.float32)
+    offset = 0      # 缓冲区首样本在整条音频中的位置
+    with contextlib.closing(iter_denoised(input_path, **kwargs)) as blocks:
+        for index, (start_s, end_s) in enumerate(windows):
+            if index in skip:
+                yield None
+                continue
+            start, end = int(start_s * SAMPLE_RATE), int(end_s * SAMPLE_RATE)
+            while offset + len(buffer) < end:
+                block = next(blocks, None)
+                if block is None:
+                    break
+                buffer = np.concatenate([buffer, block])
+                # 丢弃当前窗口之前的样本（包括被跳过的窗口）
+                drop = min(max(0, start - offset), len(buffer))
+                buffer = buffer[drop:]
+                offset += drop
+            yield buffer[max(0, start - offset):end - offset]
+            if index == last:
+                _log_speed(input_path, end / SAMPLE_RATE, time.perf_counter() - start_time)
+
+
+def denoise(input_path: str, output_dir: Optional[str] = None, output_format: str = "mp3",
+            **kwargs) -> Optional[str]:
+    """
+    谱门限降噪，输出 16kHz 单声道人声文件（文件名与 distractor 的输出一致）。
+    返回值与 distractor 相同（人声文件路径，失败时为 None）。
+    """
+    from .timeline import _close, _open_writer
+
+    input_path = os.path.abspath(input_path)
+    actual_output_dir = os.path.abspath(output_dir) if output_dir else os.path.abspath("./distract_output/")
+    os.makedirs(actual_output_dir, exist_ok=True)
+    if not os.path.exists(input_path):
+        logger.error(f"找不到输入文件: {input_path}")
+        return None
+
+    name = os.path.splitext(os.path.basename(input_path))[0]
+    output_path = os.path.join(actual_output_dir, f"{name}_(Vocals).{output_format}")
+    try:
+        start = time.perf_counter()
+        writer = _open_writer(output_path, SAMPLE_RATE, channels=1)
+        samples = 0
+        failed = True
+        try:
+            for chunk in iter_denoised(input_path, **kwargs):
+                writer.stdin.write(chunk.tobytes())
+                samples += len(chunk)
+            failed = False
+        finally:
+            _close(writer, output_path, check=not failed)
+        _log_speed(input_path, samples / SAMPLE_RATE, time.perf_counter() - start)
+        return output_path
+
+    except Exception as e:
+        logger.error(f"谱门限降噪过程中发生错误: {e}")
+        return None
+
+
+def _log_speed(input_path: str, duration: float, elapsed: float) -> None:
+    logger.info(f"谱门限降噪完成: {os.path.basename(input_path)}，{duration:.0f}s 音频耗时 {elapsed:.2f}s "
+                f"({duration / elapsed if elapsed else 0:.0f}x 实时)")
@@ -1,47 +1,34 @@
 import os
+import time
 import logging
-from typing import Optional
-from audio_separator.separator import Separator
+import tempfile
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .service import DEFAULT_MODEL_FILENAME, default_precision, get_separation_service
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
-# --- 模型单例挂载区域 ---
-_GLOBAL_SEPARATOR = None
+# --- 模型常驻挂载区域 ---
+# 模型由 SeparationService 常驻持有（按模型文件名与精度各加载一次，输出格式随请求指定），
+# 所有分离请求经服务队列由单个线程执行，多线程 / gevent worker 下不存在共享输出目录的竞争
 
-def _get_initialized_separator(output_dir: str):
-    """
-    懒加载单例：确保模型在进程生命周期内只加载一次，并在后续调用中复用。
-    """
-    global _GLOBAL_SEPARATOR
-    if _GLOBAL_SEPARATOR is None:
-        logger.info("正在执行模型首次常驻挂载 (UVR-MDX-NET)...")
-        # 采用高保真平衡配置
-        mdx_params = {
-            "hop_length": 1024,
-            "segment_size": 256, 
-            "overlap": 0.25,
-            "batch_size": 16, 
-        }
-        _GLOBAL_SEPARATOR = Separator(
-            output_format="mp3",
-            output_single_stem="Vocals",
-            output_dir=output_dir,
-            log_level=logging.WARNING,
-            mdx_params=mdx_params
-        )
-        # 这是最耗时的 IO 和计算操作
-        _GLOBAL_SEPARATOR.load_model(model_filename="UVR-MDX-NET-Inst_HQ_5.onnx")
-    else:
-        # 如果已经加载，仅动态更新当前的输出目录，不重新加载模型
-        _GLOBAL_SEPARATOR.output_dir = output_dir
-        
-    return _GLOBAL_SEPARATOR
+def preload_separator(model_filename: str = DEFAULT_MODEL_FILENAME, precision: Optional[str] = None) -> None:
+    """预热：提前加载分离模型并常驻内存（用于 worker 启动阶段）"""
+    get_separation_service(model_filename, precision)
 
-def distractor(input_path: str, output_dir: Optional[str] = None) -> Optional[str]:
+def distractor(input_path: str, output_dir: Optional[str] = None, output_format: str = "mp3") -> Optional[str]:
     """
     使用 AI 模型从音频中提取人声（单例加速版）。
     原有调用逻辑不变，但第二次及以后的调用将省去模型加载时间。
+    output_format 为人声文件格式，流水线内部使用无损格式（如 flac）供 Whisper 直接读取。
     """
     input_path = os.path.abspath(input_path)
     # 确定实际输出路径
@@ -57,19 +44,8 @@ def distractor(input_path: str, output_dir: Optional[str] = None) -> Optional[st
     try:
         logger.info(f"接收到人声分离请求: {os.path.basename(input_path)}")
         
-        # 获取常驻内存的模型实例
-        separator = _get_initialized_separator(actual_output_dir)
-        
-        # 执行分离 (由于模型已在内存，此处将立即开始推理)
-        output_files = separator.separate(audio_file_path=input_path)
-        
-        if not output_files:
-            logger.error("分离结果为空")
-            return None
-
-        # 查找包含 Vocals 的文件
-        vocals_file = next((f for f in output_files if "Vocals" in f), output_files[0])
-        full_path = vocals_file if os.path.isabs(vocals_file) else os.path.join(actual_output_dir, vocals_file)
+        # 提交到常驻模型的分离服务（由于模型已在内存，此处将立即开始推理）
+        full_path = get_separation_service().separate(input_path, actual_output_dir, output_format)
         
         if os.path.exists(full_path):
             logger.info(f"分离任务完成: {full_path}")
@@ -82,6 +58,287 @@ def distractor(input_path: str, output_dir: Optional[str] = None) -> Optional[st
         logger.error(f"人声分离过程中发生错误: {e}")
         return None
 
+# --- 并行窗口分离 ---
+# 进程池按 (模型文件名, 精度, 工作进程数, 每进程线程数) 缓存，在进程生命周期内复用；
+# 每个工作进程在初始化时加载一次模型
+_SEPARATION_POOLS: Dict[Tuple[str, Optional[str], int, int], ProcessPoolExecutor] = {}
+_LOCK = threading.Lock()
+# 窗口模型输入的格式：float32 WAV，不引入量化误差（分离结果经共享内存交回，不写文件）
+_WINDOW_FORMAT = "wav"
+# 工作进程初始化时加载的模型与精度，_separate_window 据此取用同一个常驻服务
+_WORKER_MODEL_FILENAME = DEFAULT_MODEL_FILENAME
+_WORKER_PRECISION: Optional[str] = None
+
+
+def _limit_onnx_threads(threads: int) -> None:
+    """
+    限制工作进程内 ONNX Runtime 的线程数。audio-separator 创建 InferenceSession 时不提供
+    SessionOptions，默认会占满所有物理核心，多进程并行时严重超订；此处替换工作进程内的
+    InferenceSession，为其注入线程上限（只影响该工作进程）。
+    """
+    import onnxruntime as ort
+
+    base = ort.InferenceSession
+
+    class _ThreadLimitedSession(base):
+        def __init__(self, path_or_bytes, sess_options=None, *args, **kwargs):
+            sess_options = sess_options or ort.SessionOptions()
+            sess_options.intra_op_num_threads = threads
+            sess_options.inter_op_num_threads = 1
+            super().__init__(path_or_bytes, sess_options, *args, **kwargs)
+
+    ort.InferenceSession = _ThreadLimitedSession
+
+
+def _init_separation_worker(model_filename: str, precision: Optional[str], threads: int) -> None:
+    """进程池初始化函数：限制线程数并加载分离模型"""
+    global _WORKER_MODEL_FILENAME, _WORKER_PRECISION
+    _WORKER_MODEL_FILENAME = model_filename
+    _WORKER_PRECISION = precision
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _limit_onnx_threads(threads)
+    logger.info(f"分离工作进程 {os.getpid()} 正在加载模型: {model_filename} (precision={precision}, threads={threads})")
+    preload_separator(model_filename, precision)
+
+
+def _to_shared(audio: np.ndarray) -> Tuple[str, Tuple[int, ...]]:
+    """把数组复制到新建的共享内存块，返回 (块名称, 形状)；块由读取方负责释放"""
+    block = shared_memory.SharedMemory(create=True, size=max(1, audio.nbytes))
+    np.ndarray(audio.shape, dtype=np.float32, buffer=block.buf)[:] = audio
+    block.close()
+    return block.name, audio.shape
+
+
+def _from_shared(handle: Tuple[str, Tuple[int, ...]]) -> np.ndarray:
+    """读取 _to_shared 产出的共享内存块为普通数组，并释放该块"""
+    name, shape = handle
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return np.ndarray(shape, dtype=np.float32, buffer=block.buf).copy()
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _separate_window(window_path: str) -> Tuple[str, Tuple[int, ...]]:
+    """在工作进程中分离单个窗口，人声经共享内存交回主进程（进程间不经过文件，也不经 pickle 管道传输样本）"""
+    service = get_separation_service(_WORKER_MODEL_FILENAME, _WORKER_PRECISION)
+    return _to_shared(service.separate_array(window_path))
+
+
+def get_separation_pool(workers: int, threads: int, model_filename: str = DEFAULT_MODEL_FILENAME,
+                        precision: Optional[str] = None) -> ProcessPoolExecutor:
+    key = (model_filename, precision, workers, threads)
+    with _LOCK:
+        pool = _SEPARATION_POOLS.get(key)
+        if pool is None:
+            logger.info(f"创建人声分离进程池: {workers} 个工作进程，每进程 {threads} 线程")
+            # 使用 spawn 启动，避免 fork 继承父进程中 ONNX Runtime / torch 的线程状态
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_separation_worker,
+                initargs=(model_filename, precision, threads),
+            )
+            _SEPARATION_POOLS[key] = pool
+        return pool
+
+
+def shutdown_separation_pools() -> None:
+    """关闭并释放所有人声分离进程池"""
+    with _LOCK:
+        for pool in _SEPARATION_POOLS.values():
+            pool.shutdown(wait=True)
+        _SEPARATION_POOLS.clear()
+
+
+def distractor_parallel(input_path: str, output_dir: Optional[str] = None, output_format: str = "mp3",
+                        workers: int = 4, threads_per_worker: int = 0,
+                        window_s: float = 120.0, overlap_s: float = 4.0,
+                        sample_rate: int = 44100) -> Optional[str]:
+    """
+    并行窗口分离：把长音轨切分为相邻重叠的窗口，在进程池中并行分离（每个进程独立加载模型并限制
+    ONNX 线程数），再在重叠区交叉淡化拼接。音轨不足两个窗口时直接调用 distractor。
+
+    Args:
+        input_path: 源音轨
+        output_dir: 输出目录
+        output_format: 人声文件格式
+        workers: 工作进程数
+        threads_per_worker: 每个工作进程的 ONNX 线程数，0 表示按 CPU 核数平均划分
+        window_s: 窗口长度（秒）
+        overlap_s: 相邻窗口重叠长度（秒）
+        sample_rate: 采样率，应与分离模型一致
+    Returns:
+        与 distractor 相同（人声文件路径，失败时为 None）
+    """
+    from .separator import Separator as TrackSeparator
+    from .timeline import TimelineWriter, plan_windows
+
+    input_path = os.path.abspath(input_path)
+    actual_output_dir = os.path.abspath(output_dir) if output_dir else os.path.abspath("./distract_output/")
+    os.makedirs(actual_output_dir, exist_ok=True)
+    if not os.path.exists(input_path):
+        logger.error(f"找不到输入文件: {input_path}")
+        return None
+
+    try:
+        duration = float(TrackSeparator.probe_media(input_path)["format"]["duration"])
+        if workers <= 1 or duration <= window_s or multiprocessing.current_process().daemon:
+            return distractor(input_path, actual_output_dir, output_format)
+
+        start = time.perf_counter()
+        name = os.path.splitext(os.path.basename(input_path))[0]
+        output_path = os.path.join(actual_output_dir, f"{name}_(Vocals).{output_format}")
+        windows = plan_windows([(0.0, duration)], window_s, overlap_s)
+        logger.info(f"并行人声分离: {len(windows)} 个窗口, {workers} 个工作进程")
+        with tempfile.TemporaryDirectory() as work_dir, \
+                TimelineWriter(output_path, int(duration * sample_rate), sample_rate) as timeline:
+            for audio, start_s in iter_vocal_windows(input_path, windows, work_dir, workers, sample_rate,
+                                                     threads_per_worker):
+                timeline.add(audio, int(start_s * sample_rate))
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"并行人声分离完成: {output_path}，耗时 {elapsed:.2f}s ({duration / elapsed:.1f}x 实时)")
+        return output_path
+
+    except Exception as e:
+        logger.error(f"并行人声分离过程中发生错误: {e}")
+        return None
+
+
+def iter_vocal_windows(input_path: str, windows: List[Tuple[float, float]], work_dir: str,
+                       workers: int = 0, sample_rate: int = 44100, threads_per_worker: int = 0,
+                       model_filename: str = DEFAULT_MODEL_FILENAME,
+                       precision: Optional[str] = None) -> Iterator[Tuple[np.ndarray, float]]:
+    """
+    按时间顺序逐窗口分离人声并立即产出，供下游（转录 / 拼接）边分离边消费。
+    workers 大于 1 时在进程池中并行分离，在途窗口数限制为工作进程数的 2 倍，按提交顺序产出。
+    只有模型输入窗口会短暂写入 work_dir，分离结果全部在内存中交接。
+
+    Args:
+        input_path: 源音轨
+        windows: plan_windows 规划的 [(起始秒, 结束秒), ...]
+        work_dir: 模型输入窗口的临时目录
+        workers: 并行工作进程数，0 或 1 使用常驻单例模型
+        sample_rate: 采样率，应与分离模型一致
+        threads_per_worker: 每个工作进程的 ONNX 线程数，0 表示按 CPU 核数平均划分
+        model_filename: 分离模型文件名（单例模式与工作进程使用同一模型）
+        precision: 模型精度，None 表示使用 SEPARATOR_MODEL_PRECISION
+    Yields:
+        (形状 (帧数, 声道数) 的 float32 人声数组, 窗口起始秒)
+    Raises:
+        RuntimeError: 某个窗口分离失败
+    """
+    from .timeline import cut_window
+
+    use_pool = workers > 1 and not multiprocessing.current_process().daemon
+    threads = threads_per_worker or max(1, (os.cpu_count() or 1) // max(1, workers))
+    # 在主进程解析精度，工作进程无需读取后端配置
+    precision = precision or default_precision()
+    pool = get_separation_pool(workers, threads, model_filename, precision) if use_pool else None
+    service = get_separation_service(model_filename, precision) if pool is None else None
+
+    def finish(future: Future, window_path: str, start_s: float) -> Tuple[np.ndarray, float]:
+        try:
+            result = future.result()
+        except Exception as e:
+            raise RuntimeError(f"窗口 {start_s:.1f}s 人声分离失败: {e}") from e
+        finally:
+            os.remove(window_path)
+        return (_from_shared(result) if pool is not None else result), start_s
+
+    in_flight = deque()
+    try:
+        for index, (start_s, end_s) in enumerate(windows):
+            window_path = cut_window(input_path, os.path.join(work_dir, f"window_{index:04d}.{_WINDOW_FORMAT}"),
+                                     start_s, end_s - start_s, sample_rate)
+            # 单例模式同样经服务队列异步提交，模型分离当前窗口时即可截取下一个窗口
+            future = pool.submit(_separate_window, window_path) if pool is not None else service.submit(window_path)
+            in_flight.append((future, window_path, start_s))
+            if len(in_flight) >= (workers * 2 if pool is not None else 2):
+                yield finish(*in_flight.popleft())
+        while in_flight:
+            yield finish(*in_flight.popleft())
+    finally:
+        # 消费方提前退出（如转录失败）时，等待在途窗口结束并释放其共享内存
+        for future, _, _ in in_flight:
+            try:
+                result = future.result()
+            except Exception:
+                continue
+            if pool is not None:
+                _from_shared(result)
+
+
+def separate_vocals(input_path: str, output_dir: Optional[str] = None, output_format: str = "mp3",
+                    workers: int = 0) -> Optional[str]:
+    """按工作进程数选择并行窗口分离或常驻单例分离"""
+    if workers > 1:
+        if not multiprocessing.current_process().daemon:
+            return distractor_parallel(input_path, output_dir, output_format, workers=workers)
+        # 守护进程不允许创建子进程，退回单例分离
+        logger.warning("当前进程为守护进程，无法创建人声分离进程池，改为单例分离")
+    return distractor(input_path, output_dir, output_format)
+
+
+def distract_speech_regions(input_path: str, output_dir: Optional[str] = None, output_format: str = "mp3",
+                            sample_rate: int = 44100, max_speech_ratio: float = 0.9,
+                            workers: int = 0) -> Optional[str]:
+    """
+    只对语音区域运行人声分离：先检测语音区域（含余量），把这些区域拼接为紧凑音频送入模型，
+    再把分离结果写回原始时间轴，其余部分为静音。MDX 推理量与语音时长成正比。
+
+    语音占比达到 max_speech_ratio 时拼接已无收益，直接对整条音轨分离。
+    workers 大于 1 时紧凑音频（或整条音轨）通过 distractor_parallel 并行分离。
+    返回值与 distractor 相同（人声文件路径，失败时为 None）。
+    """
+    from .timeline import compact_to_windows, detect_speech_windows, expand_from_windows
+
+    input_path = os.path.abspath(input_path)
+    actual_output_dir = os.path.abspath(output_dir) if output_dir else os.path.abspath("./distract_output/")
+    os.makedirs(actual_output_dir, exist_ok=True)
+    if not os.path.exists(input_path):
+        logger.error(f"找不到输入文件: {input_path}")
+        return None
+
+    try:
+        start = time.perf_counter()
+        windows, duration = detect_speech_windows(input_path)
+        speech_s = sum(end - begin for begin, end in windows)
+        ratio = speech_s / duration if duration else 0.0
+        logger.info(f"语音区域检测: {len(windows)} 个区域, 语音 {speech_s:.0f}s / {duration:.0f}s ({ratio:.1%}), "
+                    f"耗时 {time.perf_counter() - start:.2f}s")
+        if ratio >= max_speech_ratio:
+            return separate_vocals(input_path, actual_output_dir, output_format, workers)
+
+        name = os.path.splitext(os.path.basename(input_path))[0]
+        output_path = os.path.join(actual_output_dir, f"{name}_(Vocals).{output_format}")
+        with tempfile.TemporaryDirectory(dir=actual_output_dir) as work_dir:
+            if not windows:
+                # 全程无语音：输出等长静音，转录结果为空
+                total_frames = int(duration * sample_rate)
+                return expand_from_windows(None, output_path, [], total_frames, sample_rate)
+
+            compact_path = os.path.join(work_dir, f"{name}_speech.wav")
+            total_frames = compact_to_windows(input_path, compact_path, windows, sample_rate)
+            compact_vocals = separate_vocals(compact_path, work_dir, output_format, workers)
+            if not compact_vocals:
+                return None
+            expand_from_windows(compact_vocals, output_path, windows, total_frames, sample_rate)
+
+        logger.info(f"语音区域人声分离完成: {output_path}，总耗时 {time.perf_counter() - start:.2f}s")
+        return output_path
+
+    except Exception as e:
+        logger.error(f"语音区域人声分离过程中发生错误: {e}")
+        return None
+
 if __name__ == "__main__":
     # 配置基础日志显示输出
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -0,0 +1,70 @@
+"""
+分离模型量化：用 onnxruntime.quantization 把 UVR-MDX-NET 的 FP32 ONNX 模型转换为 INT8 模型。
+
+采用动态量化：权重离线量化为 8 位，激活的量化参数在推理时按输入计算，不需要校准数据，
+也不改变模型的输入输出（STFT 前后处理仍由 audio-separator 完成）。
+卷积被替换为 ConvInteger，收益取决于 CPU 的整数指令支持（AVX2 / AVX512-VNNI），
+部署前请用 benchmark.bench_quantization 在目标机器上实测速度与转录质量。
+
+量化模型保存在原模型旁（<模型名>.int8.onnx），只在首次使用时生成一次。
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 可选精度：fp32 为原始模型
+PRECISIONS = ("fp32", "int8")
+
+_LOCK = threading.Lock()
+
+
+def quantized_model_path(model_path: str, precision: str = "int8") -> str:
+    """量化模型的保存路径：<模型目录>/<模型名>.<精度>.onnx"""
+    base, ext = os.path.splitext(model_path)
+    return f"{base}.{precision}{ext}"
+
+
+def quantize_model(model_path: str, precision: str = "int8", per_channel: bool = False) -> str:
+    """
+    生成（或复用已生成的）量化模型
+    Args:
+        model_path: FP32 ONNX 模型路径
+        precision: 目标精度，目前仅支持 int8
+        per_channel: 是否按输出通道分别量化权重（精度略高，模型略大）
+    Returns:
+        量化模型路径
+    Raises:
+        ValueError: 不支持的精度
+    """
+    if precision not in PRECISIONS or precision == "fp32":
+        raise ValueError(f"不支持的量化精度: {precision}，可选: {', '.join(p for p in PRECISIONS if p != 'fp32')}")
+    output_path = quantized_model_path(model_path, precision)
+    with _LOCK:
+        if os.path.exists(output_path):
+            return output_path
+
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        start = time.perf_counter()
+        logger.info(f"正在生成 {precision} 量化模型: {output_path}")
+        # 先写临时文件再重命名，多个进程同时量化时不会读到不完整的模型
+        fd, partial_path = tempfile.mkstemp(suffix=".onnx", dir=os.path.dirname(output_path))
+        os.close(fd)
+        try:
+            # CPU 上的 ConvInteger 只实现了 uint8 权重
+            quantize_dynamic(model_input=model_path, model_output=partial_path,
+                             weight_type=QuantType.QUInt8, per_channel=per_channel)
+            os.replace(partial_path, output_path)
+        except Exception:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        logger.info(
+            f"量化完成，耗时 {time.perf_counter() - start:.1f}s，模型大小 "
+            f"{os.path.getsize(model_path) / 2**20:.1f}MB -> {os.path.getsize(output_path) / 2**20:.1f}MB"
+        )
+    return output_path
@@ -6,6 +6,30 @@ from typing import Dict, List, Optional, Tuple
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 音频输出格式 -> ffmpeg 编码参数。mp3 为面向用户的发布格式；flac / wav 为无损中间格式，
+# 供流水线下一阶段（人声分离、Whisper）直接读取，避免多次有损编解码
+AUDIO_FORMATS: Dict[str, Dict[str, str]] = {
+    "mp3": {"acodec": "libmp3lame", "audio_bitrate": "128k"},
+    "flac": {"acodec": "flac"},
+    "wav": {"acodec": "pcm_s16le"},
+}
+
+# 下游（人声分离、Whisper、按需 MP3 编码）均通过 ffmpeg / librosa 解码并在读取时重采样，可直接读取的源编码 -> 封装容器。
+# 开启 stream_copy 时这些音轨以 -c:a copy 重封装（保留源采样率），不再重新编码
+STREAM_COPY_CONTAINERS: Dict[str, str] = {
+    "aac": "m4a",
+    "alac": "m4a",
+    "opus": "opus",
+    "vorbis": "ogg",
+    "mp3": "mp3",
+    "flac": "flac",
+    "pcm_s16le": "wav",
+}
+
+# 可直接转换为 srt 文本的字幕编码；图形字幕（PGS、DVD 等）无法转为文本，单次解复用时跳过，
+# 否则会导致整个多输出命令失败
+TEXT_SUBTITLE_CODECS = {"subrip", "srt", "ass", "ssa", "mov_text", "webvtt", "text"}
+
 
 class Separator:
     """
@@ -31,43 +55,107 @@ class Separator:
                 
         return name, output_dir
 
-    def extract_audio(self, input_path: str, output_dir: Optional[str] = None) -> List[str]:
+    @staticmethod
+    def probe_media(input_path: str) -> Dict:
         """
-        提取视频中的所有音频轨道并另存为 MP3。
+        探测媒体文件（ffprobe）。结果可按文件哈希缓存到数据库，
+        再通过各提取方法的 probe 参数传入，避免同一文件反复探测。
+
+        Raises:
+            FileNotFoundError: 输入文件不存在。
+            RuntimeError: ffprobe 失败。
         """
-        name, audio_dir = self._prepare_paths(input_path, output_dir)
-        
-        # 检查输入文件是否存在
         if not os.path.exists(input_path):
             logger.error(f"输入文件不存在: {input_path}")
             raise FileNotFoundError(f"Input file does not exist: {input_path}")
-        
         try:
-            probe = ffmpeg.probe(input_path)
+            return ffmpeg.probe(input_path)
         except Exception as e:
             logger.error(f"探测视频流失败: {str(e)}")
             raise RuntimeError(f"Failed to probe file {input_path}: {str(e)}") from e
+
+    @staticmethod
+    def _audio_output_spec(stream: Dict, audio_format: str, sample_rate: int,
+                           stream_copy: bool) -> Tuple[str, Dict[str, str]]:
+        """
+        根据源编码决定单路音轨的输出方式。
+        重封装不受源采样率限制（常见的 48kHz AAC 同样直接复制）：人声分离模型与 Whisper 在加载 PCM 时
+        各自重采样到所需采样率，sample_rate 只用于转码输出。
+
+        Returns:
+            (文件扩展名, ffmpeg 输出参数)：可重封装时为 (容器, -c:a copy)，否则按 audio_format 转码为 sample_rate。
+        """
+        container = STREAM_COPY_CONTAINERS.get(stream.get('codec_name'))
+        if stream_copy and container:
+            return container, {"acodec": "copy"}
+        return audio_format, dict(AUDIO_FORMATS[audio_format], ar=str(sample_rate))
+
+    def extract_audio(self, input_path: str, output_dir: Optional[str] = None,
+                      audio_format: str = "mp3", sample_rate: int = 44100,
+                      stream_copy: bool = False, probe: Optional[Dict] = None) -> List[str]:
+        """
+        提取视频中的所有音频轨道。
+
+        Args:
+            input_path: 输入视频路径。
+            output_dir: 输出目录。
+            audio_format: 输出格式（见 AUDIO_FORMATS），默认 mp3；流水线内部使用无损格式。
+            sample_rate: 转码时的输出采样率，应与下一阶段所需一致（重封装的音轨保留源采样率）。
+            stream_copy: 源编码可被下游直接读取（见 STREAM_COPY_CONTAINERS）时以 -c:a copy 重封装，
+                         输出扩展名随源编码而定；重封装失败时退回转码。
+            probe: 已缓存的探测结果（见 probe_media），提供时跳过 ffprobe。
+        """
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"不支持的音频格式: {audio_format}，可选: {', '.join(AUDIO_FORMATS)}")
+        name, audio_dir = self._prepare_paths(input_path, output_dir)
+        
+        # 检查输入文件是否存在
+        if not os.path.exists(input_path):
+            logger.error(f"输入文件不存在: {input_path}")
+            raise FileNotFoundError(f"Input file does not exist: {input_path}")
+        
+        if probe is None:
+            probe = self.probe_media(input_path)
             
         audio_streams = [s for s in probe['streams'] if s['codec_type'] == 'audio']
         
         extracted_files = []
-        for i, _ in enumerate(audio_streams):
-            out_file = os.path.join(audio_dir, f"{name}_track_{i}.mp3")
-            logger.info(f"提取音轨 -> {os.path.basename(out_file)}")
-            ffmpeg.input(input_path).output(
-                out_file, 
-                map=f'a:{i}', 
-                acodec='libmp3lame',
-                ar='44100',
-                audio_bitrate='128k'
-            ).run(overwrite_output=True, capture_stdout=True, capture_stderr=True)
+        for i, stream in enumerate(audio_streams):
+            ext, output_kwargs = self._audio_output_spec(stream, audio_format, sample_rate, stream_copy)
+            out_file = os.path.join(audio_dir, f"{name}_track_{i}.{ext}")
+            logger.info(f"提取音轨 -> {os.path.basename(out_file)} ({'重封装' if output_kwargs.get('acodec') == 'copy' else '转码'})")
+            try:
+                ffmpeg.input(input_path).output(
+                    out_file, 
+                    map=f'a:{i}', 
+                    **output_kwargs
+                ).run(overwrite_output=True, capture_stdout=True, capture_stderr=True)
+            except ffmpeg.Error:
+                if output_kwargs.get('acodec') != 'copy':
+                    raise
+                logger.warning(f"音轨 {i} 重封装失败，改为转码")
+                if os.path.exists(out_file):
+                    os.remove(out_file)
+                ext, output_kwargs = self._audio_output_spec(stream, audio_format, sample_rate, False)
+                out_file = os.path.join(audio_dir, f"{name}_track_{i}.{ext}")
+                ffmpeg.input(input_path).output(
+                    out_file,
+                    map=f'a:{i}',
+                    **output_kwargs
+                ).run(overwrite_output=True, capture_stdout=True, capture_stderr=True)
             extracted_files.append(out_file)
         
         return extracted_files
 
-    def extract_subtitles(self, input_path: str, output_dir: Optional[str] = None) -> List[str]:
+    def extract_subtitles(self, input_path: str, output_dir: Optional[str] = None,
+                          probe: Optional[Dict] = None) -> List[str]:
         """
         从视频中提取所有内置字幕流。
+
+        Args:
+            input_path: 输入视频路径。
+            output_dir: 输出目录。
+            probe: 已缓存的探测结果（见 probe_media），提供时跳过 ffprobe。
         """
         name, subtitle_dir = self._prepare_paths(input_path, output_dir)
 
@@ -76,11 +164,12 @@ class Separator:
             logger.error(f"输入文件不存在: {input_path}")
             return []
 
-        try:
-            probe = ffmpeg.probe(input_path)
-        except Exception as e:
-            logger.error(f"探测视频流失败: {str(e)}")
-            return []
+        if probe is None:
+            try:
+                probe = ffmpeg.probe(input_path)
+            except Exception as e:
+                logger.error(f"探测视频流失败: {str(e)}")
+                return []
 
         subtitle_streams = [s for s in probe['streams'] if s['codec_type'] == 'subtitle']
 
@@ -101,6 +190,74 @@ class Separator:
         logger.info(f"字幕提取任务结束，成功提取 {len(extracted_files)} 路")
         return extracted_files
 
+    def demux_all(self, input_path: str, output_dir: Optional[str] = None, subtitle_dir: Optional[str] = None,
+                  audio_format: str = "mp3", sample_rate: int = 44100,
+                  stream_copy: bool = False, probe: Optional[Dict] = None) -> Dict[str, List[str]]:
+        """
+        单次解复用：只探测一次，并用一条带多个输出的 ffmpeg 命令写出全部音轨和文本字幕，
+        大体积 MKV 只需从磁盘读取一遍。多输出命令失败时退回逐流提取。
+
+        Args:
+            input_path: 输入视频路径。
+            output_dir: 音轨输出目录。
+            subtitle_dir: 字幕输出目录，默认与音轨相同。
+            audio_format: 音轨格式（见 AUDIO_FORMATS）。
+            sample_rate: 转码时的音轨采样率（重封装的音轨保留源采样率）。
+            stream_copy: 可行时以 -c:a copy 重封装音轨（见 extract_audio）。
+            probe: 已缓存的探测结果（见 probe_media），提供时跳过 ffprobe。
+
+        Returns:
+            Dict[str, List[str]]: 格式如 {"audio": [...], "subtitles": [...]}。
+        """
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"不支持的音频格式: {audio_format}，可选: {', '.join(AUDIO_FORMATS)}")
+        name, audio_dir = self._prepare_paths(input_path, output_dir)
+        _, subtitle_dir = self._prepare_paths(input_path, subtitle_dir or audio_dir)
+
+        if not os.path.exists(input_path):
+            logger.error(f"输入文件不存在: {input_path}")
+            raise FileNotFoundError(f"Input file does not exist: {input_path}")
+
+        if probe is None:
+            probe = self.probe_media(input_path)
+
+        audio_streams = [s for s in probe['streams'] if s['codec_type'] == 'audio']
+        subtitle_streams = [s for s in probe['streams'] if s['codec_type'] == 'subtitle']
+
+        source = ffmpeg.input(input_path)
+        outputs = []
+        audio_files = []
+        for i, stream in enumerate(audio_streams):
+            ext, output_kwargs = self._audio_output_spec(stream, audio_format, sample_rate, stream_copy)
+            out_file = os.path.join(audio_dir, f"{name}_track_{i}.{ext}")
+            outputs.append(source[f'a:{i}'].output(out_file, **output_kwargs))
+            audio_files.append(out_file)
+
+        subtitle_files = []
+        for i, stream in enumerate(subtitle_streams):
+            if stream.get('codec_name') not in TEXT_SUBTITLE_CODECS:
+                logger.info(f"字幕轨道 {i} 为图形字幕 ({stream.get('codec_name')})，跳过")
+                continue
+            out_file = os.path.join(subtitle_dir, f"{name}_sub_{i}.txt")
+            outputs.append(source[f's:{i}'].output(out_file, format='srt'))
+            subtitle_files.append(out_file)
+
+        if not outputs:
+            return {"audio": [], "subtitles": []}
+
+        logger.info(f"单次解复用: {len(audio_files)} 路音轨, {len(subtitle_files)} 路字幕")
+        try:
+            ffmpeg.merge_outputs(*outputs).run(overwrite_output=True, capture_stdout=True, capture_stderr=True)
+        except ffmpeg.Error as e:
+            error_msg = e.stderr.decode(errors="ignore") if e.stderr else str(e)
+            logger.warning(f"单次解复用失败，退回逐流提取: {error_msg[-500:]}")
+            return {
+                "audio": self.extract_audio(input_path, audio_dir, audio_format, sample_rate, stream_copy, probe),
+                "subtitles": self.extract_subtitles(input_path, subtitle_dir, probe),
+            }
+
+        return {"audio": audio_files, "subtitles": subtitle_files}
+
     def process(self, input_path: str, output_dir: Optional[str] = None) -> Dict[str, List[str]]:
         """
         全自动化流程：同时分离指定视频的音频和字幕。
@@ -113,8 +270,7 @@ class Separator:
             Dict[str, List[str]]: 格式如 {"audio": [...], "subtitles": [...]}。
         """
         logger.info(f"开始全自动化流任务: {input_path}")
-        audio = self.extract_audio(input_path, output_dir)
-        subs = self.extract_subtitles(input_path, output_dir)
+        result = self.demux_all(input_path, output_dir)
         logger.info("全自动化任务处理完成")
-        return {"audio": audio, "subtitles": subs}
+        return result
 
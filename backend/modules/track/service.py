@@ -0,0 +1,194 @@
+"""
+人声分离服务：进程内共享一个常驻模型，任务线程提交的请求由单个服务线程依次调用模型完成。
+
+audio-separator 的 Separator 不是线程安全的：输出目录与格式保存在模型实例上（加载模型时从 Separator
+复制），多个任务并发修改会互相覆盖输出位置。服务线程独占模型，每个请求调用前设置自己的输出目录与格式，
+因此同一模型可以为不同任务写出不同格式的人声文件。audio-separator 逐文件推理，请求之间不合并批次；
+每个文件内部的分块由模型的 batch_size 批量推理。
+
+不指定输出目录的请求不写文件：服务线程截获模型写盘前的人声数组直接返回，
+下游（转录）无需再解码一次刚编码好的人声文件。
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from audio_separator.separator import Separator
+from audio_separator.separator.uvr_lib_v5 import spec_utils
+
+from .quantize import PRECISIONS, quantize_model
+
+logger = logging.getLogger(__name__)
+
+# 默认分离模型
+DEFAULT_MODEL_FILENAME = "UVR-MDX-NET-Inst_HQ_5.onnx"
+# 默认输出格式（文件请求未指定格式时使用）
+DEFAULT_OUTPUT_FORMAT = "mp3"
+
+# 采用高保真平衡配置
+MDX_PARAMS = {
+    "hop_length": 1024,
+    "segment_size": 256,
+    "overlap": 0.25,
+    "batch_size": 16,
+}
+
+
+def default_precision() -> str:
+    """模型精度 SEPARATOR_MODEL_PRECISION（fp32 / int8，见 quantize.py）；脱离后端配置运行时为 fp32"""
+    try:
+        from config import settings
+    except ImportError:
+        return "fp32"
+    return settings.SEPARATOR_MODEL_PRECISION
+
+
+def _apply_precision(separator: Separator, precision: str) -> None:
+    """
+    把已加载的 MDX 模型切换为量化模型。audio-separator 只按文件哈希识别受支持的模型，
+    因此先照常加载 FP32 模型（取得模型参数），再让模型实例从量化文件重建 ONNX 会话。
+    """
+    model = separator.model_instance
+    if getattr(model, "uses_pytorch_inference", True) or not model.model_path.endswith(".onnx"):
+        logger.warning(f"当前模型不是通过 ONNX Runtime 推理，无法使用 {precision} 量化，继续使用 fp32")
+        return
+    model.model_path = quantize_model(model.model_path, precision)
+    model.load_model()
+
+
+def load_separator(model_filename: str = DEFAULT_MODEL_FILENAME, output_format: str = DEFAULT_OUTPUT_FORMAT,
+                   output_dir: Optional[str] = None, precision: Optional[str] = None) -> Separator:
+    """加载分离模型（最耗时的 IO 和计算操作，调用方负责缓存）；precision 为 None 时使用 default_precision()"""
+    precision = precision or default_precision()
+    if precision not in PRECISIONS:
+        raise ValueError(f"不支持的模型精度: {precision}，可选: {', '.join(PRECISIONS)}")
+    start = time.perf_counter()
+    logger.info(f"正在执行模型首次常驻挂载 ({model_filename}, {precision}, 输出格式 {output_format})...")
+    separator = Separator(
+        output_format=output_format,
+        output_single_stem="Vocals",
+        output_dir=output_dir or tempfile.gettempdir(),
+        log_level=logging.WARNING,
+        mdx_params=MDX_PARAMS,
+    )
+    separator.load_model(model_filename=model_filename)
+    if precision != "fp32":
+        _apply_precision(separator, precision)
+    logger.info(f"分离模型挂载完成，耗时 {time.perf_counter() - start:.2f}s")
+    return separator
+
+
+class SeparationService:
+    """
+    线程安全的人声分离服务。
+
+    用法：
+        service = get_separation_service()
+        vocals = service.separate("track.flac", "data/<HASH>/vocal", "flac")   # 可在多个任务线程中并发调用
+        audio = service.separate_array("track.flac")                            # 不写文件，返回 (帧数, 声道数) 数组
+    """
+
+    def __init__(self, model_filename: str = DEFAULT_MODEL_FILENAME, precision: Optional[str] = None):
+        """
+        Args:
+            model_filename: 分离模型文件名
+            precision: 模型精度（fp32 / int8），None 表示使用 default_precision()
+        """
+        self.model_filename = model_filename
+        self.precision = precision or default_precision()
+        self._separator = load_separator(model_filename, precision=self.precision)
+        # 单个服务线程独占模型；submit 立即返回，调用方可在模型运行时准备下一个输入
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"separation-{self.precision}")
+
+    @property
+    def sample_rate(self) -> int:
+        """模型的工作采样率（separate_array 返回数组的采样率）"""
+        return self._separator.model_instance.sample_rate
+
+    def submit(self, input_path: str, output_dir: Optional[str] = None,
+               output_format: str = DEFAULT_OUTPUT_FORMAT) -> Future:
+        """
+        提交一个分离请求。指定 output_dir 时 Future 的结果为 output_format 格式的人声文件路径（位于 output_dir 中）；
+        否则不写文件，结果为形状 (帧数, 声道数) 的 float32 人声数组（采样率见 sample_rate）
+        """
+        return self._executor.submit(
+            self._separate, os.path.abspath(input_path), os.path.abspath(output_dir) if output_dir else None,
+            output_format,
+        )
+
+    def separate(self, input_path: str, output_dir: str, output_format: str = DEFAULT_OUTPUT_FORMAT,
+                 timeout: Optional[float] = None) -> str:
+        """同步分离：提交并等待结果，失败时抛出异常"""
+        return self.submit(input_path, output_dir, output_format).result(timeout)
+
+    def separate_array(self, input_path: str, timeout: Optional[float] = None) -> np.ndarray:
+        """同步分离并以内存数组返回人声，不写任何文件"""
+        return self.submit(input_path).result(timeout)
+
+    def _separate(self, input_path: str, output_dir: Optional[str], output_format: str) -> Union[str, np.ndarray]:
+        """
+        在服务线程中调用模型（模型实例上的输出目录与格式只在此处修改）。
+        output_dir 为 None 时临时替换模型实例的 final_process，截获写盘前的人声数组
+        （与写文件时相同的峰值归一化）。
+        """
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"找不到输入文件: {input_path}")
+        start = time.perf_counter()
+        model = self._separator.model_instance
+        target_dir = output_dir or tempfile.gettempdir()
+        os.makedirs(target_dir, exist_ok=True)
+        self._separator.output_dir = model.output_dir = target_dir
+        self._separator.output_format = model.output_format = output_format
+
+        captured: List[np.ndarray] = []
+        if output_dir is None:
+            def final_process(stem_path, source, stem_name):
+                audio = spec_utils.normalize(wave=source, max_peak=model.normalization_threshold,
+                                             min_peak=model.amplification_threshold)
+                captured.append(np.ascontiguousarray(audio, dtype=np.float32))
+                return {stem_name: source}
+
+            model.final_process = final_process
+        try:
+            output_files = self._separator.separate(input_path) or []
+        finally:
+            if output_dir is None:
+                # 删除实例属性，恢复类上的原始方法
+                del model.final_process
+        logger.info(f"人声分离完成: {os.path.basename(input_path)}，耗时 {time.perf_counter() - start:.2f}s")
+
+        if output_dir is None:
+            if not captured:
+                raise RuntimeError(f"分离结果为空: {input_path}")
+            return captured[0]
+        output_files = [f if os.path.isabs(f) else os.path.join(output_dir, f) for f in output_files]
+        vocals = next((f for f in output_files if "Vocals" in f), output_files[0] if output_files else None)
+        if vocals is None or not os.path.exists(vocals):
+            raise RuntimeError(f"分离结果为空: {input_path}")
+        return vocals
+
+
+# 按 (模型文件名, 精度) 缓存服务实例，在进程生命周期内只加载一次模型；输出格式随请求指定
+_SERVICES: Dict[Tuple[str, str], SeparationService] = {}
+_LOCK = threading.Lock()
+
+
+def get_separation_service(model_filename: str = DEFAULT_MODEL_FILENAME,
+                           precision: Optional[str] = None) -> SeparationService:
+    """
+    获取进程内共享的分离服务（首次调用时加载模型），所有任务线程向同一服务线程提交。
+    precision 为 None 时使用 SEPARATOR_MODEL_PRECISION（见 default_precision）。
+    """
+    precision = precision or default_precision()
+    with _LOCK:
+        key = (model_filename, precision)
+        service = _SERVICES.get(key)
+        if service is None:
+            service = SeparationService(model_filename, precision=precision)
+            _SERVICES[key] = service
+        return service
@@ -0,0 +1,370 @@
+"""
+时间轴工具：只对语音区域运行人声分离。
+
+流程：
+    1. detect_speech_windows   以 16kHz 单声道流式解码音轨，用 Silero VAD 找出语音区域（含余量）
+    2. compact_to_windows      把语音区域依次拼接为紧凑音频（区域之间插入短静音），送入 MDX 模型
+    3. expand_from_windows     把分离后的紧凑人声按原位置写回完整时间轴，其余部分补静音
+
+MDX 推理量因此与语音时长成正比，而与媒体时长无关。所有步骤均通过 ffmpeg 管道按块读写，
+峰值内存与媒体时长无关。
+
+窗口化分离（并行分离与边分离边转录）：
+    plan_windows               把整条音轨或语音区域规划为相邻重叠的窗口
+    cut_window                 截取单个窗口作为模型输入，分发给单例模型或多个进程
+    TimelineWriter             按到达顺序把分离后的窗口写回完整时间轴（重叠处交叉淡化，间隙补静音）
+
+内存交接（不写人声文件）：
+    overlap_join               在内存中按起点拼接相邻重叠的窗口，重叠区交叉淡化
+"""
+import logging
+import os
+from typing import Iterable, List, Optional, Tuple
+
+import ffmpeg
+import numpy as np
+
+from .separator import AUDIO_FORMATS
+
+logger = logging.getLogger(__name__)
+
+# 人声分离模型的输入为双声道
+CHANNELS = 2
+# 每次读写的块长度（秒）
+BLOCK_S = 30.0
+
+
+def _open_reader(path: str, sample_rate: int, channels: int = CHANNELS):
+    return (
+        ffmpeg
+        .input(path)
+        .output("pipe:", format="f32le", acodec="pcm_f32le", ac=channels, ar=sample_rate)
+        .global_args("-nostdin", "-loglevel", "error")
+        .run_async(pipe_stdout=True)
+    )
+
+
+def _open_writer(path: str, sample_rate: int, channels: int = CHANNELS):
+    """按扩展名（见 AUDIO_FORMATS）编码写入"""
+    audio_format = os.path.splitext(path)[1].lstrip(".")
+    if audio_format not in AUDIO_FORMATS:
+        raise ValueError(f"不支持的音频格式: {audio_format}，可选: {', '.join(AUDIO_FORMATS)}")
+    return (
+        ffmpeg
+        .input("pipe:", format="f32le", ac=channels, ar=sample_rate)
+        .output(path, **AUDIO_FORMATS[audio_format])
+        .global_args("-nostdin", "-loglevel", "error")
+        .overwrite_output()
+        .run_async(pipe_stdin=True)
+    )
+
+
+def _read_frames(process, n_frames: int, channels: int = CHANNELS) -> np.ndarray:
+    """读取至多 n_frames 帧，返回形状 (帧数, 声道数) 的只读数组；返回帧数不足表示已到达末尾"""
+    data = process.stdout.read(n_frames * channels * 4)
+    usable = len(data) // (channels * 4) * channels * 4
+    return np.frombuffer(data[:usable], dtype=np.float32).reshape(-1, channels)
+
+
+def read_audio(path: str, sample_rate: int = 44100, channels: int = CHANNELS) -> np.ndarray:
+    """一次性解码整个（较短的）文件，返回形状 (帧数, 声道数) 的只读数组"""
+    reader = _open_reader(path, sample_rate, channels)
+    try:
+        data = reader.stdout.read()
+    finally:
+        _close(reader, path)
+    usable = len(data) // (channels * 4) * channels * 4
+    return np.frombuffer(data[:usable], dtype=np.float32).reshape(-1, channels)
+
+
+def _write_silence(process, n_frames: int, block_frames: int, channels: int = CHANNELS) -> None:
+    if n_frames <= 0:
+        return
+    silence = np.zeros((min(n_frames, block_frames), channels), dtype=np.float32)
+    while n_frames > 0:
+        n = min(n_frames, block_frames)
+        process.stdin.write(silence[:n].tobytes())
+        n_frames -= n
+
+
+def _close(process, path: str, check: bool = True) -> None:
+    for pipe in (process.stdin, process.stdout):
+        if pipe:
+            pipe.close()
+    returncode = process.wait()
+    if check and returncode != 0:
+        raise RuntimeError(f"FFmpeg 处理失败 {path}（退出码 {returncode}）")
+
+
+def detect_speech_windows(input_path: str, pad_s: float = 1.0, min_gap_s: float = 3.0,
+                          block_s: float = 600.0) -> Tuple[List[Tuple[float, float]], float]:
+    """
+    检测语音区域
+    Args:
+        input_path: 音频/视频文件路径
+        pad_s: 每个语音区域两侧保留的余量（秒），为 MDX 提供上下文并避免截掉首尾辅音
+        min_gap_s: 间隔小于该值的区域合并为一个
+        block_s: 单次解码并检测的块长度（秒），决定峰值内存
+    Returns:
+        ([(起始秒, 结束秒), ...], 音频总时长秒)
+    """
+    # 复用转录模块的 Silero VAD 封装（延迟导入，API 进程导入 modules.track 时不加载 faster-whisper）
+    from ..audio.pcm import SAMPLE_RATE, PcmStream
+    from ..audio.speech_map import build_speech_map
+
+    windows: List[Tuple[float, float]] = []
+    position = 0
+    with PcmStream(input_path, SAMPLE_RATE) as stream:
+        while True:
+            block = stream.read(int(block_s * SAMPLE_RATE))
+            if len(block) == 0:
+                break
+            speech_map = build_speech_map(block, SAMPLE_RATE, method="silero",
+                                          pad_ms=int(pad_s * 1000), min_gap_ms=int(min_gap_s * 1000))
+            for start, end in speech_map.regions:
+                start_s, end_s = (position + start) / SAMPLE_RATE, (position + end) / SAMPLE_RATE
+                # 跨块边界的区域与前一区域合并
+                if windows and start_s - windows[-1][1] < min_gap_s:
+                    windows[-1] = (windows[-1][0], max(windows[-1][1], end_s))
+                else:
+                    windows.append((start_s, end_s))
+            position += len(block)
+    return windows, position / SAMPLE_RATE
+
+
+def _to_frames(windows: List[Tuple[float, float]], sample_rate: int,
+               total_frames: Optional[int] = None) -> List[Tuple[int, int]]:
+    ranges = [(int(start * sample_rate), int(end * sample_rate)) for start, end in windows]
+    if total_frames is not None:
+        ranges = [(min(s, total_frames), min(e, total_frames)) for s, e in ranges]
+    return [(s, e) for s, e in ranges if e > s]
+
+
+def compact_to_windows(input_path: str, output_path: str, windows: List[Tuple[float, float]],
+                       sample_rate: int = 44100, spacer_s: float = 0.5) -> int:
+    """
+    把语音区域依次拼接为紧凑音频，区域之间插入 spacer_s 的静音（避免 MDX 的分块窗口跨越两个区域）
+    Args:
+        input_path: 源音轨
+        output_path: 紧凑音频输出路径（扩展名决定格式，建议 wav）
+        windows: detect_speech_windows 返回的区域
+        sample_rate: 输出采样率，应与人声分离模型一致
+        spacer_s: 区域之间的静音时长
+    Returns:
+        源音轨总帧数（expand_from_windows 据此恢复完整时间轴）
+    """
+    ranges = _to_frames(windows, sample_rate)
+    spacer = np.zeros((int(spacer_s * sample_rate), CHANNELS), dtype=np.float32)
+    block_frames = int(BLOCK_S * sample_rate)
+
+    reader = _open_reader(input_path, sample_rate)
+    writer = _open_writer(output_path, sample_rate)
+    position = 0
+    index = 0
+    failed = True
+    try:
+        while True:
+            block = _read_frames(reader, block_frames)
+            if len(block) == 0:
+                break
+            end = position + len(block)
+            while index < len(ranges) and ranges[index][0] < end:
+                start_w, end_w = ranges[index]
+                lo, hi = max(start_w, position), min(end_w, end)
+                if hi > lo:
+                    writer.stdin.write(block[lo - position:hi - position].tobytes())
+                if end_w > end:
+                    break
+                writer.stdin.write(spacer.tobytes())
+                index += 1
+            position = end
+        failed = False
+    finally:
+        _close(reader, input_path, check=not failed)
+        _close(writer, output_path, check=not failed)
+    return position
+
+
+def expand_from_windows(compact_path: Optional[str], output_path: str, windows: List[Tuple[float, float]],
+                        total_frames: int, sample_rate: int = 44100, spacer_s: float = 0.5,
+                        fade_s: float = 0.02) -> str:
+    """
+    把分离后的紧凑人声写回完整时间轴，区域之外补静音
+    Args:
+        compact_path: 分离后的紧凑人声（无语音区域时为 None，输出整段静音）
+        output_path: 输出路径（扩展名决定格式，见 AUDIO_FORMATS）
+        windows: 与 compact_to_windows 相同的区域
+        total_frames: 源音轨总帧数
+        sample_rate: 采样率
+        spacer_s: 与 compact_to_windows 相同的区域间静音时长
+        fade_s: 每个区域首尾的淡入淡出时长，避免拼接处出现爆音
+    Returns:
+        output_path
+    """
+    ranges = _to_frames(windows, sample_rate, total_frames)
+    spacer_frames = int(spacer_s * sample_rate)
+    fade_frames = max(1, int(fade_s * sample_rate))
+    block_frames = int(BLOCK_S * sample_rate)
+
+    reader = _open_reader(compact_path, sample_rate) if compact_path and ranges else None
+    writer = _open_writer(output_path, sample_rate)
+    position = 0
+    failed = True
+    try:
+        for start, end in ranges:
+            _write_silence(writer, start - position, block_frames)
+            length = end - start
+            offset = 0
+            while offset < length:
+                n = min(block_frames, length - offset)
+                got = _read_frames(reader, n)
+                # 分离结果略短于输入时补零
+                chunk = np.zeros((n, CHANNELS), dtype=np.float32)
+                chunk[:len(got)] = got
+                index = np.arange(offset, offset + n)
+                gain = np.clip(np.minimum(index + 1, length - index) / fade_frames, 0.0, 1.0)
+                chunk *= gain[:, None]
+                writer.stdin.write(chunk.tobytes())
+                offset += n
+            # 丢弃区域之间的静音
+            _read_frames(reader, spacer_frames)
+            position = end
+        _write_silence(writer, total_frames - position, block_frames)
+        failed = False
+    finally:
+        if reader is not None:
+            # 紧凑人声可能略长于预期，未读完的部分直接丢弃
+            _close(reader, compact_path, check=False)
+        _close(writer, output_path, check=not failed)
+    return output_path
+
+
+def cut_window(input_path: str, output_path: str, start_s: float, duration_s: float,
+               sample_rate: int = 44100) -> str:
+    """截取单个窗口为 float32 WAV（不引入量化误差）"""
+    (
+        ffmpeg
+        .input(input_path, ss=start_s, t=duration_s)
+        .output(output_path, acodec="pcm_f32le", ac=CHANNELS, ar=sample_rate)
+        .global_args("-nostdin", "-loglevel", "error")
+        .run(overwrite_output=True, capture_stdout=True, capture_stderr=True)
+    )
+    return output_path
+
+
+def plan_windows(regions: List[Tuple[float, float]], window_s: float = 60.0,
+                 overlap_s: float = 4.0) -> List[Tuple[float, float]]:
+    """
+    把区域（整条音轨为 [(0, 时长)]，或 detect_speech_windows 返回的语音区域）切分为
+    不超过 window_s 的窗口，同一区域内相邻窗口重叠 overlap_s
+    """
+    if not 0 <= overlap_s < window_s:
+        raise ValueError(f"重叠长度必须小于窗口长度: overlap={overlap_s}s, window={window_s}s")
+    windows = []
+    for start, end in regions:
+        position = start
+        while True:
+            windows.append((position, min(position + window_s, end)))
+            if position + window_s >= end:
+                break
+            position += window_s - overlap_s
+    return windows
+
+
+class TimelineWriter:
+    """
+    按时间顺序把分离后的窗口写到完整时间轴：窗口之间补静音（首尾淡入淡出），
+    与上一窗口重叠的部分线性交叉淡化。同一时刻只持有最近一个窗口。
+
+    用法：
+        with TimelineWriter(output_path, total_frames) as writer:
+            writer.add(audio, start_frame)    # audio 形状为 (帧数, 声道数)
+    """
+
+    def __init__(self, output_path: str, total_frames: int, sample_rate: int = 44100, fade_s: float = 0.02):
+        self.output_path = output_path
+        self.total_frames = total_frames
+        self.sample_rate = sample_rate
+        self.fade_frames = max(1, int(fade_s * sample_rate))
+        self.block_frames = int(BLOCK_S * sample_rate)
+        self.position = 0           # 已写出的帧数
+        self.pending = None         # 尚未写出的最近窗口（可能与下一窗口重叠）
+        self.pending_start = 0
+        self.process = None
+
+    def __enter__(self) -> "TimelineWriter":
+        self.process = _open_writer(self.output_path, self.sample_rate)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self._flush(fade_out=True)
+            _write_silence(self.process, self.total_frames - self.position, self.block_frames)
+        _close(self.process, self.output_path, check=exc_type is None)
+
+    def _fade(self, audio: np.ndarray, fade_in: bool) -> None:
+        n = min(self.fade_frames, len(audio))
+        ramp = np.linspace(0.0, 1.0, n, dtype=np.float32)[:, None]
+        if fade_in:
+            audio[:n] *= ramp
+        else:
+            audio[len(audio) - n:] *= ramp[::-1]
+
+    def _write(self, audio: np.ndarray) -> None:
+        audio = audio[:max(0, self.total_frames - self.position)]
+        self.process.stdin.write(np.ascontiguousarray(audio).tobytes())
+        self.position += len(audio)
+
+    def _flush(self, fade_out: bool) -> None:
+        if self.pending is None:
+            return
+        if fade_out:
+            self._fade(self.pending, fade_in=False)
+        self._write(self.pending)
+        self.pending = None
+
+    def add(self, audio: np.ndarray, start_frame: int) -> None:
+        """追加一个窗口，start_frame 不得早于上一窗口的起点"""
+        audio = np.array(audio, dtype=np.float32)
+        pending_end = self.pending_start + len(self.pending) if self.pending is not None else self.position
+        if start_frame >= pending_end:
+            self._flush(fade_out=True)
+            gap = min(start_frame, self.total_frames) - self.position
+            _write_silence(self.process, gap, self.block_frames)
+            self.position += max(0, gap)
+            self._fade(audio, fade_in=True)
+            self.pending, self.pending_start = audio, start_frame
+            return
+
+        offset = start_frame - self.pending_start
+        self._write(self.pending[:offset])
+        overlap = self.pending[offset:]
+        n = min(len(overlap), len(audio))
+        ramp = np.linspace(0.0, 1.0, n, dtype=np.float32)[:, None]
+        blended = overlap[:n] * (1.0 - ramp) + audio[:n] * ramp
+        self.pending = np.concatenate([blended, overlap[n:] if len(overlap) > n else audio[n:]])
+        self.pending_start = start_frame
+
+
+def overlap_join(chunks: Iterable[Tuple[np.ndarray, int]], total_frames: int) -> np.ndarray:
+    """
+    在内存中拼接按起点升序、相邻可重叠的窗口，重叠区线性交叉淡化，窗口之间的间隙为静音
+    Args:
+        chunks: (形状 (帧数,) 或 (帧数, 声道数) 的数组, 起始帧) 迭代器
+        total_frames: 输出总帧数，超出部分截断
+    Returns:
+        float32 数组
+    """
+    output = None
+    written = 0     # 已写入区域的末尾帧
+    for audio, start in chunks:
+        audio = audio[:max(0, total_frames - start)]
+        if output is None:
+            output = np.zeros((total_frames,) + audio.shape[1:], dtype=np.float32)
+        n = min(max(0, written - start), len(audio))
+        if n:
+            ramp = np.linspace(0.0, 1.0, n, dtype=np.float32).reshape((-1,) + (1,) * (audio.ndim - 1))
+            output[start:start + n] = output[start:start + n] * (1.0 - ramp) + audio[:n] * ramp
+        output[start + n:start + len(audio)] = audio[n:]
+        written = max(written, start + len(audio))
+    return output if output is not None else np.zeros(total_frames, dtype=np.float32)
@@ -1,7 +1,12 @@
+import time
 import logging
+from typing import Dict, Optional
 from celery import Celery
+from celery.signals import worker_process_init, task_prerun, task_postrun
 from config import settings
 from to_text import process_video_to_text, extract_audio_step, separate_vocal_step, transcribe_vocal_step
+from modules.audio import preload_whisper_model
+from modules.track import preload_separator
 from modules.database import db
 
 logger = logging.getLogger(__name__)
@@ -11,19 +16,79 @@ app = Celery(
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND
 )
+# 子进程在 worker_process_init 中预热模型，需放宽启动超时，否则会被主进程判定为启动失败
+app.conf.worker_proc_alive_timeout = settings.WORKER_PROC_ALIVE_TIMEOUT
 
 
-@app.task(bind=True)
-def text_task(self, file_hash: str):
+@worker_process_init.connect
+def warm_up_models(**kwargs):
+    """
+    worker 子进程启动时预加载 Whisper 与人声分离模型，使其在第一个任务到达前常驻内存。
+    预热失败不会阻止 worker 启动，模型会在首个任务中按需加载。
+    """
+    if not settings.PRELOAD_MODELS:
+        logger.info("已禁用模型预热，模型将在首个任务中按需加载")
+        return
+
+    start = time.perf_counter()
+    try:
+        preload_whisper_model(settings.WHISPER_MODEL_SIZE, autotune=settings.WHISPER_AUTOTUNE)
+        if settings.WHISPER_DRAFT_MODEL_SIZE:
+            preload_whisper_model(settings.WHISPER_DRAFT_MODEL_SIZE, autotune=settings.WHISPER_AUTOTUNE)
+    except Exception as e:
+        logger.warning(f"Whisper 模型预热失败: {e}")
+    try:
+        preload_separator()
+    except Exception as e:
+        logger.warning(f"人声分离模型预热失败: {e}")
+    logger.info(f"模型预热完成，耗时 {time.perf_counter() - start:.2f}s")
+
+
+# --- 任务延迟统计（按进程、按任务类型），用于对比首个任务与稳态任务的耗时 ---
+_task_started_at: Dict[str, float] = {}
+_task_latency: Dict[str, Dict[str, float]] = {}
+
+
+@task_prerun.connect
+def _record_task_start(task_id=None, **kwargs):
+    _task_started_at[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _log_task_latency(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started_at.pop(task_id, None)
+    if started is None or task is None:
+        return
+    elapsed = time.perf_counter() - started
+
+    stats = _task_latency.setdefault(task.name, {"count": 0, "first": 0.0, "steady_total": 0.0})
+    stats["count"] += 1
+    if stats["count"] == 1:
+        stats["first"] = elapsed
+        logger.info(f"[延迟] {task.name} 本进程首个任务耗时 {elapsed:.2f}s (state={state})")
+        return
+
+    stats["steady_total"] += elapsed
+    steady_avg = stats["steady_total"] / (stats["count"] - 1)
+    logger.info(
+        f"[延迟] {task.name} 耗时 {elapsed:.2f}s (state={state}); "
+        f"首个任务 {stats['first']:.2f}s, 稳态平均 {steady_avg:.2f}s ({stats['count'] - 1} 次)"
+    )
+
+
+# acks_late + reject_on_worker_lost：worker 进程崩溃时任务重新入队，
+# 重试会复用已完成的音轨/人声文件和转录检查点，只补做缺失部分
+@app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def text_task(self, file_hash: str, vocal_backend: Optional[str] = None):
     """
     视频全自动处理任务：提取字幕/提取音轨 -> 人声分离 -> 语音转文字。
-    入参为文件的 SHA-256 哈希值。
+    入参为文件的 SHA-256 哈希值，以及可选的人声提取后端（mdx / spectral，默认 VOCAL_BACKEND）。
     to_text.py 内部通过 task_instance.update_state() 更新 Redis 中间进度。
     完成后在此处更新 SQLite 状态为 success / failed。
     """
     try:
         logger.info(f"[{file_hash}] 开始处理 text_task")
-        result = process_video_to_text(file_hash, task_instance=self)
+        result = process_video_to_text(file_hash, task_instance=self, vocal_backend=vocal_backend)
         # 处理成功 → 更新数据库
         db.update_file_status(file_hash, "success")
         logger.info(f"[{file_hash}] text_task 处理完成")
@@ -48,12 +113,12 @@ def extract_audio_task(self, file_hash: str):
 
 
 @app.task(bind=True)
-def vocal_task(self, file_hash: str, track_path: str):
+def vocal_task(self, file_hash: str, track_path: str, vocal_backend: Optional[str] = None):
     """
     独立人声分离任务（需要提供已提取的音轨路径）。
     """
     try:
-        output_file = separate_vocal_step(file_hash, track_path)
+        output_file = separate_vocal_step(file_hash, track_path, vocal_backend)
         return {"output_file": output_file, "status": "success"}
     except Exception as e:
         logger.error(f"[{file_hash}] vocal_task 失败: {e}")
@@ -66,7 +131,7 @@ def stt_task(self, file_hash: str, vocal_path: str):
     独立语音转文字任务（需要提供人声音频路径）。
     """
     try:
-        output_file = transcribe_vocal_step(file_hash, vocal_path)
+        output_file = transcribe_vocal_step(file_hash, vocal_path, task_instance=self)
         return {"output_file": output_file, "status": "success"}
     except Exception as e:
         logger.error(f"[{file_hash}] stt_task 失败: {e}")
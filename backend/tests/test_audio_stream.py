@@ -0,0 +1,60 @@
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from modules.audio import faster_audio_processor
+from modules.audio.faster_audio_processor import AudioProcessorConfig, LongAudioProcessor
+
+Segment = namedtuple("Segment", "start end text avg_logprob compression_ratio")
+
+
+class _FakeModel:
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, audio, **kwargs):
+        self.calls += 1
+        return iter([Segment(0.0, 1.0, f"call{self.calls}", -0.1, 1.2)]), None
+
+
+@pytest.fixture
+def processor(monkeypatch, tmp_path):
+    model = _FakeModel()
+    monkeypatch.setattr(faster_audio_processor, "get_whisper_model", lambda *args, **kwargs: model)
+    config = AudioProcessorConfig()
+    config.AUTOTUNE = False
+    config.SPEECH_MAP_ENABLED = False
+    processor = LongAudioProcessor(model_size="tiny", device_override="cpu", config=config)
+    processor.model_fake = model
+    (tmp_path / "track.flac").write_bytes(b"track")
+    return processor
+
+
+def _chunks(*starts_ms, cached=()):
+    return ((None if i in cached else np.zeros(16000, dtype=np.float32), start) for i, start in enumerate(starts_ms))
+
+
+def test_stream_resumes_from_checkpoint_without_audio(processor, tmp_path):
+    track, checkpoint_dir = str(tmp_path / "track.flac"), str(tmp_path / "checkpoint")
+    checkpoint = processor.open_checkpoint(track, checkpoint_dir, handoff="memory")
+    checkpoint.save(0, {"segments": [{"start": 0.0, "end": 1.0, "text": "cached"}], "language": "zh"})
+
+    checkpoint = processor.open_checkpoint(track, checkpoint_dir, handoff="memory")
+    result = processor.process_audio_stream(_chunks(0, 60000, cached={0}), expected=2, checkpoint=checkpoint)
+    assert [s["text"] for s in result["segments"]] == ["cached", "call1"]
+    assert result["language"] == "zh"
+    assert processor.model_fake.calls == 1
+    # 全部完成后删除检查点
+    assert not (tmp_path / "checkpoint").exists()
+
+
+def test_stream_checkpoint_params_are_part_of_fingerprint(processor, tmp_path):
+    track, checkpoint_dir = str(tmp_path / "track.flac"), str(tmp_path / "checkpoint")
+    processor.open_checkpoint(track, checkpoint_dir, windows="a").save(0, {"segments": [], "language": None})
+    assert not processor.open_checkpoint(track, checkpoint_dir, windows="b").has(0)
+
+
+def test_stream_without_audio_or_checkpoint_fails(processor):
+    with pytest.raises(RuntimeError):
+        processor.process_audio_stream(_chunks(0, cached={0}), expected=1)
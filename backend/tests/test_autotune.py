@@ -0,0 +1,81 @@
+import socket
+
+from modules.audio import autotune, faster_audio_processor
+from modules.audio.autotune import apply_tuned_profile, save_tuned_profile
+from modules.audio.faster_audio_processor import AudioProcessorConfig, resolve_processor_config
+
+PROFILE = {"compute_type": "int8_float32", "cpu_threads": 4, "parallel_workers": 2, "segment_length_ms": 180000,
+           "reference_seconds": 600.0}
+
+
+def _config(tmp_path, **overrides):
+    config = AudioProcessorConfig()
+    config.AUTOTUNE = True
+    config.AUTOTUNE_CACHE = str(tmp_path / "autotune.json")
+    for attr, value in overrides.items():
+        setattr(config, attr, value)
+    return config
+
+
+def test_profile_key_is_hardware_based(monkeypatch):
+    monkeypatch.setattr(socket, "gethostname", lambda: "container-a")
+    key = autotune._profile_key("base", "cpu")
+    assert "container-a" not in key
+    assert key.endswith("|cpu|base")
+
+
+def test_apply_profile_keeps_explicit_compute_type(tmp_path):
+    config = _config(tmp_path, COMPUTE_TYPE="float32")
+    save_tuned_profile("base", "cpu", PROFILE, config.AUTOTUNE_CACHE)
+    tuned = apply_tuned_profile(config, "base", "cpu")
+    assert tuned.COMPUTE_TYPE == "float32"
+    assert tuned.PARALLEL_WORKERS == 2
+    assert tuned.SEGMENT_LENGTH_MS == 180000
+    assert config.PARALLEL_WORKERS == 1
+
+
+def test_segment_length_from_short_reference_is_ignored(tmp_path):
+    config = _config(tmp_path)
+    save_tuned_profile("base", "cpu", dict(PROFILE, reference_seconds=180.0), config.AUTOTUNE_CACHE)
+    tuned = apply_tuned_profile(config, "base", "cpu")
+    assert tuned.SEGMENT_LENGTH_MS == config.SEGMENT_LENGTH_MS
+    assert tuned.PARALLEL_WORKERS == 2
+
+
+def test_calibrate_skips_segment_lengths_without_long_reference(monkeypatch):
+    measured = []
+    monkeypatch.setattr(autotune, "_supported_compute_types", lambda device: ["int8"])
+    monkeypatch.setattr(autotune, "_thread_layouts", lambda cores: [(1, 4)])
+    # 每次试验都比上一次更快，确保测量过的片段长度会被选中
+    monkeypatch.setattr(autotune, "_measure",
+                        lambda path, duration, model, device, params: measured.append(params) or 1.0 / len(measured))
+    profile = autotune.calibrate("reference.wav", "base", "cpu", [90, 180], duration_s=300)
+    # 300 秒参考音频只够比较 90 秒片段（至少 3 倍）
+    assert [p["segment_length_ms"] for p in measured if "segment_length_ms" in p] == [90000]
+    assert profile["segment_length_ms"] == 90000
+
+
+def test_autotune_is_opt_in():
+    assert AudioProcessorConfig.AUTOTUNE is False
+
+
+def test_resolve_ignores_profile_when_autotune_off(tmp_path):
+    config = _config(tmp_path, AUTOTUNE=False)
+    save_tuned_profile("base", "cpu", PROFILE, config.AUTOTUNE_CACHE)
+    resolved, compute_type, cpu_threads = resolve_processor_config(config, "base", "cpu")
+    assert resolved is config
+    assert (compute_type, cpu_threads) == ("int8", 0)
+
+
+class _Daemon:
+    daemon = True
+
+
+def test_resolve_clamps_workers_in_daemon(tmp_path, monkeypatch):
+    monkeypatch.setattr(faster_audio_processor.multiprocessing, "current_process", lambda: _Daemon())
+    monkeypatch.setattr(faster_audio_processor.os, "cpu_count", lambda: 16)
+    config = _config(tmp_path)
+    save_tuned_profile("base", "cpu", PROFILE, config.AUTOTUNE_CACHE)
+    resolved, compute_type, cpu_threads = resolve_processor_config(config, "base", "cpu")
+    assert resolved.PARALLEL_WORKERS == 1
+    assert (compute_type, cpu_threads) == ("int8_float32", 8)
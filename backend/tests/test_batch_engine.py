@@ -0,0 +1,46 @@
+from collections import namedtuple
+
+import faster_whisper
+import numpy as np
+
+from modules.audio import batch_engine
+from modules.audio.batch_engine import CrossFileBatcher, _pack_windows, _route_segments
+
+Segment = namedtuple("Segment", "start end text")
+
+
+def test_segments_are_routed_to_owning_file_and_rebased():
+    # 文件 0 占 [0, 32000)，文件 1 从样本 48000（3 秒）开始
+    segments = [Segment(0.5, 1.5, "a"), Segment(3.2, 4.0, "b"), Segment(5.0, 6.5, "c")]
+    per_file = _route_segments(segments, [0, 48000], 2, sample_rate=16000)
+
+    assert [s["text"] for s in per_file[0]] == ["a"]
+    assert [s["text"] for s in per_file[1]] == ["b", "c"]
+    assert per_file[1][0]["start"] == 3.2 - 3.0
+    assert per_file[1][1]["end"] == 6.5 - 3.0
+
+
+def test_segment_starting_exactly_at_offset_belongs_to_that_file():
+    per_file = _route_segments([Segment(2.0, 2.5, "x")], [0, 32000], 2, sample_rate=16000)
+    assert per_file[0] == []
+    assert per_file[1] == [{"start": 0.0, "end": 0.5, "text": "x"}]
+
+
+def test_files_without_segments_get_empty_lists():
+    assert _route_segments([], [0, 100, 200], 3) == [[], [], []]
+
+
+def test_adjacent_speech_is_packed_up_to_window_length():
+    speech = [{"start": 0, "end": 100}, {"start": 150, "end": 280}, {"start": 320, "end": 400},
+              {"start": 900, "end": 950}]
+    assert _pack_windows(speech, 300) == [{"start": 0, "end": 280}, {"start": 320, "end": 400},
+                                          {"start": 900, "end": 950}]
+    assert _pack_windows([], 300) == []
+
+
+def test_batcher_builds_against_installed_faster_whisper(monkeypatch):
+    # 只替换模型加载，BatchedInferencePipeline 与 VAD 均来自已安装的 faster-whisper
+    monkeypatch.setattr(batch_engine, "get_whisper_model", lambda *args: object())
+    batcher = CrossFileBatcher("base", device_override="cpu", max_wait_s=0.0)
+    assert isinstance(batcher.pipeline, faster_whisper.BatchedInferencePipeline)
+    assert batcher._speech_windows(np.zeros(16000, dtype=np.float32)) == []
@@ -0,0 +1,59 @@
+import os
+
+from modules.audio.checkpoint import TranscriptionCheckpoint
+
+
+def _source(tmp_path, content=b"audio"):
+    path = tmp_path / "track.flac"
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_fingerprint_tracks_source_and_params(tmp_path):
+    source = _source(tmp_path)
+    fingerprint = TranscriptionCheckpoint.fingerprint_for(source, model_size="base")
+    assert fingerprint["source"] == "track.flac"
+    assert fingerprint["size"] == 5
+    assert fingerprint["model_size"] == "base"
+    assert fingerprint != TranscriptionCheckpoint.fingerprint_for(source, model_size="medium")
+
+
+def test_saved_chunks_survive_reopen(tmp_path):
+    directory = str(tmp_path / "checkpoint")
+    fingerprint = TranscriptionCheckpoint.fingerprint_for(_source(tmp_path), model_size="base")
+    checkpoint = TranscriptionCheckpoint(directory, fingerprint)
+    checkpoint.save(0, {"segments": [{"start": 0.0, "end": 1.0, "text": "你好"}], "language": "zh"})
+
+    reopened = TranscriptionCheckpoint(directory, fingerprint)
+    assert reopened.has(0) and not reopened.has(1)
+    assert reopened.load(0)["segments"][0]["text"] == "你好"
+
+
+def test_fingerprint_mismatch_discards_checkpoint(tmp_path):
+    directory = str(tmp_path / "checkpoint")
+    source = _source(tmp_path)
+    TranscriptionCheckpoint(directory, TranscriptionCheckpoint.fingerprint_for(source, model_size="base")).save(0, {})
+
+    reopened = TranscriptionCheckpoint(directory, TranscriptionCheckpoint.fingerprint_for(source, model_size="tiny"))
+    assert not reopened.has(0)
+    assert not os.path.exists(os.path.join(directory, "chunk_0000.json"))
+
+
+def test_corrupt_chunk_is_treated_as_missing(tmp_path):
+    directory = str(tmp_path / "checkpoint")
+    checkpoint = TranscriptionCheckpoint(directory, {"source": "x"})
+    checkpoint.save(0, {"segments": []})
+    with open(os.path.join(directory, "chunk_0000.json"), "w", encoding="utf-8") as f:
+        f.write("{truncated")
+
+    assert checkpoint.load(0) is None
+    assert not checkpoint.has(0)
+
+
+def test_clear_removes_directory(tmp_path):
+    directory = str(tmp_path / "checkpoint")
+    checkpoint = TranscriptionCheckpoint(directory, {"source": "x"})
+    checkpoint.save(0, {"segments": []})
+    checkpoint.clear()
+    assert not os.path.exists(directory)
+    assert not checkpoint.has(0)
@@ -0,0 +1,42 @@
+import importlib
+
+import numpy as np
+
+# modules.track 以同名函数 denoise 覆盖了子模块属性，按模块路径导入
+denoise = importlib.import_module("modules.track.denoise")
+SAMPLE_RATE = denoise.SAMPLE_RATE
+iter_denoised_windows = denoise.iter_denoised_windows
+
+TRACK = np.arange(10 * SAMPLE_RATE, dtype=np.float32)
+
+
+def _fake_blocks(monkeypatch, reads):
+    def iter_denoised(input_path, block_s=1.0, **kwargs):
+        block = int(block_s * SAMPLE_RATE)
+        for position in range(0, len(TRACK), block):
+            reads.append(position)
+            yield TRACK[position:position + block]
+
+    monkeypatch.setattr(denoise, "iter_denoised", iter_denoised)
+
+
+def test_windows_match_slices_of_the_whole_track(monkeypatch):
+    _fake_blocks(monkeypatch, [])
+    windows = [(0.0, 4.0), (3.0, 7.0), (6.0, 10.0)]
+    for (start_s, end_s), audio in zip(windows, iter_denoised_windows("track.flac", windows)):
+        assert np.array_equal(audio, TRACK[int(start_s * SAMPLE_RATE):int(end_s * SAMPLE_RATE)])
+
+
+def test_skipped_windows_yield_none_and_stop_decoding(monkeypatch):
+    reads = []
+    _fake_blocks(monkeypatch, reads)
+    windows = [(0.0, 4.0), (3.0, 7.0), (6.0, 10.0)]
+    results = list(iter_denoised_windows("track.flac", windows, skip=[0, 2]))
+    assert results[0] is None and results[2] is None
+    assert np.array_equal(results[1], TRACK[3 * SAMPLE_RATE:7 * SAMPLE_RATE])
+    # 最后一个需要的窗口之后不再解码
+    assert reads[-1] == 6 * SAMPLE_RATE
+
+    reads.clear()
+    assert list(iter_denoised_windows("track.flac", windows, skip=[0, 1, 2])) == [None, None, None]
+    assert reads == []
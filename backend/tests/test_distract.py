@@ -0,0 +1,27 @@
+import numpy as np
+
+from modules.track import distract
+
+
+class _Service:
+    def separate_array(self, path):
+        return np.zeros((4, 2), dtype=np.float32)
+
+
+def test_window_uses_model_loaded_by_worker_initializer(monkeypatch):
+    calls = []
+
+    def get_service(model_filename, precision=None):
+        calls.append((model_filename, precision))
+        return _Service()
+
+    monkeypatch.setattr(distract, "get_separation_service", get_service)
+    monkeypatch.setattr(distract, "_limit_onnx_threads", lambda threads: None)
+    monkeypatch.setattr(distract, "_WORKER_MODEL_FILENAME", distract._WORKER_MODEL_FILENAME)
+    monkeypatch.setattr(distract, "_WORKER_PRECISION", distract._WORKER_PRECISION)
+    monkeypatch.setenv("OMP_NUM_THREADS", "1")
+
+    distract._init_separation_worker("custom.onnx", "int8", 1)
+    handle = distract._separate_window("window.wav")
+    assert distract._from_shared(handle).shape == (4, 2)
+    assert calls == [("custom.onnx", "int8"), ("custom.onnx", "int8")]
@@ -0,0 +1,109 @@
+from collections import namedtuple
+
+import numpy as np
+
+from modules.audio.faster_audio_processor import (
+    _SegmentMerger, _iter_adaptive_transcribe, _low_confidence_windows, _new_decode_stats, _replace_window
+)
+
+
+def _seg(start, end, text=""):
+    return {"start": start, "end": end, "text": text}
+
+
+def test_merger_drops_segments_starting_inside_previous():
+    merger = _SegmentMerger()
+    segments = [_seg(0.0, 5.0, "a"), _seg(4.0, 6.0, "dup"), _seg(5.0, 8.0, "b")]
+    assert [s["text"] for s in segments if merger.accept(s)] == ["a", "b"]
+    assert merger.overlap_count == 1
+
+
+def test_merger_always_keeps_first_segment():
+    merger = _SegmentMerger()
+    merger.last_end = 100.0
+    assert merger.accept(_seg(3.0, 4.0))
+
+
+def test_merger_concatenate_keeps_everything():
+    merger = _SegmentMerger(concatenate=True)
+    segments = [_seg(0.0, 5.0), _seg(4.0, 6.0), _seg(1.0, 2.0)]
+    assert all(merger.accept(s) for s in segments)
+    assert merger.overlap_count == 0
+
+
+THRESHOLDS = {"logprob": -1.0, "compression_ratio": 2.4}
+
+
+def _scored(start, end, logprob=-0.2, ratio=1.5, text=""):
+    return dict(_seg(start, end, text), avg_logprob=logprob, compression_ratio=ratio)
+
+
+def test_low_confidence_windows_group_adjacent_segments():
+    segments = [
+        _scored(0, 1),
+        _scored(1, 2, logprob=-1.5),
+        _scored(2, 3, ratio=3.0),
+        _scored(3, 4),
+        _scored(4, 5, logprob=-2.0),
+    ]
+    assert _low_confidence_windows(segments, THRESHOLDS) == [(1, 3), (4, 5)]
+
+
+def test_replace_window_keeps_only_segments_centred_in_window():
+    old = [_seg(10.0, 12.0, "old1"), _seg(12.0, 14.0, "old2")]
+    new = [_seg(9.5, 10.2, "padding"), _seg(10.1, 13.0, "new1"), _seg(13.0, 14.6, "new2"), _seg(14.0, 15.0, "tail")]
+    assert [s["text"] for s in _replace_window(old, new)] == ["new1", "new2"]
+
+
+def test_replace_window_falls_back_to_old_segments_when_nothing_fits():
+    old = [_seg(10.0, 12.0, "old")]
+    assert _replace_window(old, [_seg(0.0, 1.0, "elsewhere")]) == old
+
+
+Segment = namedtuple("Segment", "start end text avg_logprob compression_ratio")
+
+
+class _FakeModel:
+    """按 beam_size 返回预设段落，并记录每次调用的音频长度与参数"""
+
+    def __init__(self, greedy, beam):
+        self.outputs = {1: greedy, 5: beam}
+        self.calls = []
+
+    def transcribe(self, audio, **kwargs):
+        self.calls.append((len(audio), kwargs))
+        return iter(self.outputs[kwargs["beam_size"]]), None
+
+
+POLICY = {"beam_size": 5, "padding_ms": 500, "sample_rate": 100, "thresholds": THRESHOLDS}
+
+
+def test_adaptive_decode_keeps_confident_greedy_segments():
+    model = _FakeModel(greedy=[Segment(0.0, 2.0, "a", -0.1, 1.2), Segment(2.0, 4.0, "b", -0.3, 1.1)], beam=[])
+    stats = _new_decode_stats()
+    segments, _ = _iter_adaptive_transcribe(model, np.zeros(1000, np.float32), 0, {}, POLICY, stats)
+
+    assert [s["text"] for s in segments] == ["a", "b"]
+    assert [kwargs["beam_size"] for _, kwargs in model.calls] == [1]
+    assert stats["beam_windows"] == 0
+
+
+def test_adaptive_decode_redecodes_low_confidence_run_with_padding():
+    greedy = [
+        Segment(0.0, 2.0, "ok", -0.1, 1.2),
+        Segment(2.0, 3.0, "bad1", -1.5, 1.2),
+        Segment(3.0, 4.0, "bad2", -0.2, 3.0),
+        Segment(4.0, 5.0, "ok2", -0.1, 1.2),
+    ]
+    # 重新解码的时间戳相对于窗口起点（1.5s）
+    beam = [Segment(0.5, 2.5, "fixed", -0.2, 1.1)]
+    model = _FakeModel(greedy, beam)
+    stats = _new_decode_stats()
+    segments, _ = _iter_adaptive_transcribe(model, np.zeros(1000, np.float32), 10000, {}, POLICY, stats)
+
+    result = list(segments)
+    assert [s["text"] for s in result] == ["ok", "fixed", "ok2"]
+    assert result[1]["start"] == 10.0 + 1.5 + 0.5
+    # 窗口 [2.0, 4.0] 两侧各加 0.5s：样本 150 到 450
+    assert model.calls[1] == (300, {"beam_size": 5})
+    assert stats["beam_windows"] == 1 and stats["beam_segments"] == 2 and stats["segments"] == 4
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from modules.audio.pcm import iter_array_windows
+
+RATE = 1000
+
+
+def test_array_windows_overlap_and_offset():
+    audio = np.arange(2500, dtype=np.float32)
+    windows = list(iter_array_windows(audio, 1000, 200, start_ms=5000, sample_rate=RATE))
+    assert [start for _, start in windows] == [5000, 5800, 6600]
+    assert [len(w) for w, _ in windows] == [1000, 1000, 900]
+    assert windows[1][0][0] == 800
+    # 产出视图，不复制样本
+    assert all(np.shares_memory(w, audio) for w, _ in windows)
+
+
+def test_array_windows_stops_when_window_reaches_end():
+    windows = list(iter_array_windows(np.zeros(1800, dtype=np.float32), 1000, 200, sample_rate=RATE))
+    assert [start for _, start in windows] == [0, 800]
+
+
+def test_array_windows_short_and_empty_input():
+    assert [len(w) for w, _ in iter_array_windows(np.zeros(300, dtype=np.float32), 1000, 200, sample_rate=RATE)] == [300]
+    assert list(iter_array_windows(np.zeros(0, dtype=np.float32), 1000, 200, sample_rate=RATE)) == []
+
+
+def test_array_windows_rejects_overlap_not_shorter_than_window():
+    with pytest.raises(ValueError):
+        list(iter_array_windows(np.zeros(10, dtype=np.float32), 100, 100, sample_rate=RATE))
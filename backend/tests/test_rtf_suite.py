@@ -0,0 +1,43 @@
+from benchmark.rtf_suite import _case_key, compare
+
+AUDIO = {"duration_s": 600, "seed": 0}
+
+
+def _result(model, rtf, peak_rss_mb=1000.0, **extra):
+    return dict({"model": model, "compute_type": "int8", "chunk_s": None, "batched": False,
+                 "rtf": rtf, "peak_rss_mb": peak_rss_mb}, **extra)
+
+
+def _run(*results, audio=AUDIO):
+    return {"audio": audio, "results": list(results)}
+
+
+def test_flags_regressions_beyond_threshold():
+    report = compare(_run(_result("tiny", 0.10)), _run(_result("tiny", 0.12, 1050.0)), 0.1)
+    assert [(e["metric"], e["change"]) for e in report["regressions"]] == [("rtf", 0.2)]
+    assert report["improvements"] == []
+    assert "warning" not in report
+
+
+def test_flags_improvements_beyond_threshold():
+    report = compare(_run(_result("base", 0.20, 1000.0)), _run(_result("base", 0.20, 800.0)), 0.1)
+    assert report["regressions"] == []
+    assert [(e["metric"], e["current"]) for e in report["improvements"]] == [("peak_rss_mb", 800.0)]
+
+
+def test_missing_and_failed_cases_are_reported():
+    baseline = _run(_result("tiny", 0.1), _result("base", 0.2, error="boom"))
+    current = _run(_result("tiny", 0.1, error="boom"), _result("base", 0.2), _result("small", 0.3))
+    report = compare(baseline, current, 0.1)
+    assert report["missing"] == [_case_key(r) for r in current["results"]]
+    assert report["regressions"] == report["improvements"] == []
+
+
+def test_zero_baseline_metric_is_not_a_regression():
+    report = compare(_run(_result("tiny", 0.1, 0.0)), _run(_result("tiny", 0.1, 500.0)), 0.1)
+    assert report["regressions"] == []
+
+
+def test_warns_when_audio_differs():
+    report = compare(_run(_result("tiny", 0.1)), _run(_result("tiny", 0.1), audio={"duration_s": 60, "seed": 0}), 0.1)
+    assert "warning" in report
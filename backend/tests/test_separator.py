@@ -0,0 +1,24 @@
+from modules.track.separator import Separator
+
+
+def _spec(codec, sample_rate, stream_copy=True):
+    return Separator._audio_output_spec({"codec_name": codec, "sample_rate": sample_rate}, "flac", 44100, stream_copy)
+
+
+def test_copies_supported_codec_at_target_rate():
+    assert _spec("aac", "44100") == ("m4a", {"acodec": "copy"})
+
+
+def test_copies_regardless_of_source_sample_rate():
+    # 常见的 48kHz AAC 同样直接复制，下游加载 PCM 时再重采样
+    assert _spec("aac", "48000") == ("m4a", {"acodec": "copy"})
+    assert _spec("opus", None) == ("opus", {"acodec": "copy"})
+
+
+def test_transcoding_uses_target_sample_rate():
+    assert _spec("ac3", "48000") == ("flac", {"acodec": "flac", "ar": "44100"})
+
+
+def test_transcodes_unsupported_codec_or_when_disabled():
+    assert _spec("ac3", "44100")[0] == "flac"
+    assert _spec("aac", "44100", stream_copy=False)[0] == "flac"
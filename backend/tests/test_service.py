@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+
+from modules.track import service
+
+
+class _Model:
+    sample_rate = 44100
+    normalization_threshold = 0.9
+    amplification_threshold = 0.0
+    output_dir = None
+    output_format = None
+
+    def __init__(self):
+        self.written = []
+
+    def final_process(self, stem_path, source, stem_name):
+        path = os.path.join(self.output_dir, f"{stem_path}.{self.output_format}")
+        open(path, "w").close()
+        self.written.append(path)
+        return {stem_name: source}
+
+
+class _Separator:
+    """模拟 audio-separator：逐文件调用模型实例的 final_process，返回相对输出目录的文件名"""
+
+    def __init__(self):
+        self.model_instance = _Model()
+        self.output_dir = None
+        self.output_format = None
+
+    def separate(self, path):
+        name = os.path.splitext(os.path.basename(path))[0] + "_(Vocals)"
+        self.model_instance.final_process(name, np.full((4, 2), 0.5, dtype=np.float32), "Vocals")
+        return [f"{name}.{self.model_instance.output_format}"]
+
+
+def _service(monkeypatch):
+    monkeypatch.setattr(service, "load_separator", lambda model_filename, precision: _Separator())
+    return service.SeparationService("custom.onnx", precision="fp32")
+
+
+def test_one_service_per_model_and_precision(monkeypatch):
+    loads = []
+    monkeypatch.setattr(service, "load_separator", lambda model_filename, precision: loads.append(precision))
+    monkeypatch.setattr(service, "default_precision", lambda: "int8")
+    monkeypatch.setattr(service, "_SERVICES", {})
+
+    first = service.get_separation_service("custom.onnx")
+    assert service.get_separation_service("custom.onnx", "int8") is first
+    assert service.get_separation_service("custom.onnx", "fp32") is not first
+    assert loads == ["int8", "fp32"]
+
+
+def test_requests_choose_output_format_on_shared_model(monkeypatch, tmp_path):
+    instance = _service(monkeypatch)
+    source = tmp_path / "track.flac"
+    source.touch()
+
+    flac = instance.separate(str(source), str(tmp_path / "a"), "flac")
+    mp3 = instance.separate(str(source), str(tmp_path / "b"), "mp3")
+    assert flac == str(tmp_path / "a" / "track_(Vocals).flac")
+    assert mp3 == str(tmp_path / "b" / "track_(Vocals).mp3")
+    assert os.path.exists(flac) and os.path.exists(mp3)
+
+
+def test_array_request_is_captured_without_writing(monkeypatch, tmp_path):
+    instance = _service(monkeypatch)
+    source = tmp_path / "window.wav"
+    source.touch()
+
+    audio = instance.separate_array(str(source))
+    assert audio.shape == (4, 2) and audio.dtype == np.float32
+    assert instance._separator.model_instance.written == []
+    # 截获只作用于单次请求，之后的文件请求照常写盘
+    assert "final_process" not in vars(instance._separator.model_instance)
+
+
+def test_missing_input_fails_the_request(monkeypatch, tmp_path):
+    instance = _service(monkeypatch)
+    future = instance.submit(str(tmp_path / "missing.wav"))
+    assert isinstance(future.exception(), FileNotFoundError)
@@ -0,0 +1,97 @@
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from modules.audio import faster_audio_processor
+from modules.audio.faster_audio_processor import AudioProcessorConfig, _iter_chunk, _new_decode_stats
+from modules.audio.speech_map import SpeechMap, build_speech_map
+
+RATE = 100
+
+
+def test_compact_joins_regions_with_spacer():
+    audio = np.arange(1, 1001, dtype=np.float32)
+    speech_map = SpeechMap([(100, 200), (500, 550)], len(audio), RATE, spacer_ms=100)
+    compact = speech_map.compact(audio)
+    assert len(compact) == 100 + 10 + 50
+    assert np.array_equal(compact[:100], audio[100:200])
+    assert not compact[100:110].any()
+    assert np.array_equal(compact[110:], audio[500:550])
+    assert speech_map.speech_samples == 150
+    assert speech_map.speech_ratio == pytest.approx(0.15)
+
+
+def test_compact_without_regions_is_empty():
+    audio = np.ones(100, dtype=np.float32)
+    assert len(SpeechMap([], len(audio), RATE).compact(audio)) == 0
+
+
+def test_to_original_maps_compact_time_back():
+    speech_map = SpeechMap([(100, 200), (500, 550)], 1000, RATE, spacer_ms=100)
+    assert speech_map.to_original(0.0) == pytest.approx(1.0)
+    assert speech_map.to_original(0.5) == pytest.approx(1.5)
+    # 区域间的静音映射到前一个区域的结束处
+    assert speech_map.to_original(1.05) == pytest.approx(2.0)
+    assert speech_map.to_original(1.1) == pytest.approx(5.0)
+    assert speech_map.to_original(1.3) == pytest.approx(5.2)
+
+
+def test_remap_shifts_by_origin():
+    speech_map = SpeechMap([(100, 200), (500, 550)], 1000, RATE, spacer_ms=100)
+    segment = speech_map.remap({"start": 0.5, "end": 1.3, "text": "x"}, origin_s=60.0)
+    assert segment == {"start": pytest.approx(61.5), "end": pytest.approx(65.2), "text": "x"}
+
+
+def test_energy_map_pads_and_merges_close_regions():
+    rate = 1000  # 30ms 的能量帧恰好为 30 个样本
+    audio = np.zeros(10 * rate, dtype=np.float32)
+    audio[3000:4200] = 0.5
+    audio[4500:5100] = 0.5
+    audio[8100:9000] = 0.5
+    speech_map = build_speech_map(audio, rate, method="energy", pad_ms=100, min_gap_ms=1000)
+    # 前两个区域间隔不足 1 秒被合并，两侧各保留 0.1 秒余量
+    assert speech_map.regions == [(2900, 5200), (8000, 9100)]
+
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError):
+        build_speech_map(np.zeros(RATE, dtype=np.float32), RATE, method="unknown")
+
+
+Segment = namedtuple("Segment", "start end text avg_logprob compression_ratio")
+
+
+class _RecordingModel:
+    def __init__(self):
+        self.kwargs = []
+
+    def transcribe(self, audio, **kwargs):
+        self.kwargs.append(kwargs)
+        return iter([Segment(0.0, 0.5, "hi", -0.1, 1.2)]), None
+
+
+def _run_chunk(monkeypatch, method, transcribe_kwargs):
+    speech_map = SpeechMap([(100, 200)], 1000, RATE)
+    monkeypatch.setattr(faster_audio_processor, "build_speech_map", lambda audio, **options: speech_map)
+    model = _RecordingModel()
+    segments, _ = _iter_chunk(model, np.ones(1000, dtype=np.float32), 0, transcribe_kwargs, None,
+                              {"method": method, "sample_rate": RATE}, _new_decode_stats())
+    assert [s["start"] for s in segments] == [pytest.approx(1.0)]
+    return model.kwargs[0]
+
+
+def test_silero_map_disables_builtin_vad(monkeypatch):
+    kwargs = _run_chunk(monkeypatch, "silero", {"vad_filter": True})
+    assert kwargs["vad_filter"] is False
+
+
+def test_energy_map_and_batched_mode_keep_builtin_vad(monkeypatch):
+    assert _run_chunk(monkeypatch, "energy", {"vad_filter": True})["vad_filter"] is True
+    batched = _run_chunk(monkeypatch, "silero", {"vad_filter": True, "batch_size": 8})
+    assert batched["vad_filter"] is True
+
+
+def test_speech_map_is_opt_in():
+    # 开启后段落切分与转录文本会变化，默认保持原有行为
+    assert AudioProcessorConfig.SPEECH_MAP_ENABLED is False
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from modules.track import timeline
+from modules.track.timeline import TimelineWriter, overlap_join, plan_windows
+
+
+def test_plan_windows_overlaps_within_region():
+    assert plan_windows([(0.0, 130.0)], window_s=60.0, overlap_s=4.0) == [
+        (0.0, 60.0), (56.0, 116.0), (112.0, 130.0)
+    ]
+
+
+def test_plan_windows_splits_each_region_independently():
+    windows = plan_windows([(0.0, 10.0), (100.0, 170.0)], window_s=60.0, overlap_s=4.0)
+    assert windows == [(0.0, 10.0), (100.0, 160.0), (156.0, 170.0)]
+
+
+def test_plan_windows_rejects_overlap_not_shorter_than_window():
+    with pytest.raises(ValueError):
+        plan_windows([(0.0, 100.0)], window_s=10.0, overlap_s=10.0)
+
+
+class _Stdin:
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data.extend(data)
+
+    def close(self):
+        pass
+
+
+class _Process:
+    def __init__(self):
+        self.stdin = _Stdin()
+        self.stdout = None
+
+    def wait(self):
+        return 0
+
+
+@pytest.fixture
+def writer_process(monkeypatch):
+    process = _Process()
+    monkeypatch.setattr(timeline, "_open_writer", lambda path, sample_rate, channels=2: process)
+    return process
+
+
+def _written(process):
+    return np.frombuffer(bytes(process.stdin.data), dtype=np.float32).reshape(-1, 2)
+
+
+def test_timeline_writer_crossfades_overlap(writer_process):
+    # fade_s=0.02 @ 100Hz -> 淡入淡出 2 帧
+    with TimelineWriter("out.flac", total_frames=12, sample_rate=100) as writer:
+        writer.add(np.ones((8, 2), dtype=np.float32), 0)
+        writer.add(np.full((8, 2), 3.0, dtype=np.float32), 4)
+    out = _written(writer_process)[:, 0]
+    assert len(out) == 12
+    # 首窗口淡入
+    assert out[0] == 0.0 and out[2] == 1.0
+    # 重叠区 4..7 从 1 线性过渡到 3（新窗口的淡入落在交叉淡化区内）
+    assert out[4] == pytest.approx(1.0)
+    assert np.all(np.diff(out[4:8]) >= 0)
+    assert out[8] == pytest.approx(3.0)
+    # 末尾淡出
+    assert out[-1] == 0.0
+
+
+def test_timeline_writer_fills_gaps_with_silence(writer_process):
+    with TimelineWriter("out.flac", total_frames=20, sample_rate=100) as writer:
+        writer.add(np.ones((4, 2), dtype=np.float32), 0)
+        writer.add(np.ones((4, 2), dtype=np.float32), 10)
+    out = _written(writer_process)[:, 0]
+    assert len(out) == 20
+    assert not out[4:10].any()
+    assert not out[14:].any()
+    assert out[11] == 1.0
+
+
+def test_timeline_writer_truncates_to_total_frames(writer_process):
+    with TimelineWriter("out.flac", total_frames=6, sample_rate=100) as writer:
+        writer.add(np.ones((10, 2), dtype=np.float32), 0)
+    assert len(_written(writer_process)) == 6
+
+
+def test_overlap_join_crossfades_and_leaves_gaps_silent():
+    chunks = [
+        (np.ones(6, dtype=np.float32), 0),
+        (np.full(6, 3.0, dtype=np.float32), 4),
+        (np.ones(4, dtype=np.float32), 14),
+    ]
+    out = overlap_join(chunks, total_frames=16)
+    assert len(out) == 16
+    assert np.array_equal(out[:4], np.ones(4))
+    assert out[4] == pytest.approx(1.0) and out[5] == pytest.approx(3.0)
+    assert np.array_equal(out[6:10], np.full(4, 3.0))
+    assert not out[10:14].any()
+    assert np.array_equal(out[14:], np.ones(2))
+
+
+def test_overlap_join_without_chunks_is_silence():
+    assert not overlap_join(iter(()), 5).any()
@@ -1,9 +1,26 @@
 import os
 import glob
+import json
+import time
+import hashlib
+import queue
 import logging
+import tempfile
+import threading
+import contextlib
 from pathlib import Path
-from modules.track import Separator, distractor
-from modules.audio import LongAudioProcessor
+from typing import Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from modules.track import (
+    Separator, denoise, detect_music, distract_speech_regions, iter_denoised_windows, iter_vocal_windows,
+    separate_vocals
+)
+from modules.track.timeline import TimelineWriter, detect_speech_windows, plan_windows
+from modules.database import db
+from modules.audio import (
+    AudioProcessorConfig, LongAudioProcessor, TranscriptionStreamWriter, get_cross_file_batcher, probe_duration,
+    resample_pcm
+)
 from config import settings
 
 logger = logging.getLogger(__name__)
@@ -18,6 +35,26 @@ def _find_source_file(file_hash: str) -> str:
     return files[0]
 
 
+def _get_probe(file_hash: str, input_path: str) -> dict:
+    """读取按文件哈希缓存的探测结果；未缓存（如旧数据）时探测一次并写入数据库，重试不再重复探测"""
+    probe = db.get_media_probe(file_hash)
+    if probe is None:
+        probe = Separator.probe_media(input_path)
+        db.save_media_probe(file_hash, probe)
+    return probe
+
+
+def _reuse_output(path: Optional[str]):
+    """
+    任务重试时复用已完成的中间产物。各步骤都是先写临时文件再重命名为目标路径，
+    因此目标文件存在即代表该步骤已完整结束。
+    """
+    if path and os.path.exists(path):
+        logger.info(f"检测到已完成的中间产物，跳过该步骤: {path}")
+        return path
+    return None
+
+
 def extract_audio_step(file_hash: str):
     """模块化步骤：提取音轨到 data/<HASH>/track/"""
     input_path = _find_source_file(file_hash)
@@ -25,14 +62,26 @@ def extract_audio_step(file_hash: str):
     os.makedirs(track_dir, exist_ok=True)
     
     separator = Separator()
-    extracted_audios = separator.extract_audio(input_path, track_dir)
+    # 以无损中间格式、按人声分离模型所需的采样率提取，之后不再有损转码
+    extracted_audios = separator.extract_audio(
+        input_path, track_dir,
+        audio_format=settings.INTERMEDIATE_AUDIO_FORMAT,
+        sample_rate=settings.SEPARATION_SAMPLE_RATE,
+        stream_copy=settings.AUDIO_STREAM_COPY,
+        probe=_get_probe(file_hash, input_path),
+    )
     
+    return _install_track(file_hash, extracted_audios)
+
+
+def _install_track(file_hash: str, extracted_audios: list) -> str:
+    """将提取出的第一路音轨重命名为 <HASH>.<扩展名>（重封装时扩展名随源编码而定）"""
     if not extracted_audios:
         raise Exception("未提取到音轨")
     
-    # 重命名为 <HASH>.mp3
     raw_audio = extracted_audios[0]
-    target_track_path = os.path.join(track_dir, f"{file_hash}.mp3")
+    ext = os.path.splitext(raw_audio)[1]
+    target_track_path = os.path.join(settings.get_track_dir(settings.DATA_DIR, file_hash), f"{file_hash}{ext}")
     
     if os.path.abspath(raw_audio) != os.path.abspath(target_track_path):
         if os.path.exists(target_track_path):
@@ -42,17 +91,53 @@ def extract_audio_step(file_hash: str):
     return target_track_path
 
 
-def separate_vocal_step(file_hash: str, track_path: str):
-    """模块化步骤：人声分离到 data/<HASH>/vocal/"""
+def demux_step(file_hash: str):
+    """
+    模块化步骤：单次读取源文件，同时提取音轨到 data/<HASH>/track/、字幕到 data/<HASH>/text/
+    Returns:
+        (音轨路径, 字幕文件列表)
+    """
+    input_path = _find_source_file(file_hash)
+    track_dir = settings.get_track_dir(settings.DATA_DIR, file_hash)
+    text_dir = settings.get_text_dir(settings.DATA_DIR, file_hash)
+    
+    demuxed = Separator().demux_all(
+        input_path, track_dir, text_dir,
+        audio_format=settings.INTERMEDIATE_AUDIO_FORMAT,
+        sample_rate=settings.SEPARATION_SAMPLE_RATE,
+        stream_copy=settings.AUDIO_STREAM_COPY,
+        probe=_get_probe(file_hash, input_path),
+    )
+    return _install_track(file_hash, demuxed["audio"]), demuxed["subtitles"]
+
+
+def _vocal_backend(vocal_backend: Optional[str]) -> str:
+    """任务指定的人声提取后端，未指定时使用 VOCAL_BACKEND"""
+    backend = vocal_backend or settings.VOCAL_BACKEND
+    if backend not in settings.VOCAL_BACKENDS:
+        raise ValueError(f"不支持的人声提取后端: {backend}，可选: {', '.join(settings.VOCAL_BACKENDS)}")
+    return backend
+
+
+def separate_vocal_step(file_hash: str, track_path: str, vocal_backend: Optional[str] = None):
+    """模块化步骤：人声分离（或谱门限降噪）到 data/<HASH>/vocal/"""
     vocal_dir = settings.get_vocal_dir(settings.DATA_DIR, file_hash)
     os.makedirs(vocal_dir, exist_ok=True)
     
-    vocal_path_raw = distractor(track_path, output_dir=vocal_dir)
+    if _vocal_backend(vocal_backend) == "spectral":
+        vocal_path_raw = denoise(track_path, output_dir=vocal_dir, output_format=settings.INTERMEDIATE_AUDIO_FORMAT)
+    else:
+        # 默认只分离语音区域，音乐片头、间奏等不含语音的部分不进入 MDX 模型
+        separate = distract_speech_regions if settings.SEPARATION_SPEECH_ONLY else separate_vocals
+        vocal_path_raw = separate(
+            track_path, output_dir=vocal_dir, output_format=settings.INTERMEDIATE_AUDIO_FORMAT,
+            workers=settings.SEPARATION_WORKERS,
+        )
     
     if not vocal_path_raw:
         raise Exception("人声分离失败")
     
-    target_vocal_path = os.path.join(vocal_dir, f"{file_hash}.mp3")
+    target_vocal_path = settings.get_audio_artifact(settings.get_vocal_dir, file_hash)
     if os.path.exists(target_vocal_path):
         os.remove(target_vocal_path)
     os.rename(vocal_path_raw, target_vocal_path)
@@ -60,39 +145,363 @@ def separate_vocal_step(file_hash: str, track_path: str):
     return target_vocal_path
 
 
-def transcribe_vocal_step(file_hash: str, vocal_path: str):
-    """模块化步骤：语音转文字到 data/<HASH>/text/"""
+def _processor_config() -> AudioProcessorConfig:
+    """转录配置：本机调优结果与语音分布图只在对应设置开启时应用（调优与 worker 预热一致）"""
+    config = AudioProcessorConfig()
+    config.AUTOTUNE = settings.WHISPER_AUTOTUNE
+    config.SPEECH_MAP_ENABLED = settings.WHISPER_SPEECH_MAP
+    return config
+
+
+def _handoff_windows(file_hash: str, track_path: str, backend: str) -> List[Tuple[float, float]]:
+    """
+    内存交接的窗口规划：与流水线模式相同，按 PIPELINE_WINDOW_S 把语音区域（或整条音轨）切分为相邻重叠的窗口。
+    每个窗口即一个转录片段，也是检查点的记录单位
+    """
+    duration = _media_duration(file_hash, track_path)
+    speech_only = backend == "mdx" and settings.SEPARATION_SPEECH_ONLY
+    regions = detect_speech_windows(track_path)[0] if speech_only else [(0.0, duration)]
+    return plan_windows(regions, settings.PIPELINE_WINDOW_S, settings.PIPELINE_OVERLAP_S)
+
+
+def separate_vocal_pcm_step(file_hash: str, track_path: str, windows: List[Tuple[float, float]],
+                            vocal_backend: Optional[str] = None,
+                            cached: Iterable[int] = ()) -> Iterator[Tuple[Optional[np.ndarray], int]]:
+    """
+    模块化步骤：按窗口逐个人声分离（或谱门限降噪），结果以 (16kHz 单声道数组, 起始毫秒) 留在内存中交给转录，
+    不写入 data/<HASH>/vocal/。同一时刻只持有在途的几个窗口，峰值内存与媒体时长无关。
+    cached 中的窗口已有转录检查点，不再分离，以 (None, 起始毫秒) 占位。
+    """
+    cached = set(cached)
+    if _vocal_backend(vocal_backend) == "spectral":
+        # 流式降噪，按窗口从滚动缓冲区中取出，不把整条音轨载入内存
+        with contextlib.closing(iter_denoised_windows(track_path, windows, cached)) as denoised:
+            for (start_s, _), window in zip(windows, denoised):
+                yield window, int(start_s * 1000)
+        return
+    
+    sample_rate = settings.SEPARATION_SAMPLE_RATE
+    pending = [window for index, window in enumerate(windows) if index not in cached]
+    # 临时目录只存放模型输入窗口
+    with tempfile.TemporaryDirectory() as work_dir, contextlib.closing(
+        iter_vocal_windows(track_path, pending, work_dir, settings.SEPARATION_WORKERS, sample_rate)
+    ) as separated:
+        for index, (start_s, _) in enumerate(windows):
+            if index in cached:
+                yield None, int(start_s * 1000)
+                continue
+            vocals, _ = next(separated)
+            yield resample_pcm(vocals, sample_rate), int(start_s * 1000)
+
+
+def _media_duration(file_hash: str, audio_path: str) -> float:
+    """媒体时长（秒）：人声与源文件等长，优先读数据库缓存，缺失时再探测音频本身"""
+    duration = db.get_media_duration(file_hash)
+    return duration if duration else probe_duration(audio_path)
+
+
+def separation_decision(file_hash: str, track_path: str, vocal_backend: str = "mdx") -> dict:
+    """
+    判断是否需要人声分离：检测不到背景音乐时跳过 UVR-MDX-NET，直接转录原音轨。
+    检测失败时保守地照常分离。谱门限降噪本身比检测还快，不做检测直接运行。
+    Returns:
+        {"skipped", "backend", "music_ratio", "detection_seconds", "estimated_seconds_saved", "precision"}
+    """
+    decision = {"skipped": False, "backend": vocal_backend, "music_ratio": None, "detection_seconds": 0.0,
+                "estimated_seconds_saved": 0.0,
+                "precision": settings.SEPARATOR_MODEL_PRECISION if vocal_backend == "mdx" else None}
+    if vocal_backend != "mdx" or not settings.MUSIC_DETECTION:
+        return decision
+    try:
+        detection = detect_music(track_path, min_music_ratio=settings.MUSIC_DETECTION_MIN_RATIO)
+    except Exception as e:
+        logger.warning(f"[{file_hash}] 背景音乐检测失败，照常进行人声分离: {e}")
+        return decision
+
+    decision["music_ratio"] = detection["music_ratio"]
+    decision["detection_seconds"] = detection["elapsed"]
+    if not detection["has_music"]:
+        duration = db.get_media_duration(file_hash) or detection["duration"]
+        saved = duration * settings.ESTIMATED_SEPARATION_RTF - detection["elapsed"]
+        decision["skipped"] = True
+        decision["estimated_seconds_saved"] = round(max(0.0, saved), 1)
+        logger.info(f"[{file_hash}] 未检测到背景音乐，跳过人声分离（预计节省 {decision['estimated_seconds_saved']}s）")
+    else:
+        # 检测本身的耗时即为额外开销
+        decision["estimated_seconds_saved"] = -detection["elapsed"]
+        logger.info(f"[{file_hash}] 检测到背景音乐（占比 {detection['music_ratio']:.1%}），进行人声分离")
+    return decision
+
+
+class _TranscriptionProgress:
+    """
+    将转录进度（已产出段落数、最新时间戳）通过 task_instance.update_state 发布到 Redis。
+    首个段落立即发布，之后按 min_interval 秒节流，避免高频写入。
+    """
+
+    def __init__(self, task_instance=None, min_interval: float = 1.0):
+        self.task_instance = task_instance
+        self.min_interval = min_interval
+        self.started_at = time.perf_counter()
+        self.first_text_at = None
+        self.count = 0
+        self._last_published = 0.0
+
+    def update(self, segment: dict) -> None:
+        self.count += 1
+        now = time.perf_counter()
+        if self.first_text_at is None:
+            self.first_text_at = now - self.started_at
+            logger.info(f"首段文字已产出，耗时 {self.first_text_at:.2f}s")
+        elif now - self._last_published < self.min_interval:
+            return
+        self._last_published = now
+
+        if self.task_instance:
+            self.task_instance.update_state(state='distracted', meta={
+                'current': 'transcribing',
+                'segments': self.count,
+                'last_timestamp': round(segment["end"], 3),
+                'time_to_first_text': round(self.first_text_at, 3),
+            })
+
+    def publish_draft(self, draft: dict) -> None:
+        """两级转录：草稿已完整写出，之后进入精修阶段"""
+        if self.task_instance:
+            self.task_instance.update_state(state='distracted', meta={
+                'current': 'refining',
+                'segments': len(draft["segments"]),
+                'draft_ready_after': round(time.perf_counter() - self.started_at, 3),
+            })
+
+
+def transcribe_vocal_step(file_hash: str, vocal_path: str, task_instance=None):
+    """
+    模块化步骤：语音转文字到 data/<HASH>/text/
+    转录过程中文本文件逐段追加，进度通过 task_instance 实时发布；完成后整体重写为最终格式。
+    """
     text_dir = settings.get_text_dir(settings.DATA_DIR, file_hash)
     os.makedirs(text_dir, exist_ok=True)
     
-    processor = LongAudioProcessor(model_size="medium")
+    # 模型由注册表常驻缓存（worker 启动时已预热），此处构造处理器不会重复加载
+    config = _processor_config()
+    config.DRAFT_MODEL_SIZE = settings.WHISPER_DRAFT_MODEL_SIZE
+    processor = LongAudioProcessor(model_size=settings.WHISPER_MODEL_SIZE, config=config)
     final_text_path = os.path.join(text_dir, f"{file_hash}.txt")
     
-    result = processor.process_long_audio(vocal_path)
+    # 短音频交给跨文件批处理引擎，与其他排队文件合并推理（优先使用上传时缓存的源文件时长）
+    if settings.CROSS_FILE_BATCHING and _media_duration(file_hash, vocal_path) <= settings.CROSS_FILE_BATCH_MAX_SECONDS:
+        logger.info(f"[{file_hash}] 短音频，提交到跨文件批处理队列")
+        result = get_cross_file_batcher(settings.WHISPER_MODEL_SIZE).submit(vocal_path).result()
+        processor.save_transcription_with_timestamps(result, final_text_path)
+        return final_text_path
+    
+    # 每个片段完成后写入检查点，worker 崩溃后重试只转录缺失的片段
+    checkpoint_dir = os.path.join(text_dir, "checkpoint")
+    
+    progress = _TranscriptionProgress(task_instance)
+    with TranscriptionStreamWriter(final_text_path, processor.config.OUTPUT_ENCODING) as writer:
+        def on_segment(segment: dict) -> None:
+            writer.write_segment(segment)
+            progress.update(segment)
+        
+        def on_draft(draft: dict) -> None:
+            # 两级转录：草稿完成后立即以最终格式发布，精修期间用户即可阅读
+            processor.save_transcription_with_timestamps(draft, final_text_path)
+            progress.publish_draft(draft)
+        
+        result = processor.process_long_audio(
+            vocal_path, on_segment=on_segment, checkpoint_dir=checkpoint_dir, on_draft=on_draft
+        )
     processor.save_transcription_with_timestamps(result, final_text_path)
+    if processor.config.DRAFT_MODEL_SIZE:
+        logger.info(f"[{file_hash}] 精修占比: {processor.run_stats.get('refined_ratio', 0.0):.1%}")
+    
+    return final_text_path
+
+
+def transcribe_vocal_pcm_step(file_hash: str, track_path: str, vocal_backend: Optional[str] = None,
+                              task_instance=None):
+    """
+    模块化步骤：人声分离与转录以窗口为单位在内存中交接（见 separate_vocal_pcm_step），转录到 data/<HASH>/text/。
+    检查点按音轨指纹与窗口规划记录，重试时已转录的窗口既不重新分离也不重新转录。
+    """
+    backend = _vocal_backend(vocal_backend)
+    text_dir = settings.get_text_dir(settings.DATA_DIR, file_hash)
+    os.makedirs(text_dir, exist_ok=True)
+    final_text_path = os.path.join(text_dir, f"{file_hash}.txt")
+    
+    windows = _handoff_windows(file_hash, track_path, backend)
+    processor = LongAudioProcessor(model_size=settings.WHISPER_MODEL_SIZE, config=_processor_config())
+    checkpoint = processor.open_checkpoint(
+        track_path, os.path.join(text_dir, "checkpoint"),
+        handoff="memory",
+        vocal_backend=backend,
+        precision=settings.SEPARATOR_MODEL_PRECISION if backend == "mdx" else None,
+        windows=hashlib.sha1(json.dumps(windows).encode()).hexdigest(),
+    )
+    # 读取一次以排除已损坏的检查点，确保占位的窗口在转录时一定能从检查点恢复
+    cached = [index for index in range(len(windows)) if checkpoint.has(index) and checkpoint.load(index) is not None]
+    logger.info(f"[{file_hash}] 内存交接: {len(windows)} 个窗口，其中 {len(cached)} 个已有检查点")
+    chunks = separate_vocal_pcm_step(file_hash, track_path, windows, backend, cached)
     
+    progress = _TranscriptionProgress(task_instance)
+    with TranscriptionStreamWriter(final_text_path, processor.config.OUTPUT_ENCODING) as writer:
+        def on_segment(segment: dict) -> None:
+            writer.write_segment(segment)
+            progress.update(segment)
+        
+        result = processor.process_audio_stream(
+            chunks, expected=len(windows), duration_ms=int(_media_duration(file_hash, track_path) * 1000),
+            on_segment=on_segment, checkpoint=checkpoint,
+        )
+    processor.save_transcription_with_timestamps(result, final_text_path)
     return final_text_path
 
 
-def process_video_to_text(file_hash: str, task_instance=None):
+def _in_memory_handoff(file_hash: str, track_path: str) -> bool:
+    """
+    人声是否以内存数组交给转录（不需要人声文件，且转录不依赖文件路径时）。
+    内存交接同样记录转录检查点（见 transcribe_vocal_pcm_step），只有两级转录与跨文件批处理需要人声文件
+    """
+    if settings.PERSIST_VOCAL or settings.WHISPER_DRAFT_MODEL_SIZE:
+        return False
+    if settings.CROSS_FILE_BATCHING:
+        return _media_duration(file_hash, track_path) > settings.CROSS_FILE_BATCH_MAX_SECONDS
+    return True
+
+
+# 流水线队列的结束标记
+_PIPELINE_DONE = object()
+
+
+def pipelined_vocal_transcribe_step(file_hash: str, track_path: str, task_instance=None):
+    """
+    流水线模式：人声分离线程按窗口产出人声，经有界队列交给 Whisper 边分离边转录。
+    两个 CPU 密集阶段重叠执行，端到端耗时接近较慢的阶段而非两者之和。
+    分离结果在内存中交给 Whisper；PERSIST_VOCAL 开启时同时按时间轴写回完整人声文件
+    （写完后才重命名为正式产物）。
+    Returns:
+        (人声文件路径（未保存人声时为 None）, 文本文件路径)
+    """
+    vocal_dir = settings.get_vocal_dir(settings.DATA_DIR, file_hash)
+    text_dir = settings.get_text_dir(settings.DATA_DIR, file_hash)
+    if settings.PERSIST_VOCAL:
+        os.makedirs(vocal_dir, exist_ok=True)
+    os.makedirs(text_dir, exist_ok=True)
+    
+    sample_rate = settings.SEPARATION_SAMPLE_RATE
+    duration = _media_duration(file_hash, track_path)
+    regions = detect_speech_windows(track_path)[0] if settings.SEPARATION_SPEECH_ONLY else [(0.0, duration)]
+    windows = plan_windows(regions, settings.PIPELINE_WINDOW_S, settings.PIPELINE_OVERLAP_S)
+    logger.info(f"[{file_hash}] 流水线模式: {len(windows)} 个窗口, 队列上限 {settings.PIPELINE_QUEUE_SIZE}")
+    
+    vocal_path = settings.get_audio_artifact(settings.get_vocal_dir, file_hash)
+    partial_vocal_path = os.path.join(vocal_dir, f"{file_hash}.part.{settings.INTERMEDIATE_AUDIO_FORMAT}")
+    final_text_path = os.path.join(text_dir, f"{file_hash}.txt")
+    handoff = queue.Queue(maxsize=max(1, settings.PIPELINE_QUEUE_SIZE))
+    stop = threading.Event()
+    waits = {"separation_blocked_s": 0.0, "transcription_starved_s": 0.0}
+    
+    def put(item) -> None:
+        started = time.perf_counter()
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+        waits["separation_blocked_s"] += time.perf_counter() - started
+    
+    def produce(work_dir: str) -> None:
+        try:
+            timeline_writer = (
+                TimelineWriter(partial_vocal_path, int(duration * sample_rate), sample_rate)
+                if settings.PERSIST_VOCAL else contextlib.nullcontext()
+            )
+            with timeline_writer as timeline:
+                for vocals, start_s in iter_vocal_windows(
+                    track_path, windows, work_dir, settings.SEPARATION_WORKERS, sample_rate
+                ):
+                    if stop.is_set():
+                        raise RuntimeError("转录已中止，停止人声分离")
+                    if timeline is not None:
+                        timeline.add(vocals, int(start_s * sample_rate))
+                    put((resample_pcm(vocals, sample_rate), int(start_s * 1000)))
+            put(_PIPELINE_DONE)
+        except Exception as e:
+            put(e)
+    
+    def consume():
+        while True:
+            started = time.perf_counter()
+            item = handoff.get()
+            waits["transcription_starved_s"] += time.perf_counter() - started
+            if item is _PIPELINE_DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    
+    processor = LongAudioProcessor(model_size=settings.WHISPER_MODEL_SIZE, config=_processor_config())
+    progress = _TranscriptionProgress(task_instance)
+    started = time.perf_counter()
+    # 临时目录只存放模型输入窗口
+    with tempfile.TemporaryDirectory() as work_dir:
+        producer = threading.Thread(target=produce, args=(work_dir,), name=f"separate-{file_hash[:8]}", daemon=True)
+        producer.start()
+        try:
+            with TranscriptionStreamWriter(final_text_path, processor.config.OUTPUT_ENCODING) as writer:
+                def on_segment(segment: dict) -> None:
+                    writer.write_segment(segment)
+                    progress.update(segment)
+                
+                result = processor.process_audio_stream(
+                    consume(), expected=len(windows), duration_ms=int(duration * 1000), on_segment=on_segment
+                )
+        finally:
+            stop.set()
+            producer.join()
+    
+    processor.save_transcription_with_timestamps(result, final_text_path)
+    if settings.PERSIST_VOCAL:
+        if os.path.exists(vocal_path):
+            os.remove(vocal_path)
+        os.rename(partial_vocal_path, vocal_path)
+    else:
+        vocal_path = None
+    logger.info(
+        f"[{file_hash}] 流水线完成，耗时 {time.perf_counter() - started:.2f}s；"
+        f"分离因队列满等待 {waits['separation_blocked_s']:.1f}s，转录等待分离 {waits['transcription_starved_s']:.1f}s"
+    )
+    return vocal_path, final_text_path
+
+
+def process_video_to_text(file_hash: str, task_instance=None, vocal_backend: Optional[str] = None):
     """
     处理视频到文字的完整流水线：
-      1. 尝试提取内置字幕（优先）
-      2. 提取音轨 -> 人声分离 -> 语音转文字
+      1. 单次解复用，提取音轨与内置字幕（有字幕时优先使用）
+      2. 无字幕时：背景音乐检测 -> 人声分离（无音乐时跳过） -> 语音转文字
+         人声默认以内存数组交给转录，只有 PERSIST_VOCAL 开启（或转录依赖文件路径）时才写人声文件
     
     :param file_hash: 文件的 SHA-256 哈希值
     :param task_instance: Celery 任务实例，用于更新中间状态
+    :param vocal_backend: 人声提取后端（mdx / spectral），为 None 时使用 VOCAL_BACKEND
     """
+    backend = _vocal_backend(vocal_backend)
     input_path = _find_source_file(file_hash)
     text_dir = settings.get_text_dir(settings.DATA_DIR, file_hash)
     os.makedirs(text_dir, exist_ok=True)
 
-    separator = Separator()
     final_text_path = os.path.join(text_dir, f"{file_hash}.txt")
     
-    # 1. 尝试提取内置字幕
-    logger.info(f"正在尝试提取内置字幕: {input_path}")
-    extracted_subs = separator.extract_subtitles(input_path, text_dir)
+    # 1. 单次解复用：同时提取音轨与内置字幕（重试时若音轨已存在，只需提取字幕）
+    logger.info(f"正在提取音轨与内置字幕: {input_path}")
+    track_path = _reuse_output(settings.find_audio_artifact(settings.get_track_dir, file_hash))
+    if track_path:
+        extracted_subs = Separator().extract_subtitles(input_path, text_dir, probe=_get_probe(file_hash, input_path))
+    else:
+        track_path, extracted_subs = demux_step(file_hash)
     
     if extracted_subs:
         logger.info("检测到内置字幕，正在导入...")
@@ -103,9 +512,6 @@ def process_video_to_text(file_hash: str, task_instance=None):
         
         if task_instance:
             task_instance.update_state(state='converted', meta={'current': 'subtitles extracted'})
-        
-        # 即使有了字幕，也提取音轨
-        track_path = extract_audio_step(file_hash)
             
         return {
             "track_file": track_path,
@@ -118,20 +524,52 @@ def process_video_to_text(file_hash: str, task_instance=None):
     # 2. 如果没有字幕，则走 AI 语音转文字流程
     logger.info("未检测到内置字幕，进入 AI 语音转文字流...")
     
-    # 2.1 提取音轨
-    track_path = extract_audio_step(file_hash)
+    # 2.1 音轨已在解复用阶段提取
     if task_instance:
         task_instance.update_state(state='separated', meta={'current': 'audio extracted'})
 
-    # 2.2 人声分离
-    logger.info(f"开始人声分离: {track_path}")
-    vocal_path = separate_vocal_step(file_hash, track_path)
+    # 2.2 人声分离（检测不到背景音乐时跳过，直接转录原音轨）
+    vocal_path = _reuse_output(settings.get_audio_artifact(settings.get_vocal_dir, file_hash))
+    in_memory = False
+    separation = None
+    if not vocal_path:
+        separation = separation_decision(file_hash, track_path, backend)
+        if separation["skipped"]:
+            vocal_path = track_path
+        elif backend == "mdx" and settings.PIPELINED_SEPARATION and not settings.WHISPER_DRAFT_MODEL_SIZE:
+            # 流水线模式：边分离边转录，分离与转录在此一并完成
+            logger.info(f"开始流水线人声分离与转录: {track_path}")
+            vocal_path, final_text_path = pipelined_vocal_transcribe_step(file_hash, track_path, task_instance)
+            if task_instance:
+                task_instance.update_state(state='converted', meta={'current': 'text converted'})
+            return {
+                "track_file": track_path,
+                "audio_file": vocal_path,
+                "text_file": final_text_path,
+                "output_file": final_text_path,
+                "method": "ai_stt_pipelined",
+                "separation": separation,
+            }
+        elif _in_memory_handoff(file_hash, track_path):
+            # 分离在转录阶段按窗口进行（内存交接）
+            in_memory = True
+        else:
+            logger.info(f"开始人声分离: {track_path}")
+            vocal_path = separate_vocal_step(file_hash, track_path, backend)
     if task_instance:
-        task_instance.update_state(state='distracted', meta={'current': 'vocals separated'})
+        if separation and separation["skipped"]:
+            current = 'separation skipped'
+        else:
+            current = 'separating vocals' if in_memory else 'vocals separated'
+        task_instance.update_state(state='distracted', meta={'current': current, 'separation': separation})
 
     # 2.3 语音转文字
-    logger.info(f"开始语音转文字: {vocal_path}")
-    final_text_path = transcribe_vocal_step(file_hash, vocal_path)
+    if in_memory:
+        logger.info(f"开始人声分离与语音转文字（内存交接）: {track_path}")
+        final_text_path = transcribe_vocal_pcm_step(file_hash, track_path, backend, task_instance=task_instance)
+    else:
+        logger.info(f"开始语音转文字: {vocal_path}")
+        final_text_path = transcribe_vocal_step(file_hash, vocal_path, task_instance=task_instance)
     if task_instance:
         task_instance.update_state(state='converted', meta={'current': 'text converted'})
 
@@ -140,5 +578,6 @@ def process_video_to_text(file_hash: str, task_instance=None):
         "audio_file": vocal_path,
         "text_file": final_text_path,
         "output_file": final_text_path,
-        "method": "ai_stt"
+        "method": "ai_stt",
+        "separation": separation,
     }